@@ -10,11 +10,19 @@ from .settings import get_settings
 settings = get_settings()
 
 # Create SQLAlchemy engine
+# Connections give up after DB_CONNECT_TIMEOUT_SECONDS and PostgreSQL cancels any
+# statement running longer than DB_STATEMENT_TIMEOUT_MS, so a slow database fails
+# fast instead of holding requests until the OS-level timeout.
 engine = create_engine(
     settings.database_url,
     pool_pre_ping=True,
     pool_size=10,
     max_overflow=20,
+    pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+    connect_args={
+        "connect_timeout": settings.DB_CONNECT_TIMEOUT_SECONDS,
+        "options": f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}"
+    },
     echo=settings.DEBUG
 )
 
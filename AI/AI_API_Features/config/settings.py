@@ -1,9 +1,11 @@
 """
 Configuration settings for the Food Recognition API
 """
+from pydantic import model_validator
 from pydantic_settings import BaseSettings
 from functools import lru_cache
 from pathlib import Path
+from typing import Optional
 
 
 class Settings(BaseSettings):
@@ -26,14 +28,208 @@ class Settings(BaseSettings):
     POSTGRES_USER: str = "postgres"
     POSTGRES_PASSWORD: str = "123"
     
+    # Database Resilience Configuration
+    # Slow queries are cancelled server-side; repeated failures open the circuit breaker,
+    # after which requests skip the database until DB_CIRCUIT_RESET_SECONDS have passed.
+    DB_CONNECT_TIMEOUT_SECONDS: int = 3
+    DB_STATEMENT_TIMEOUT_MS: int = 2000
+    DB_POOL_TIMEOUT_SECONDS: int = 5
+    DB_CIRCUIT_FAILURE_THRESHOLD: int = 3
+    DB_CIRCUIT_RESET_SECONDS: float = 15.0
+    
     # Model Configuration
     MODEL_PATH: Path = Path(__file__).parent.parent.parent / "food_predict_feature" / "best_model_food100.keras"
     CLASS_NAMES_PATH: Path = Path(__file__).parent.parent.parent / "food_predict_feature" / "class_names.json"
     IMG_SIZE: int = 224
     NUM_CLASSES: int = 100
+    # Serve a deterministic fake model instead of MODEL_PATH (local clusters, load tests)
+    USE_FAKE_MODEL: bool = False
+    FAKE_MODEL_LATENCY_MS: float = 20.0
+    
+    # Model Artifact Cache Configuration
+    # After a fresh load each model is exported (in the background) to MODEL_ARTIFACT_CACHE_DIR,
+    # keyed by the model file checksum and the TensorFlow/Keras versions; later starts serve
+    # that pre-traced artifact and skip load_model, the rebuild fallback and graph tracing.
+    MODEL_ARTIFACT_CACHE_ENABLED: bool = True
+    MODEL_ARTIFACT_CACHE_DIR: Path = Path(__file__).parent.parent.parent / "food_predict_feature" / "artifact_cache"
+    
+    # Multi-Model Configuration
+    # The model above is served as DEFAULT_MODEL_NAME. MODELS_CONFIG_PATH points to a JSON file
+    # naming more models: {"egyptian": {"model_path": "...", "class_names_path": "...", "img_size": 224}}.
+    # They load on first use; once the loaded models exceed MODELS_MEMORY_BUDGET_MB (0: no limit)
+    # the least recently used ones are unloaded.
+    DEFAULT_MODEL_NAME: str = "EfficientNetB0_Food100"
+    MODELS_CONFIG_PATH: Optional[Path] = None
+    MODELS_MEMORY_BUDGET_MB: int = 0
+    
+    # Model Cascade Configuration
+    # A cheap model answers first; only images below the threshold reach the full model.
+    # Without CASCADE_FAST_MODEL_PATH the full model's weights are reused at CASCADE_FAST_IMG_SIZE.
+    CASCADE_ENABLED: bool = False
+    CASCADE_FAST_MODEL_PATH: Optional[Path] = None
+    CASCADE_FAST_IMG_SIZE: int = 160
+    CASCADE_CONFIDENCE_THRESHOLD: float = 0.6
+    
+    # Test-Time Augmentation Configuration
+    # Opt-in: /predict re-scores images below TTA_CONFIDENCE_THRESHOLD as TTA_VIEWS views
+    # (original, flip, crops; at most 8) in one batched forward pass and averages them.
+    TTA_ENABLED: bool = False
+    TTA_VIEWS: int = 4
+    TTA_CONFIDENCE_THRESHOLD: float = 0.3
+    
+    # Plate Analysis Configuration
+    # /predict-plate scores the whole photo plus a PLATE_GRID x PLATE_GRID grid of overlapping
+    # windows (each PLATE_WINDOW of the image side) in one forward pass, so 1 + PLATE_GRID**2
+    # must not exceed INFERENCE_MAX_BATCH_SIZE (checked when the settings load).
+    PLATE_GRID: int = 3
+    PLATE_WINDOW: float = 0.5
+    PLATE_MIN_CONFIDENCE: float = 0.5
+    PLATE_MAX_ITEMS: int = 5
+    
+    # Adaptive Quality Configuration
+    # Under load, requests are served at lower quality tiers, each degrading the one before:
+    # full, no_tta, one tier per ADAPTIVE_RESOLUTIONS input size (same weights, smaller input)
+    # and, with ADAPTIVE_CACHE_ONLY, cached predictions only (misses get 503). The tier steps
+    # down while the queue is deeper than ADAPTIVE_QUEUE_HIGH or smoothed latency exceeds
+    # ADAPTIVE_LATENCY_HIGH_MS, and back up after ADAPTIVE_STEP_UP_SECONDS below half of both.
+    # Each response names its tier in SERVING_TIER_HEADER.
+    ADAPTIVE_QUALITY_ENABLED: bool = False
+    ADAPTIVE_RESOLUTIONS: str = "192,160"
+    ADAPTIVE_QUEUE_HIGH: int = 32
+    ADAPTIVE_LATENCY_HIGH_MS: float = 500.0
+    ADAPTIVE_STEP_DOWN_SECONDS: float = 2.0
+    ADAPTIVE_STEP_UP_SECONDS: float = 15.0
+    ADAPTIVE_CACHE_ONLY: bool = True
+    SERVING_TIER_HEADER: str = "X-Serving-Tier"
+    
+    # Prediction Cache Configuration
+    # The "memory" backend keeps a cache per worker; "shared" keeps one fixed-size cache per
+    # node in a memory-mapped file (put it on tmpfs) that every worker reads and writes.
+    PREDICTION_CACHE_SIZE: int = 10000  # 0 disables caching
+    PREDICTION_CACHE_TOP_K: int = 10
+    PREDICTION_CACHE_BACKEND: str = "memory"  # "memory" or "shared"
+    PREDICTION_CACHE_SHARED_PATH: Path = Path("/dev/shm/food-lens-prediction-cache")
+    
+    # Near-Duplicate Configuration (reuse predictions for re-encoded or re-cropped photos)
+    NEAR_DUPLICATE_ENABLED: bool = False
+    NEAR_DUPLICATE_MAX_DISTANCE: int = 5  # Hamming distance of 64-bit dHashes, at most 15
+    NEAR_DUPLICATE_MAX_ENTRIES: int = 10000
+    
+    # Food Catalog Configuration
+    # Nutrition payloads are serialized once and re-checked against the table at this interval
+    FOOD_CATALOG_REFRESH_SECONDS: float = 30.0
+    
+    # Maximum number of names accepted by one bulk lookup request
+    FOOD_LOOKUP_MAX_NAMES: int = 100
+    
+    # Admin Configuration (admin endpoints are disabled while unset)
+    ADMIN_TOKEN: Optional[str] = None
+    ADMIN_TOKEN_HEADER: str = "X-Admin-Token"
+    
+    # Visual Similarity Configuration
+    EMBEDDING_INDEX_PATH: Path = Path(__file__).parent.parent.parent / "food_predict_feature" / "embedding_index.npz"
+    EMBEDDING_INDEX_DTYPE: str = "float16"
+    SIMILAR_FOODS_LIMIT: int = 3
+    
+    # Fuzzy Name Matching Configuration
+    SIMILAR_NAME_MIN_SCORE: float = 0.15  # n-gram similarity (0-1)
+    FOOD_SEARCH_MAX_LIMIT: int = 20
+    
+    # Inference Scheduling Configuration
+    REQUEST_TIMEOUT_HEADER: str = "X-Request-Timeout-Ms"
+    DEFAULT_REQUEST_TIMEOUT_MS: int = 10000
+    MAX_REQUEST_TIMEOUT_MS: int = 60000
+    INFERENCE_MAX_BATCH_SIZE: int = 16
+    INFERENCE_BATCH_WAIT_MS: int = 5
+    DISCONNECT_POLL_INTERVAL_MS: int = 100
+    PREPROCESS_WORKERS: int = 4
+    PREPROCESS_BUFFER_POOL_SIZE: int = 2
+    
+    # Live Scan Configuration
+    # Camera frames sent over the live scan WebSocket; only the newest frame is kept
+    # and each connection is processed at most LIVE_SCAN_MAX_FPS times per second.
+    LIVE_SCAN_MAX_CONNECTIONS: int = 50
+    LIVE_SCAN_MAX_FPS: float = 5.0
+    LIVE_SCAN_MAX_FRAME_BYTES: int = 262144  # 256KB, frames should be downscaled
+    LIVE_SCAN_FRAME_TIMEOUT_MS: int = 1000
+    LIVE_SCAN_SMOOTHING: float = 0.4
+    LIVE_SCAN_STABLE_FRAMES: int = 3
+    LIVE_SCAN_MIN_CONFIDENCE: float = 0.5
+    
+    # Request Router Configuration (router.py)
+    # Prediction uploads are routed by image hash on a consistent-hash ring of
+    # ROUTER_BACKENDS so repeated images hit the same replica's prediction cache.
+    ROUTER_BACKENDS: str = "http://127.0.0.1:8001,http://127.0.0.1:8002"
+    ROUTER_PORT: int = 8080
+    ROUTER_VIRTUAL_NODES: int = 100
+    ROUTER_LOAD_FACTOR: float = 1.25
+    ROUTER_HEALTH_INTERVAL_SECONDS: float = 2.0
+    ROUTER_FAILURE_THRESHOLD: int = 2
+    ROUTER_MAX_ATTEMPTS: int = 3
+    ROUTER_TIMEOUT_SECONDS: float = 30.0
+    
+    # Logging Configuration
+    # Records go through a queue to a background writer. INFO lines emitted while handling
+    # a request are kept for LOG_SAMPLE_RATE of requests; warnings and errors are always kept.
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "json"  # "json" or "text"
+    LOG_SAMPLE_RATE: float = 1.0
+    LOG_QUEUE_SIZE: int = 10000
+    REQUEST_ID_HEADER: str = "X-Request-ID"
+    
+    # Admission Control Configuration
+    # Guarded routes are rate limited per client (a key from API_KEYS, else IP) and share
+    # ADMISSION_MAX_CONCURRENT slots; batch requests (priority header "batch" or a batch
+    # path) may hold at most ADMISSION_BATCH_SHARE of them. Use the redis backend to
+    # share rate limits across workers.
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_PATHS: str = "/api/food/predict,/api/food/confirm"
+    ADMISSION_BATCH_PATHS: str = "/api/food/predict-batch"
+    ADMISSION_MAX_CONCURRENT: int = 32
+    ADMISSION_MAX_QUEUE: int = 64
+    ADMISSION_MAX_WAIT_MS: int = 2000
+    ADMISSION_BATCH_SHARE: float = 0.5
+    PRIORITY_HEADER: str = "X-Priority"
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_PER_SECOND: float = 5.0
+    RATE_LIMIT_BURST: int = 20
+    RATE_LIMIT_BACKEND: str = "memory"  # "memory" or "redis"
+    REDIS_URL: Optional[str] = None
+    API_KEY_HEADER: str = "X-API-Key"
+    API_KEYS: str = ""  # comma-separated keys that get their own rate limit bucket
+    # With TRUST_FORWARDED_FOR, X-Forwarded-For is only read from these proxies (IPs or CIDRs)
+    TRUST_FORWARDED_FOR: bool = False
+    TRUSTED_PROXIES: str = "127.0.0.1,::1"
+    
+    # Memory Budget Configuration
+    # Above MEMORY_SOFT_LIMIT_RATIO of the budget new guarded requests wait (up to
+    # MEMORY_QUEUE_WAIT_MS) for memory to drop; at the budget they get 503.
+    # Set below the container memory limit, e.g. 85% of it. 0 disables the budget.
+    MEMORY_BUDGET_MB: int = 0
+    MEMORY_SOFT_LIMIT_RATIO: float = 0.85
+    MEMORY_QUEUE_WAIT_MS: int = 1000
+    
+    # Prediction Log Configuration
+    # Every prediction (image hash, top-k, latency, model version) is buffered in memory and
+    # written in bulk every PREDICTION_LOG_FLUSH_ROWS records or PREDICTION_LOG_FLUSH_SECONDS.
+    # Sinks: "jsonl" or "parquet" files in PREDICTION_LOG_DIR, or "database" (prediction_log table).
+    # When the buffer is full a request waits up to PREDICTION_LOG_MAX_WAIT_MS, then its record is dropped.
+    PREDICTION_LOG_ENABLED: bool = False
+    PREDICTION_LOG_SINK: str = "jsonl"
+    PREDICTION_LOG_DIR: Path = Path(__file__).parent.parent.parent / "prediction_log"
+    PREDICTION_LOG_FLUSH_ROWS: int = 500
+    PREDICTION_LOG_FLUSH_SECONDS: float = 5.0
+    PREDICTION_LOG_MAX_BUFFER: int = 10000
+    PREDICTION_LOG_MAX_WAIT_MS: int = 50
+    PREDICTION_LOG_TOP_K: int = 5
+    # Fraction of images below REVIEW_CONFIDENCE_THRESHOLD saved to REVIEW_DIR for labeling
+    REVIEW_SAMPLE_RATE: float = 0.0
+    REVIEW_CONFIDENCE_THRESHOLD: float = 0.3
+    REVIEW_DIR: Path = Path(__file__).parent.parent.parent / "review_images"
     
     # Upload Configuration
     MAX_UPLOAD_SIZE: int = 10 * 1024 * 1024  # 10MB
+    MAX_BATCH_FILES: int = 32  # images per /predict-batch request
     ALLOWED_EXTENSIONS: set = {".jpg", ".jpeg", ".png", ".webp"}
     
     # CORS Configuration
@@ -46,6 +242,55 @@ class Settings(BaseSettings):
             return [origin.strip() for origin in self.CORS_ORIGINS.split(",")]
         return self.CORS_ORIGINS
     
+    @staticmethod
+    def _split(value: str) -> tuple[str, ...]:
+        return tuple(item.strip() for item in value.split(",") if item.strip())
+    
+    @property
+    def admission_paths(self) -> tuple[str, ...]:
+        """Parse guarded path prefixes from comma-separated string"""
+        return self._split(self.ADMISSION_PATHS)
+    
+    @property
+    def admission_batch_paths(self) -> tuple[str, ...]:
+        """Parse batch-lane path prefixes from comma-separated string"""
+        return self._split(self.ADMISSION_BATCH_PATHS)
+    
+    @property
+    def api_keys(self) -> tuple[str, ...]:
+        """Parse known API keys from comma-separated string"""
+        return self._split(self.API_KEYS)
+    
+    @property
+    def trusted_proxies(self) -> tuple[str, ...]:
+        """Parse trusted proxy addresses from comma-separated string"""
+        return self._split(self.TRUSTED_PROXIES)
+    
+    @property
+    def adaptive_resolutions(self) -> list[int]:
+        """Parse reduced input sizes from comma-separated string"""
+        return [int(size) for size in self._split(self.ADAPTIVE_RESOLUTIONS)]
+    
+    @property
+    def router_backends(self) -> list[str]:
+        """Parse router backend URLs from comma-separated string"""
+        return [url.rstrip("/") for url in self._split(self.ROUTER_BACKENDS)]
+    
+    @property
+    def plate_regions(self) -> int:
+        """Regions scored per plate photo: the whole image plus the grid windows"""
+        return 1 + self.PLATE_GRID ** 2 if self.PLATE_GRID >= 2 else 1
+    
+    @model_validator(mode="after")
+    def _check_plate_fits_batch(self) -> "Settings":
+        """Plate regions share one forward pass, so they must fit in a batch"""
+        if self.plate_regions > self.INFERENCE_MAX_BATCH_SIZE:
+            raise ValueError(
+                f"PLATE_GRID={self.PLATE_GRID} scores {self.plate_regions} regions per plate, more than "
+                f"INFERENCE_MAX_BATCH_SIZE={self.INFERENCE_MAX_BATCH_SIZE}; lower PLATE_GRID or raise the batch size"
+            )
+        return self
+    
     @property
     def database_url(self) -> str:
         """Generate PostgreSQL database URL"""
@@ -0,0 +1,24 @@
+"""Middleware module"""
+from .rate_limit import (
+    RateLimitBackend,
+    InMemoryRateLimitBackend,
+    RedisRateLimitBackend,
+    RateLimiter,
+    get_rate_limiter
+)
+from .admission import (
+    AdmissionController,
+    AdmissionMiddleware,
+    get_admission_controller
+)
+
+__all__ = [
+    "RateLimitBackend",
+    "InMemoryRateLimitBackend",
+    "RedisRateLimitBackend",
+    "RateLimiter",
+    "get_rate_limiter",
+    "AdmissionController",
+    "AdmissionMiddleware",
+    "get_admission_controller"
+]
@@ -0,0 +1,270 @@
+"""
+Admission control: global concurrency limit with priority lanes
+"""
+import asyncio
+import hashlib
+import ipaddress
+import math
+from collections import deque
+from typing import Optional
+import logging
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from ..services.memory_budget import MemoryBudget
+from .rate_limit import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+MAX_RETRY_AFTER = 3600  # seconds
+
+
+class AdmissionController:
+    """
+    Bounds how many requests run at once, serving interactive work first
+
+    At most max_concurrent requests hold a slot; batch requests may hold at
+    most batch_share of them, so a batch job can never occupy every slot.
+    Requests that cannot start wait in a per-lane FIFO queue. A freed slot
+    goes to the oldest interactive waiter before any batch waiter.
+    """
+
+    def __init__(self, max_concurrent: int = 32, max_queue: int = 64, batch_share: float = 0.5):
+        """
+        Initialize the controller
+
+        Args:
+            max_concurrent: Requests allowed to run at once
+            max_queue: Waiting requests allowed per lane before new ones are rejected
+            batch_share: Fraction of slots batch requests may hold
+        """
+        self.max_concurrent = max(max_concurrent, 1)
+        self.max_queue = max_queue
+        self.batch_limit = max(1, int(self.max_concurrent * batch_share))
+        self._active = {INTERACTIVE: 0, BATCH: 0}
+        self._waiters: dict[str, deque[asyncio.Future]] = {INTERACTIVE: deque(), BATCH: deque()}
+        self._stats = {"admitted": 0, "rejected_queue_full": 0, "rejected_timeout": 0}
+
+    def _can_start(self, lane: str) -> bool:
+        if sum(self._active.values()) >= self.max_concurrent:
+            return False
+        return lane == INTERACTIVE or self._active[BATCH] < self.batch_limit
+
+    def _grant(self, lane: str) -> None:
+        self._active[lane] += 1
+        self._stats["admitted"] += 1
+
+    async def acquire(self, lane: str, timeout: float) -> bool:
+        """
+        Wait for a slot
+
+        Args:
+            lane: INTERACTIVE or BATCH
+            timeout: Maximum seconds to wait
+
+        Returns:
+            True if a slot was granted (pair with release()), False if rejected
+        """
+        # Start immediately unless someone of equal or higher priority is already waiting
+        ahead = self._waiters[INTERACTIVE] if lane == INTERACTIVE else (self._waiters[INTERACTIVE] or self._waiters[BATCH])
+        if not ahead and self._can_start(lane):
+            self._grant(lane)
+            return True
+
+        waiters = self._waiters[lane]
+        if len(waiters) >= self.max_queue:
+            self._stats["rejected_queue_full"] += 1
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout)
+            return True
+        except asyncio.TimeoutError:
+            if waiter.done():
+                return True
+            waiter.cancel()
+            self._stats["rejected_timeout"] += 1
+            return False
+        except BaseException:
+            # Cancelled (e.g. the client went away): hand back a slot granted meanwhile
+            if waiter.done() and not waiter.cancelled():
+                self.release(lane)
+            else:
+                waiter.cancel()
+            raise
+        finally:
+            if waiter in waiters:
+                waiters.remove(waiter)
+
+    def release(self, lane: str) -> None:
+        """Free a slot and hand it to the highest-priority waiter"""
+        self._active[lane] -= 1
+        for next_lane in (INTERACTIVE, BATCH):
+            waiters = self._waiters[next_lane]
+            while waiters and self._can_start(next_lane):
+                waiter = waiters.popleft()
+                if not waiter.done():
+                    self._grant(next_lane)
+                    waiter.set_result(True)
+
+    def stats(self) -> dict:
+        """Get running and waiting requests per lane and admission counters"""
+        return {
+            "max_concurrent": self.max_concurrent,
+            "batch_limit": self.batch_limit,
+            "active": dict(self._active),
+            "waiting": {lane: len(waiters) for lane, waiters in self._waiters.items()},
+            **self._stats,
+        }
+
+
+# Global controller instance (singleton pattern)
+_controller_instance: Optional[AdmissionController] = None
+
+
+def get_admission_controller(
+    max_concurrent: int = 32,
+    max_queue: int = 64,
+    batch_share: float = 0.5
+) -> AdmissionController:
+    """
+    Get or create the global admission controller
+
+    Args:
+        max_concurrent: Requests allowed to run at once
+        max_queue: Waiting requests allowed per lane
+        batch_share: Fraction of slots batch requests may hold
+
+    Returns:
+        AdmissionController instance
+    """
+    global _controller_instance
+    if _controller_instance is None:
+        _controller_instance = AdmissionController(max_concurrent, max_queue, batch_share)
+    return _controller_instance
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware applying rate limits and admission control to expensive routes
+
+    For requests under one of the guarded path prefixes:
+    1. The client (a known API key, else its IP) is charged one token; an
+       empty bucket is answered with 429 and Retry-After. The IP is the
+       connection's peer, or with trust_forwarded_for and a peer among the
+       trusted proxies, the rightmost X-Forwarded-For hop that is not one.
+    2. With a memory budget, the request waits while memory is above the
+       soft limit and is answered with 503 once it is over the budget.
+    3. The request waits for a concurrency slot in its lane (batch when the
+       priority header says so or the path is a batch path); a full queue or
+       a wait longer than max_wait_ms is answered with 503 and Retry-After.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        controller: AdmissionController,
+        limiter: Optional[RateLimiter] = None,
+        memory_budget: Optional[MemoryBudget] = None,
+        paths: tuple[str, ...] = ("/api/food/predict",),
+        batch_paths: tuple[str, ...] = (),
+        max_wait_ms: int = 2000,
+        api_key_header: str = "X-API-Key",
+        priority_header: str = "X-Priority",
+        trust_forwarded_for: bool = False,
+        api_keys: tuple[str, ...] = (),
+        trusted_proxies: tuple[str, ...] = ("127.0.0.1", "::1")
+    ):
+        self.app = app
+        self.controller = controller
+        self.limiter = limiter
+        self.memory_budget = memory_budget if memory_budget is not None and memory_budget.enabled else None
+        self.paths = paths
+        self.batch_paths = batch_paths
+        self.max_wait = max_wait_ms / 1000
+        self.api_key_header = api_key_header.lower().encode("latin-1")
+        self.priority_header = priority_header.lower().encode("latin-1")
+        self.trust_forwarded_for = trust_forwarded_for
+        self.api_keys = {key.encode("latin-1") for key in api_keys}
+        self.trusted_proxies = [ipaddress.ip_network(proxy, strict=False) for proxy in trusted_proxies]
+
+    def _is_trusted_proxy(self, address: str) -> bool:
+        try:
+            ip = ipaddress.ip_address(address)
+        except ValueError:
+            return False
+        return any(ip in network for network in self.trusted_proxies)
+
+    def _client_key(self, scope: Scope, headers: dict[bytes, bytes]) -> str:
+        # Unknown keys are free to invent, so only configured ones get their own bucket
+        api_key = headers.get(self.api_key_header)
+        if api_key and api_key in self.api_keys:
+            return "key:" + hashlib.sha256(api_key).hexdigest()[:16]
+
+        client = scope.get("client")
+        address = client[0] if client else "unknown"
+        forwarded = headers.get(b"x-forwarded-for")
+        if forwarded and self.trust_forwarded_for and self._is_trusted_proxy(address):
+            # Hops left of the first untrusted one were written by the client itself
+            for hop in reversed(forwarded.decode("latin-1").split(",")):
+                hop = hop.strip()
+                if not hop:
+                    continue
+                address = hop
+                if not self._is_trusted_proxy(hop):
+                    break
+        return "ip:" + address
+
+    def _lane(self, path: str, headers: dict[bytes, bytes]) -> str:
+        if self.batch_paths and path.startswith(self.batch_paths):
+            return BATCH
+        priority = headers.get(self.priority_header, b"").decode("latin-1").strip().lower()
+        return BATCH if priority == BATCH else INTERACTIVE
+
+    @staticmethod
+    def _reject(status_code: int, error: str, detail: str, retry_after: float) -> JSONResponse:
+        return JSONResponse(
+            status_code=status_code,
+            content={"success": False, "error": error, "detail": detail},
+            # A bucket that never refills (rate 0) asks for an infinite wait
+            headers={"Retry-After": str(max(1, math.ceil(min(retry_after, MAX_RETRY_AFTER))))}
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        path = scope.get("path", "")
+        if scope["type"] != "http" or scope.get("method") == "OPTIONS" or not path.startswith(self.paths):
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+
+        if self.limiter is not None:
+            client_key = self._client_key(scope, headers)
+            retry_after = await self.limiter.check(client_key)
+            if retry_after > 0:
+                logger.warning(f"Rate limited {client_key} on {path}")
+                response = self._reject(429, "Too many requests", "Rate limit exceeded for this client", retry_after)
+                await response(scope, receive, send)
+                return
+
+        if self.memory_budget is not None and not await self.memory_budget.admit():
+            response = self._reject(503, "Server busy", "Server is low on memory, please retry", self.memory_budget.max_wait)
+            await response(scope, receive, send)
+            return
+
+        lane = self._lane(path, headers)
+        if not await self.controller.acquire(lane, self.max_wait):
+            logger.warning(f"Rejected {lane} request to {path}: server at capacity")
+            response = self._reject(503, "Server busy", "Too many requests in progress, please retry", self.max_wait)
+            await response(scope, receive, send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(lane)
@@ -0,0 +1,198 @@
+"""
+Per-client token-bucket rate limiting with pluggable state backends
+"""
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Optional
+import logging
+
+try:
+    import redis.asyncio as redis_asyncio
+except ImportError:  # pragma: no cover - optional dependency
+    redis_asyncio = None
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitBackend(ABC):
+    """
+    Storage for token buckets
+
+    Subclasses decide where bucket state lives: in this process, or in a
+    shared store so all API workers enforce one limit per client.
+    """
+
+    @abstractmethod
+    async def take(self, key: str, rate: float, burst: int, cost: float = 1.0) -> float:
+        """
+        Try to take tokens from a client's bucket
+
+        Args:
+            key: Client identifier
+            rate: Tokens added per second
+            burst: Bucket capacity
+            cost: Tokens this request needs
+
+        Returns:
+            0 if the request is allowed, otherwise seconds until enough tokens refill
+        """
+
+
+class InMemoryRateLimitBackend(RateLimitBackend):
+    """Token buckets in a dictionary, bounded to the most recently seen clients"""
+
+    def __init__(self, max_clients: int = 100000):
+        """
+        Initialize the backend
+
+        Args:
+            max_clients: Buckets kept before the least recently seen client is forgotten
+        """
+        self.max_clients = max_clients
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def take(self, key: str, rate: float, burst: int, cost: float = 1.0) -> float:
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (float(burst), now))
+            tokens = min(float(burst), tokens + (now - updated) * rate)
+            retry_after = 0.0
+            if tokens >= cost:
+                tokens -= cost
+            else:
+                retry_after = (cost - tokens) / rate if rate > 0 else float("inf")
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+            return retry_after
+
+
+class RedisRateLimitBackend(RateLimitBackend):
+    """Token buckets in Redis, shared by every worker pointed at the same server"""
+
+    # Refill, take and store atomically; returns the retry delay as a string.
+    # A rate of 0 or less never refills ("inf" once the burst is used up); such
+    # buckets are kept for a day instead of until they would be full again.
+    _SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local now = tonumber(ARGV[4])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+local ttl = 86400
+if rate > 0 then
+    tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+    ttl = math.ceil(burst / rate) + 1
+end
+local retry_after = '0'
+if tokens >= cost then
+    tokens = tokens - cost
+elseif rate > 0 then
+    retry_after = tostring((cost - tokens) / rate)
+else
+    retry_after = 'inf'
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], ttl)
+return retry_after
+"""
+
+    def __init__(self, url: str, prefix: str = "ratelimit:"):
+        """
+        Initialize the backend
+
+        Args:
+            url: Redis connection URL
+            prefix: Key prefix for bucket state
+        """
+        if redis_asyncio is None:
+            raise RuntimeError("The redis package is required for the redis rate limit backend")
+        self.prefix = prefix
+        self._client = redis_asyncio.from_url(url)
+        self._script = self._client.register_script(self._SCRIPT)
+
+    async def take(self, key: str, rate: float, burst: int, cost: float = 1.0) -> float:
+        retry_after = await self._script(keys=[self.prefix + key], args=[rate, burst, cost, time.time()])
+        return float(retry_after)
+
+
+class RateLimiter:
+    """Token-bucket limit applied per client key"""
+
+    def __init__(self, backend: RateLimitBackend, rate: float, burst: int):
+        """
+        Initialize the limiter
+
+        Args:
+            backend: Where bucket state is kept
+            rate: Requests per second each client may sustain
+            burst: Requests a client may make at once after being idle
+        """
+        self.backend = backend
+        self.rate = rate
+        self.burst = burst
+        self._stats = {"allowed": 0, "limited": 0, "backend_errors": 0}
+
+    async def check(self, key: str, cost: float = 1.0) -> float:
+        """
+        Charge a request to a client
+
+        Backend errors fail open (the request is allowed) so a broken shared
+        store does not take the API down with it.
+
+        Returns:
+            0 if allowed, otherwise seconds the client should wait
+        """
+        try:
+            retry_after = await self.backend.take(key, self.rate, self.burst, cost)
+        except Exception as e:
+            logger.error(f"Rate limit backend error: {e}")
+            self._stats["backend_errors"] += 1
+            return 0.0
+        self._stats["limited" if retry_after > 0 else "allowed"] += 1
+        return retry_after
+
+    def stats(self) -> dict:
+        """Get allowed/limited counters and the configured limit"""
+        return {"rate_per_second": self.rate, "burst": self.burst, **self._stats}
+
+
+# Global limiter instance (singleton pattern)
+_limiter_instance: Optional[RateLimiter] = None
+
+
+def get_rate_limiter(
+    rate: float = 5.0,
+    burst: int = 20,
+    backend: str = "memory",
+    redis_url: Optional[str] = None
+) -> RateLimiter:
+    """
+    Get or create the global rate limiter
+
+    Args:
+        rate: Requests per second each client may sustain
+        burst: Bucket capacity per client
+        backend: "memory" (per process) or "redis" (shared across workers)
+        redis_url: Redis URL for the redis backend
+
+    Returns:
+        RateLimiter instance
+    """
+    global _limiter_instance
+    if _limiter_instance is None:
+        if backend == "redis":
+            if not redis_url:
+                raise ValueError("redis_url is required for the redis rate limit backend")
+            state = RedisRateLimitBackend(redis_url)
+        else:
+            state = InMemoryRateLimitBackend()
+        _limiter_instance = RateLimiter(state, rate, burst)
+        logger.info(f"Rate limiting {rate}/s (burst {burst}) per client with {backend} backend")
+    return _limiter_instance
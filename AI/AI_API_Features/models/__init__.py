@@ -1,16 +1,21 @@
 """Models module"""
-from .database import Food
+from .database import Food, PredictionLogEntry
 from .schemas import (
     FoodResponse,
     PredictionResponse,
+    FoodLookupResponse,
     ErrorResponse,
-    HealthResponse
+    HealthResponse,
+    ModelLoadRequest
 )
 
 __all__ = [
     "Food",
+    "PredictionLogEntry",
     "FoodResponse",
     "PredictionResponse",
+    "FoodLookupResponse",
     "ErrorResponse",
-    "HealthResponse"
+    "HealthResponse",
+    "ModelLoadRequest"
 ]
@@ -1,7 +1,7 @@
 """
 Database models matching the existing Food schema
 """
-from sqlalchemy import Column, Integer, String, Numeric, DateTime
+from sqlalchemy import Column, Integer, String, Numeric, DateTime, Float, Boolean, JSON
 from sqlalchemy.sql import func
 from ..config.database import Base
 
@@ -39,3 +39,27 @@ class Food(Base):
             "createdAt": self.createdAt.isoformat() if self.createdAt else None,
             "updatedAt": self.updatedAt.isoformat() if self.updatedAt else None,
         }
+
+
+class PredictionLogEntry(Base):
+    """One served prediction, written in bulk by the prediction log"""
+    
+    __tablename__ = "prediction_log"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    ts = Column(DateTime(timezone=True), nullable=False, index=True)
+    request_id = Column(String(64), nullable=True)
+    endpoint = Column(String(64), nullable=False)
+    image_hash = Column(String(64), nullable=False, index=True)
+    model_name = Column(String(255), nullable=False)
+    model_version = Column(String(255), nullable=False)
+    predicted_food = Column(String(255), nullable=False)
+    confidence = Column(Float, nullable=False)
+    top_foods = Column(JSON, nullable=False)
+    top_probabilities = Column(JSON, nullable=False)
+    latency_ms = Column(Float, nullable=False)
+    cached = Column(Boolean, nullable=False, default=False)
+    views = Column(Integer, nullable=False, default=1)
+    
+    def __repr__(self):
+        return f"<PredictionLogEntry(id={self.id}, image_hash='{self.image_hash}', predicted_food='{self.predicted_food}')>"
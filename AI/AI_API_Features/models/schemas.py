@@ -31,6 +31,23 @@ class PredictionResponse(BaseModel):
     food_data: Optional[FoodResponse] = None
     message: Optional[str] = None
     suggestions: Optional[list[str]] = None
+    model_version: Optional[str] = None
+    model_name: Optional[str] = None
+    nutrition_status: str = Field(
+        "ok",
+        description='"ok", "stale" (served from the last good snapshot while the database is unavailable) or "unavailable"'
+    )
+    
+    class Config:
+        protected_namespaces = ()
+
+
+class FoodLookupResponse(BaseModel):
+    """Response model for bulk food lookup"""
+    success: bool
+    foods: dict[str, Optional[FoodResponse]]
+    found: int
+    missing: list[str]
 
 
 class ErrorResponse(BaseModel):
@@ -46,3 +63,12 @@ class HealthResponse(BaseModel):
     version: str
     model_loaded: bool
     database_connected: bool
+
+
+class ModelLoadRequest(BaseModel):
+    """Request model for loading a new model version"""
+    model_path: str = Field(..., description="Path to the .keras model file on the server")
+    version: Optional[str] = Field(None, description="Version label (defaults to the file checksum prefix)")
+    
+    class Config:
+        protected_namespaces = ()
@@ -1,4 +1,6 @@
 """Routers module"""
 from .food import router as food_router
+from .admin import router as admin_router
+from .live_scan import router as live_scan_router
 
-__all__ = ["food_router"]
+__all__ = ["food_router", "admin_router", "live_scan_router"]
@@ -0,0 +1,169 @@
+"""
+Admin API routes for model deployment
+"""
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from pathlib import Path
+import hmac
+import logging
+
+from ..config import get_settings
+from ..models import ModelLoadRequest
+from ..utils import memory_stats, start_tracing, stop_tracing, tracing_snapshot
+from .dependencies import get_budget, get_registry
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+async def require_admin_token(request: Request) -> None:
+    """Reject requests without the configured admin token"""
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin API is disabled (ADMIN_TOKEN is not set)"
+        )
+    token = request.headers.get(settings.ADMIN_TOKEN_HEADER, "")
+    if not hmac.compare_digest(token.encode(), settings.ADMIN_TOKEN.encode()):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid admin token"
+        )
+
+
+router = APIRouter(
+    prefix="/api/admin",
+    tags=["Admin"],
+    dependencies=[Depends(require_admin_token)]
+)
+
+
+@router.get(
+    "/models",
+    response_model=dict,
+    summary="List Model Versions",
+    description="Active model version, loaded versions with their serving state and in-flight batches, and background loads."
+)
+async def list_models():
+    return {
+        "success": True,
+        **get_registry().status()
+    }
+
+
+@router.post(
+    "/models/load",
+    response_model=dict,
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Deploy a Model Version",
+    description="""
+    ## 🚀 Zero-Downtime Model Deployment
+    
+    Loads a model file in the background, warms it with dummy batches and then
+    atomically swaps it in. The previous version finishes its in-flight batches
+    and stays loaded for rollback. Poll **GET /api/admin/models** for progress.
+    """
+)
+async def load_model(payload: ModelLoadRequest):
+    model_path = Path(payload.model_path)
+    if not model_path.is_file():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Model file not found: {payload.model_path}"
+        )
+    
+    try:
+        get_registry().load_async(model_path, payload.version)
+    except RuntimeError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    
+    logger.info(f"Started background load of {model_path}")
+    return {
+        "success": True,
+        "message": f"Loading {model_path.name} in the background",
+        "active_version": get_registry().active.version
+    }
+
+
+@router.post(
+    "/models/rollback",
+    response_model=dict,
+    summary="Roll Back Model Version",
+    description="Re-activate the previously active model version, which is kept loaded for instant rollback."
+)
+async def rollback_model():
+    try:
+        model_version = get_registry().rollback()
+    except RuntimeError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    
+    logger.warning(f"Rolled back to model version {model_version.version}")
+    return {
+        "success": True,
+        "active_version": model_version.version
+    }
+
+
+@router.post(
+    "/models/{version}/activate",
+    response_model=dict,
+    summary="Activate a Loaded Model Version",
+    description="Atomically switch serving to a version that is already loaded."
+)
+async def activate_model(version: str):
+    try:
+        model_version = get_registry().activate(version)
+    except KeyError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    
+    return {
+        "success": True,
+        "active_version": model_version.version
+    }
+
+
+@router.get(
+    "/memory",
+    response_model=dict,
+    summary="Process Memory",
+    description="Resident memory, allocator statistics, per-stage memory growth and the memory budget state."
+)
+async def get_memory():
+    return {**memory_stats(), "budget": get_budget().stats()}
+
+
+@router.post(
+    "/memory/tracing",
+    response_model=dict,
+    summary="Start Allocation Tracing",
+    description="Start tracemalloc. Python allocations become noticeably slower until it is stopped."
+)
+async def start_memory_tracing(frames: int = Query(1, ge=1, le=50, description="Stack frames kept per allocation")):
+    start_tracing(frames)
+    return {"success": True, "tracing": True, "frames": frames}
+
+
+@router.delete(
+    "/memory/tracing",
+    response_model=dict,
+    summary="Stop Allocation Tracing",
+    description="Stop tracemalloc and discard its data."
+)
+async def stop_memory_tracing():
+    stop_tracing()
+    return {"success": True, "tracing": False}
+
+
+@router.get(
+    "/memory/snapshot",
+    response_model=dict,
+    summary="Allocation Snapshot",
+    description="Largest Python allocation sites and, from the second snapshot on, their growth since the previous snapshot."
+)
+async def memory_snapshot(
+    limit: int = Query(25, ge=1, le=200),
+    group_by: str = Query("lineno", pattern="^(lineno|filename|traceback)$")
+):
+    try:
+        return tracing_snapshot(limit, group_by)
+    except RuntimeError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
@@ -0,0 +1,221 @@
+"""
+Shared service getters bound to the application settings
+"""
+from typing import Optional
+
+from ..config import get_settings, engine
+from ..services import (
+    CascadeConfig,
+    ModelRegistry,
+    ModelVersion,
+    ModelManager,
+    InferenceScheduler,
+    PredictionCache,
+    FoodCatalog,
+    FoodDatabaseService,
+    CircuitBreaker,
+    LiveScanManager,
+    MemoryBudget,
+    PredictionLog,
+    ArtifactCache,
+    NearDuplicateIndex,
+    QualityController,
+    get_model_registry,
+    get_artifact_cache,
+    get_model_manager,
+    get_scheduler,
+    get_prediction_cache,
+    get_near_duplicate_index,
+    get_quality_controller,
+    get_embedding_index,
+    get_food_catalog,
+    get_food_service,
+    get_db_breaker,
+    get_live_scan_manager,
+    get_memory_budget,
+    get_prediction_log
+)
+from ..middleware import AdmissionController, RateLimiter, get_admission_controller, get_rate_limiter
+
+settings = get_settings()
+
+
+def get_model_artifacts() -> Optional[ArtifactCache]:
+    """Get the on-disk cache of ready-to-serve model artifacts, or None while disabled"""
+    if not settings.MODEL_ARTIFACT_CACHE_ENABLED:
+        return None
+    return get_artifact_cache(settings.MODEL_ARTIFACT_CACHE_DIR)
+
+
+def get_registry() -> ModelRegistry:
+    """Get the model registry, loading the configured model on first use"""
+    cascade = None
+    if settings.CASCADE_ENABLED:
+        cascade = CascadeConfig(
+            settings.CASCADE_FAST_IMG_SIZE,
+            settings.CASCADE_CONFIDENCE_THRESHOLD,
+            settings.CASCADE_FAST_MODEL_PATH
+        )
+    return get_model_registry(
+        settings.MODEL_PATH,
+        settings.CLASS_NAMES_PATH,
+        settings.IMG_SIZE,
+        cascade,
+        warmup_batch_sizes=(1, settings.INFERENCE_MAX_BATCH_SIZE),
+        fake_latency_ms=settings.FAKE_MODEL_LATENCY_MS if settings.USE_FAKE_MODEL else None,
+        artifact_cache=get_model_artifacts()
+    )
+
+
+def get_models() -> ModelManager:
+    """Get the manager of named models, the configured model being the default"""
+    return get_model_manager(
+        settings.DEFAULT_MODEL_NAME,
+        get_registry(),
+        settings.MODELS_CONFIG_PATH,
+        settings.IMG_SIZE,
+        warmup_batch_sizes=(1, settings.INFERENCE_MAX_BATCH_SIZE),
+        memory_budget_bytes=settings.MODELS_MEMORY_BUDGET_MB * 1024 * 1024,
+        fake_latency_ms=settings.FAKE_MODEL_LATENCY_MS if settings.USE_FAKE_MODEL else None,
+        artifact_cache=get_model_artifacts()
+    )
+
+
+def get_inference_model():
+    """Get the active serving model (the cascade when enabled)"""
+    return get_registry().active.model
+
+
+def get_near_duplicates() -> Optional[NearDuplicateIndex]:
+    """Get the perceptual-hash index of recent predictions, or None while disabled"""
+    if not settings.NEAR_DUPLICATE_ENABLED:
+        return None
+    return get_near_duplicate_index(
+        settings.NEAR_DUPLICATE_MAX_ENTRIES,
+        settings.NEAR_DUPLICATE_MAX_DISTANCE,
+        settings.PREDICTION_CACHE_TOP_K
+    )
+
+
+def get_quality() -> Optional[QualityController]:
+    """Get the load-adaptive serving quality controller, or None while disabled"""
+    if not settings.ADAPTIVE_QUALITY_ENABLED:
+        return None
+    return get_quality_controller(
+        settings.adaptive_resolutions,
+        settings.ADAPTIVE_QUEUE_HIGH,
+        settings.ADAPTIVE_LATENCY_HIGH_MS,
+        settings.ADAPTIVE_STEP_DOWN_SECONDS,
+        settings.ADAPTIVE_STEP_UP_SECONDS,
+        settings.ADAPTIVE_CACHE_ONLY
+    )
+
+
+def get_inference_scheduler() -> InferenceScheduler:
+    """Get the batching scheduler in front of the served models"""
+    return get_scheduler(
+        get_models(),
+        settings.INFERENCE_MAX_BATCH_SIZE,
+        settings.INFERENCE_BATCH_WAIT_MS,
+        settings.PREPROCESS_WORKERS,
+        settings.PREPROCESS_BUFFER_POOL_SIZE,
+        get_near_duplicates(),
+        get_quality()
+    )
+
+
+def get_active_embedding_index():
+    """Get the active model's visual similarity index (None if it exposes no embeddings)"""
+    return get_version_embedding_index(get_registry().active)
+
+
+def get_version_embedding_index(version: ModelVersion):
+    """Get a model version's visual similarity index (None if it exposes no embeddings)"""
+    return get_embedding_index(
+        version.model,
+        version.version,
+        settings.EMBEDDING_INDEX_PATH,
+        settings.EMBEDDING_INDEX_DTYPE
+    )
+
+
+def get_cache() -> PredictionCache:
+    """Get the prediction cache (per worker, or shared by the node's workers)"""
+    return get_prediction_cache(
+        settings.PREDICTION_CACHE_SIZE,
+        settings.PREDICTION_CACHE_TOP_K,
+        settings.PREDICTION_CACHE_BACKEND,
+        settings.PREDICTION_CACHE_SHARED_PATH
+    )
+
+
+def get_breaker() -> CircuitBreaker:
+    """Get the circuit breaker guarding food database queries"""
+    return get_db_breaker(settings.DB_CIRCUIT_FAILURE_THRESHOLD, settings.DB_CIRCUIT_RESET_SECONDS)
+
+
+def get_db_service() -> FoodDatabaseService:
+    """Get the food database service behind the circuit breaker"""
+    return get_food_service(get_breaker())
+
+
+def get_catalog() -> FoodCatalog:
+    """Get the food catalog of pre-serialized nutrition payloads"""
+    return get_food_catalog(settings.FOOD_CATALOG_REFRESH_SECONDS, get_breaker())
+
+
+def get_admission() -> AdmissionController:
+    """Get the admission controller bounding concurrent guarded requests"""
+    return get_admission_controller(
+        settings.ADMISSION_MAX_CONCURRENT,
+        settings.ADMISSION_MAX_QUEUE,
+        settings.ADMISSION_BATCH_SHARE
+    )
+
+
+def get_limiter() -> RateLimiter:
+    """Get the per-client rate limiter"""
+    return get_rate_limiter(
+        settings.RATE_LIMIT_PER_SECOND,
+        settings.RATE_LIMIT_BURST,
+        settings.RATE_LIMIT_BACKEND,
+        settings.REDIS_URL
+    )
+
+
+def get_live_scan() -> LiveScanManager:
+    """Get the manager of live scan WebSocket sessions"""
+    return get_live_scan_manager(
+        settings.LIVE_SCAN_MAX_CONNECTIONS,
+        settings.LIVE_SCAN_MAX_FPS,
+        settings.LIVE_SCAN_SMOOTHING,
+        settings.LIVE_SCAN_STABLE_FRAMES,
+        settings.LIVE_SCAN_MIN_CONFIDENCE
+    )
+
+
+def get_budget() -> MemoryBudget:
+    """Get the memory budget guarding new work"""
+    return get_memory_budget(
+        settings.MEMORY_BUDGET_MB * 1024 * 1024,
+        settings.MEMORY_SOFT_LIMIT_RATIO,
+        settings.MEMORY_QUEUE_WAIT_MS
+    )
+
+
+def get_pred_log() -> Optional[PredictionLog]:
+    """Get the prediction log, or None while PREDICTION_LOG_ENABLED is off"""
+    if not settings.PREDICTION_LOG_ENABLED:
+        return None
+    return get_prediction_log(
+        settings.PREDICTION_LOG_SINK,
+        settings.PREDICTION_LOG_DIR,
+        engine,
+        settings.PREDICTION_LOG_FLUSH_ROWS,
+        settings.PREDICTION_LOG_FLUSH_SECONDS,
+        settings.PREDICTION_LOG_MAX_BUFFER,
+        settings.PREDICTION_LOG_MAX_WAIT_MS,
+        settings.REVIEW_DIR,
+        settings.REVIEW_CONFIDENCE_THRESHOLD,
+        settings.REVIEW_SAMPLE_RATE
+    )
@@ -1,19 +1,338 @@
 """
 Food prediction API routes
 """
-from fastapi import APIRouter, File, UploadFile, Depends, HTTPException, status
+from fastapi import APIRouter, File, Form, Query, UploadFile, Depends, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from typing import Optional
+import asyncio
 import logging
+import time
+from datetime import datetime, timezone
 
 from ..config import get_settings, get_db
-from ..models import PredictionResponse, ErrorResponse, FoodResponse
-from ..services import get_model, get_food_service
+from ..models import PredictionResponse, FoodLookupResponse, FoodResponse, ErrorResponse
+from ..services import (
+    CascadeModel,
+    CatalogEntry,
+    DatabaseUnavailableError,
+    encode_cursor,
+    decode_cursor,
+    InferenceJob,
+    InferenceOutput,
+    ModelRegistry,
+    ModelVersion,
+    DeadlineExceeded,
+    RequestCancelled,
+    ServingTier,
+    region_boxes,
+    crop_regions,
+    merge_regions,
+    sum_nutrition
+)
+from ..utils import (
+    calculate_file_hash,
+    current_request,
+    fragment,
+    FastJSONResponse,
+    log_fields,
+    logging_stats,
+    memory_stats,
+    stage,
+    startup_stats
+)
+from .dependencies import (
+    get_registry,
+    get_models,
+    get_inference_model,
+    get_inference_scheduler,
+    get_active_embedding_index,
+    get_version_embedding_index,
+    get_cache,
+    get_catalog,
+    get_breaker,
+    get_db_service,
+    get_admission,
+    get_limiter,
+    get_live_scan,
+    get_budget,
+    get_pred_log,
+    get_model_artifacts,
+    get_quality
+)
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 router = APIRouter(prefix="/api/food", tags=["Food Recognition"])
 
+# Non-standard status used by nginx for "client closed request"
+HTTP_499_CLIENT_CLOSED_REQUEST = 499
+
+MODEL_QUERY_DESCRIPTION = "Model to use (see GET /api/food/models); the default model when omitted"
+
+
+def _suggest_similar_foods(db: Session, food_name: str, output: InferenceOutput, active: ModelVersion) -> list[str]:
+    """
+    Suggest visually similar foods
+    
+    Uses the image's own embedding when available, otherwise the predicted class's
+    reference vector; falls back to fuzzy name matching against the food catalog
+    if the model has no embeddings. Searches the index of the model version that
+    served the request, so only foods that model knows are suggested.
+    """
+    index = get_version_embedding_index(active)
+    if index is not None:
+        query = output.embedding
+        if query is None or output.model_version != active.version:
+            query = index.reference_vector(food_name)
+        if query is not None:
+            matches = index.search(query, k=settings.SIMILAR_FOODS_LIMIT, exclude={food_name})
+            return [label for label, _ in matches]
+    matches = get_catalog().search_names(
+        db,
+        food_name,
+        limit=settings.SIMILAR_FOODS_LIMIT,
+        min_score=settings.SIMILAR_NAME_MIN_SCORE,
+        exclude={food_name}
+    )
+    return [name for name, _ in matches]
+
+
+def _prediction_response(
+    success: bool,
+    predicted_food: str,
+    confidence: float,
+    entry: Optional[CatalogEntry],
+    message: str,
+    suggestions: Optional[list[str]],
+    model_version: Optional[str],
+    nutrition_status: str = "ok",
+    model_name: Optional[str] = None
+) -> FastJSONResponse:
+    """
+    Assemble a PredictionResponse body around the food's pre-serialized payload
+    
+    Keys follow the PredictionResponse field order; food_data is embedded as
+    cached JSON bytes, so nothing is validated or converted per request.
+    """
+    return FastJSONResponse({
+        "success": success,
+        "predicted_food": predicted_food,
+        "confidence": confidence,
+        "food_data": entry.fragment if entry else None,
+        "message": message,
+        "suggestions": suggestions,
+        "model_version": model_version,
+        "model_name": model_name,
+        "nutrition_status": nutrition_status
+    })
+
+
+def _request_deadline(request: Request) -> float:
+    """
+    Compute the absolute deadline for a request
+    
+    Clients may send how long they are willing to wait in the timeout header;
+    otherwise the configured default applies.
+    
+    Returns:
+        Deadline as a time.monotonic() value
+    """
+    timeout_ms = settings.DEFAULT_REQUEST_TIMEOUT_MS
+    header_value = request.headers.get(settings.REQUEST_TIMEOUT_HEADER)
+    if header_value:
+        try:
+            timeout_ms = int(header_value)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"{settings.REQUEST_TIMEOUT_HEADER} must be an integer number of milliseconds"
+            )
+    timeout_ms = max(0, min(timeout_ms, settings.MAX_REQUEST_TIMEOUT_MS))
+    return time.monotonic() + timeout_ms / 1000
+
+
+async def _model_registry(model_name: Optional[str]) -> ModelRegistry:
+    """
+    Get the registry of the requested model, loading the model if needed
+    
+    Args:
+        model_name: Model name (None for the default model)
+    
+    Returns:
+        ModelRegistry with an active version
+    """
+    models = get_models()
+    if model_name is not None and model_name not in models.names():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Unknown model '{model_name}'. Available models: {', '.join(models.names())}"
+        )
+    if models.is_loaded(model_name):
+        return models.registry(model_name)
+    with stage("model_load"):
+        try:
+            return await run_in_threadpool(models.registry, model_name)
+        except Exception as e:
+            logger.error(f"Loading model {model_name} failed: {e}", exc_info=True)
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=f"Model '{model_name}' could not be loaded"
+            )
+
+
+def _serving_tier(request: Request) -> Optional[ServingTier]:
+    """
+    Get the quality tier a request is served at (None while adaptive quality is off)
+    
+    Chosen once per request, so every image of a batch upload and both
+    passes of a TTA request are served alike.
+    """
+    if hasattr(request.state, "serving_tier"):
+        return request.state.serving_tier
+    quality = get_quality()
+    tier = quality.tier() if quality is not None else None
+    request.state.serving_tier = tier
+    if tier is not None:
+        log_fields(serving_tier=tier.name)
+    return tier
+
+
+def _cache_only_rejection() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Server is overloaded and only answers for recently seen images. Please try again shortly.",
+        headers={"Retry-After": str(max(1, round(settings.ADAPTIVE_STEP_UP_SECONDS)))}
+    )
+
+
+async def _run_inference(
+    request: Request,
+    image_bytes: bytes,
+    deadline: float,
+    top_k: int = 1,
+    use_cache: bool = True,
+    model_name: Optional[str] = None,
+    views: int = 1
+) -> InferenceOutput:
+    """
+    Get an image's prediction from the cache or from batched inference
+    
+    Cached predictions are keyed by the model version and only hold the top
+    classes, so they are used only when top_k fits and carry no embedding.
+    Test-time augmented predictions (views > 1) are neither read from nor
+    written to the cache. On the same terms the scheduler may answer with
+    the prediction of a near-duplicate image (re-encoded or slightly cropped).
+    Under load the request's serving tier may run the model at a smaller input
+    size (those predictions are not cached) or allow cache hits only.
+    """
+    tier = _serving_tier(request)
+    models = get_models()
+    model_name = model_name or models.default_name
+    cache = get_cache()
+    image_hash = calculate_file_hash(image_bytes)
+    
+    if use_cache and views == 1 and top_k <= cache.top_k:
+        active = (await _model_registry(model_name)).active
+        cached = cache.get(image_hash, active.version)
+        if cached is not None:
+            probabilities = cached.dense(len(active.model.class_names))
+            return InferenceOutput(
+                probabilities,
+                model_version=cached.model_version,
+                cached=True,
+                model_name=model_name,
+                image_hash=image_hash
+            )
+    if tier is not None and tier.cache_only:
+        raise _cache_only_rejection()
+    
+    reuse = use_cache and top_k <= cache.top_k
+    img_size = tier.img_size if tier is not None else None
+    job = get_inference_scheduler().submit(image_bytes, deadline, model_name, views, reuse, img_size)
+    output = await _wait_for_job(request, job, deadline)
+    output.image_hash = image_hash
+    if output.near_duplicate_distance is not None:
+        log_fields(near_duplicate_distance=output.near_duplicate_distance)
+    reduced = img_size is not None and output.img_size == img_size
+    if reduced:
+        log_fields(input_size=output.img_size)
+    if views == 1 and not reduced:
+        cache.put(image_hash, output.model_version, output.probabilities)
+    return output
+
+
+async def _wait_for_job(request: Request, job: InferenceJob, deadline: float) -> InferenceOutput:
+    """
+    Wait for a scheduled job's output
+    
+    Stops waiting (and frees the batch slot if inference has not started)
+    when the client disconnects or the deadline passes.
+    """
+    result = asyncio.wrap_future(job.future)
+    poll_interval = settings.DISCONNECT_POLL_INTERVAL_MS / 1000
+    
+    try:
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                result.cancel()
+                raise DeadlineExceeded("Request deadline exceeded while waiting for inference")
+            
+            done, _ = await asyncio.wait({result}, timeout=min(poll_interval, remaining))
+            if done:
+                return result.result()
+            
+            if await request.is_disconnected():
+                result.cancel()
+                raise RequestCancelled("Client disconnected while waiting for inference")
+    except DeadlineExceeded as e:
+        logger.warning(f"Dropping request: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail="Request deadline exceeded. Please try again."
+        )
+    except RequestCancelled as e:
+        logger.info(f"Dropping request: {e}")
+        raise HTTPException(
+            status_code=HTTP_499_CLIENT_CLOSED_REQUEST,
+            detail="Client closed request"
+        )
+
+
+async def _log_prediction(endpoint: str, model, output: InferenceOutput, image_bytes: bytes) -> None:
+    """
+    Append a served prediction to the prediction log (when enabled)
+    
+    Only an in-memory append; the log writes to its sink in bulk in the
+    background. Waits briefly (and then drops the record) when the sink
+    has fallen behind. Logging is best effort: a failure here is logged and
+    never fails the prediction.
+    """
+    try:
+        prediction_log = get_pred_log()
+        if prediction_log is None:
+            return
+        top = model.decode_predictions(output.probabilities, top_k=settings.PREDICTION_LOG_TOP_K)
+        context = current_request()
+        await prediction_log.record({
+            "ts": datetime.now(timezone.utc),
+            "request_id": context.request_id if context else None,
+            "endpoint": endpoint,
+            "image_hash": output.image_hash or calculate_file_hash(image_bytes),
+            "model_name": output.model_name,
+            "model_version": output.model_version,
+            "predicted_food": top[0][0],
+            "confidence": top[0][1],
+            "top_foods": [name for name, _ in top],
+            "top_probabilities": [conf for _, conf in top],
+            "latency_ms": round(context.elapsed_ms(), 2) if context else 0.0,
+            "cached": output.cached,
+            "views": output.views
+        }, image_bytes)
+    except Exception as e:
+        logger.warning(f"Could not log prediction: {e}")
+
 
 @router.post(
     "/predict",
@@ -40,6 +359,10 @@ router = APIRouter(prefix="/api/food", tags=["Food Recognition"])
     ### Request:
     - **file**: Food image file (Max 10MB)
     - **Supported formats**: JPG, JPEG, PNG, WEBP
+    - **model** (query, optional): Model to use, see **GET /api/food/models**
+    - **tta** (query, optional): When the confidence is below TTA_CONFIDENCE_THRESHOLD, re-score
+      TTA_VIEWS flipped and cropped views of the image in one batched pass and average them
+      (defaults to TTA_ENABLED)
     
     ### Response:
     - **success**: Whether food was identified and found in database
@@ -48,6 +371,9 @@ router = APIRouter(prefix="/api/food", tags=["Food Recognition"])
     - **food_data**: Complete nutritional information (if found)
     - **message**: Result description
     - **suggestions**: Alternative food names (if not found)
+    - **nutrition_status**: `ok`, `stale` (database unreachable, nutrition served from
+      the last good snapshot) or `unavailable` (database unreachable and no snapshot yet;
+      the prediction is returned without nutrition data)
     
     ### Example Response (Success):
     ```json
@@ -84,10 +410,15 @@ router = APIRouter(prefix="/api/food", tags=["Food Recognition"])
     tags=["Food Recognition"]
 )
 async def predict_food(
+    request: Request,
     file: UploadFile = File(..., description="Food image file (JPG, PNG, WEBP - Max 10MB)"),
+    model_name: Optional[str] = Query(None, alias="model", description=MODEL_QUERY_DESCRIPTION),
+    tta: Optional[bool] = Query(None, description="Re-score low-confidence images with test-time augmentation (default: TTA_ENABLED)"),
     db: Session = Depends(get_db)
 ):
     try:
+        deadline = _request_deadline(request)
+        
         # Validate file type
         if not file.content_type or not file.content_type.startswith("image/"):
             raise HTTPException(
@@ -96,7 +427,8 @@ async def predict_food(
             )
         
         # Read image bytes
-        image_bytes = await file.read()
+        with stage("upload"):
+            image_bytes = await file.read()
         
         # Check file size
         if len(image_bytes) > settings.MAX_UPLOAD_SIZE:
@@ -106,20 +438,37 @@ async def predict_food(
             )
         
         # Get ML model
-        model = get_model(
-            settings.MODEL_PATH,
-            settings.CLASS_NAMES_PATH,
-            settings.IMG_SIZE
-        )
+        active = (await _model_registry(model_name)).active
+        model = active.model
         
-        # Predict food
-        logger.info(f"Predicting food from image: {file.filename}")
-        predicted_food, confidence = model.predict(image_bytes)
-        logger.info(f"Prediction: {predicted_food} with confidence {confidence:.2%}")
+        # Predict food (top 3 kept for the database fallback below)
+        log_fields(image_name=file.filename, image_bytes=len(image_bytes))
+        with stage("inference"):
+            output = await _run_inference(request, image_bytes, deadline, top_k=3, model_name=model_name)
+        top_predictions = model.decode_predictions(output.probabilities, top_k=3)
+        predicted_food, confidence = top_predictions[0]
         
-        # Get food from database
-        food_service = get_food_service()
-        food = food_service.get_food_by_name(db, predicted_food)
+        # Unsure: score flipped and cropped views together in one forward pass and average them
+        use_tta = settings.TTA_ENABLED if tta is None else tta
+        tier = _serving_tier(request)
+        if tier is not None and not tier.tta:
+            use_tta = False
+        if use_tta and settings.TTA_VIEWS > 1 and confidence < settings.TTA_CONFIDENCE_THRESHOLD:
+            with stage("tta"):
+                output = await _run_inference(
+                    request, image_bytes, deadline, top_k=3, model_name=model_name, views=settings.TTA_VIEWS
+                )
+            top_predictions = model.decode_predictions(output.probabilities, top_k=3)
+            log_fields(tta_views=output.views, confidence_before_tta=round(confidence, 4))
+            predicted_food, confidence = top_predictions[0]
+        await _log_prediction("predict", model, output, image_bytes)
+        log_fields(
+            predicted_food=predicted_food,
+            confidence=round(confidence, 4),
+            model_version=output.model_version,
+            model=output.model_name,
+            cached=output.cached
+        )
 
         if confidence < (10 / 100):
             logger.warning(f"Low confidence ({confidence:.2%}) for prediction '{predicted_food}'")
@@ -128,52 +477,83 @@ async def predict_food(
                 detail="Low confidence in food prediction. Please try with a clearer image."
             )
         
+        # Get food from the catalog snapshot of the database
+        catalog = get_catalog()
+        with stage("nutrition"):
+            food = catalog.get(db, predicted_food)
+        nutrition_status = catalog.status()
+        log_fields(nutrition_status=nutrition_status)
+        
+        if nutrition_status == "unavailable":
+            # Database down and nothing cached: answer with the prediction alone instead of waiting
+            logger.warning(f"Nutrition data unavailable, returning prediction '{predicted_food}' without it")
+            return _prediction_response(
+                success=False,
+                predicted_food=predicted_food,
+                confidence=confidence,
+                entry=None,
+                message=f"Identified {predicted_food}, but nutrition data is temporarily unavailable",
+                suggestions=None,
+                model_version=output.model_version,
+                nutrition_status=nutrition_status,
+                model_name=output.model_name
+            )
+        
         if food:
             # Food found in database
-            logger.info(f"Food '{predicted_food}' found in database")
-            return PredictionResponse(
+            log_fields(match="primary")
+            return _prediction_response(
                 success=True,
                 predicted_food=predicted_food,
                 confidence=confidence,
-                food_data=FoodResponse.model_validate(food),
-                message=f"Successfully identified {predicted_food}"
+                entry=food,
+                message=f"Successfully identified {predicted_food}",
+                suggestions=None,
+                model_version=output.model_version,
+                nutrition_status=nutrition_status,
+                model_name=output.model_name
             )
         else:
             # Food not found in database - provide suggestions
             logger.warning(f"Food '{predicted_food}' not found in database")
-            suggestions = food_service.find_similar_foods(db, predicted_food)
-            
-            # Get top 3 alternative predictions
-            top_predictions = model.get_top_predictions(image_bytes, top_k=3)
+            with stage("suggestions"):
+                suggestions = await run_in_threadpool(_suggest_similar_foods, db, predicted_food, output, active)
             
             # Check if any alternative prediction exists in database
             alternative_food = None
-            for alt_name, alt_conf in top_predictions[1:]:  # Skip first (already checked)
-                alt_food = food_service.get_food_by_name(db, alt_name)
-                if alt_food:
-                    alternative_food = alt_food
-                    predicted_food = alt_name
-                    confidence = alt_conf
-                    break
+            with stage("nutrition"):
+                for alt_name, alt_conf in top_predictions[1:]:  # Skip first (already checked)
+                    alt_food = catalog.get(db, alt_name)
+                    if alt_food:
+                        alternative_food = alt_food
+                        predicted_food = alt_name
+                        confidence = alt_conf
+                        break
             
             if alternative_food:
-                logger.info(f"Alternative food '{predicted_food}' found in database")
-                return PredictionResponse(
+                log_fields(match="alternative", matched_food=predicted_food)
+                return _prediction_response(
                     success=True,
                     predicted_food=predicted_food,
                     confidence=confidence,
-                    food_data=FoodResponse.model_validate(alternative_food),
+                    entry=alternative_food,
                     message=f"Primary prediction not found, but identified as {predicted_food}",
-                    suggestions=suggestions
+                    suggestions=suggestions,
+                    model_version=output.model_version,
+                    nutrition_status=nutrition_status,
+                    model_name=output.model_name
                 )
             else:
-                return PredictionResponse(
+                return _prediction_response(
                     success=False,
                     predicted_food=predicted_food,
                     confidence=confidence,
-                    food_data=None,
+                    entry=None,
                     message=f"Food '{predicted_food}' was identified but not found in the nutrition database",
-                    suggestions=suggestions if suggestions else None
+                    suggestions=suggestions if suggestions else None,
+                    model_version=output.model_version,
+                    nutrition_status=nutrition_status,
+                    model_name=output.model_name
                 )
     
     except HTTPException:
@@ -217,6 +597,7 @@ async def predict_food(
     ### Request:
     - **file**: Food image file (Max 10MB)
     - **top_k**: Number of predictions to return (1-10, default: 3)
+    - **model** (query, optional): Model to use, see **GET /api/food/models**
     
     ### Response Structure:
     - **success**: Operation status
@@ -273,11 +654,15 @@ async def predict_food(
     tags=["Food Recognition"]
 )
 async def predict_food_top_k(
+    request: Request,
     file: UploadFile = File(..., description="Food image file (JPG, PNG, WEBP - Max 10MB)"),
     top_k: int = 3,
+    model_name: Optional[str] = Query(None, alias="model", description=MODEL_QUERY_DESCRIPTION),
     db: Session = Depends(get_db)
 ):
     try:
+        deadline = _request_deadline(request)
+        
         # Validate file type
         if not file.content_type or not file.content_type.startswith("image/"):
             raise HTTPException(
@@ -286,37 +671,42 @@ async def predict_food_top_k(
             )
         
         # Read image bytes
-        image_bytes = await file.read()
+        with stage("upload"):
+            image_bytes = await file.read()
         
         # Get ML model
-        model = get_model(
-            settings.MODEL_PATH,
-            settings.CLASS_NAMES_PATH,
-            settings.IMG_SIZE
-        )
+        model = (await _model_registry(model_name)).active.model
         
         # Get top K predictions
-        logger.info(f"Getting top {top_k} predictions for image: {file.filename}")
-        predictions = model.get_top_predictions(image_bytes, top_k=top_k)
+        log_fields(image_name=file.filename, image_bytes=len(image_bytes), top_k=top_k)
+        with stage("inference"):
+            output = await _run_inference(request, image_bytes, deadline, top_k=top_k, model_name=model_name)
+        predictions = model.decode_predictions(output.probabilities, top_k=top_k)
+        await _log_prediction("predict-top", model, output, image_bytes)
+        log_fields(model_version=output.model_version, model=output.model_name, cached=output.cached)
         
-        # Check database for each prediction
-        food_service = get_food_service()
+        # Check the catalog snapshot of the database for each prediction
+        catalog = get_catalog()
         results = []
         
-        for food_name, conf in predictions:
-            food = food_service.get_food_by_name(db, food_name)
-            results.append({
-                "food_name": food_name,
-                "confidence": conf,
-                "in_database": food is not None,
-                "food_data": FoodResponse.model_validate(food).model_dump() if food else None
-            })
+        with stage("nutrition"):
+            for food_name, conf in predictions:
+                food = catalog.get(db, food_name)
+                results.append({
+                    "food_name": food_name,
+                    "confidence": conf,
+                    "in_database": food is not None,
+                    "food_data": food.fragment if food else None
+                })
         
-        return {
+        return FastJSONResponse({
             "success": True,
             "predictions": results,
-            "total": len(results)
-        }
+            "total": len(results),
+            "model_version": output.model_version,
+            "model_name": output.model_name,
+            "nutrition_status": catalog.status()
+        })
     
     except HTTPException:
         raise
@@ -326,3 +716,590 @@ async def predict_food_top_k(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="An error occurred during prediction"
         )
+
+
+async def _score_upload(
+    request: Request,
+    file: UploadFile,
+    deadline: float,
+    top_k: int,
+    model_name: Optional[str],
+    model
+) -> tuple[str, Optional[InferenceOutput], Optional[str]]:
+    """Run one image of a batch upload; returns (filename, output, error)"""
+    filename = file.filename or ""
+    if not file.content_type or not file.content_type.startswith("image/"):
+        return filename, None, "File must be an image"
+    image_bytes = await file.read()
+    if len(image_bytes) > settings.MAX_UPLOAD_SIZE:
+        return filename, None, "File too large"
+    try:
+        output = await _run_inference(request, image_bytes, deadline, top_k=top_k, model_name=model_name)
+    except ValueError:
+        return filename, None, "Could not decode image"
+    except HTTPException as e:
+        if e.status_code == HTTP_499_CLIENT_CLOSED_REQUEST:
+            raise
+        return filename, None, e.detail
+    await _log_prediction("predict-batch", model, output, image_bytes)
+    return filename, output, None
+
+
+@router.post(
+    "/predict-batch",
+    response_model=dict,
+    summary="Identify Food in Many Images",
+    description="""
+    ## 🖼️ Batch Food Recognition
+    
+    Score several food images in one call. All images are queued together, so they
+    share forward passes with each other (and with concurrent requests) instead of
+    paying one round trip each. Used by the Streamlit demo's gallery mode.
+    
+    ### Request:
+    - **files**: Food image files (at most MAX_BATCH_FILES, each Max 10MB)
+    - **top_k**: Number of predictions per image (1-10, default: 3)
+    - **model** (query, optional): Model to use, see **GET /api/food/models**
+    
+    ### Response:
+    - **results**: One entry per file, in upload order, with **filename**, **success** and
+      either **predictions** (as in /predict-top) or **error**
+    - **total** / **failed**: Number of images and of images that could not be scored
+    
+    Requests are admitted in the batch lane, so they cannot crowd out single-image requests.
+    """,
+    responses={
+        400: {"model": ErrorResponse, "description": "No files or too many files"},
+        500: {"model": ErrorResponse, "description": "Server error during prediction"}
+    },
+    tags=["Food Recognition"]
+)
+async def predict_food_batch(
+    request: Request,
+    files: list[UploadFile] = File(..., description="Food image files (JPG, PNG, WEBP - Max 10MB each)"),
+    top_k: int = Query(3, ge=1, le=10),
+    model_name: Optional[str] = Query(None, alias="model", description=MODEL_QUERY_DESCRIPTION),
+    db: Session = Depends(get_db)
+):
+    if len(files) > settings.MAX_BATCH_FILES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.MAX_BATCH_FILES} files per request"
+        )
+    
+    try:
+        deadline = _request_deadline(request)
+        model = (await _model_registry(model_name)).active.model
+        
+        log_fields(images=len(files), top_k=top_k)
+        with stage("inference"):
+            scored = await asyncio.gather(
+                *(_score_upload(request, file, deadline, top_k, model_name, model) for file in files)
+            )
+        
+        catalog = get_catalog()
+        results = []
+        model_version = None
+        with stage("nutrition"):
+            for filename, output, error in scored:
+                if output is None:
+                    results.append({"filename": filename, "success": False, "error": error})
+                    continue
+                model_version = model_version or output.model_version
+                predictions = []
+                for food_name, conf in model.decode_predictions(output.probabilities, top_k=top_k):
+                    food = catalog.get(db, food_name)
+                    predictions.append({
+                        "food_name": food_name,
+                        "confidence": conf,
+                        "in_database": food is not None,
+                        "food_data": food.fragment if food else None
+                    })
+                results.append({"filename": filename, "success": True, "predictions": predictions})
+        
+        failed = sum(1 for result in results if not result["success"])
+        log_fields(failed=failed, model_version=model_version, model=model_name)
+        return FastJSONResponse({
+            "success": True,
+            "results": results,
+            "total": len(results),
+            "failed": failed,
+            "model_version": model_version,
+            "model_name": model_name or get_models().default_name,
+            "nutrition_status": catalog.status()
+        })
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Batch prediction error: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An error occurred during prediction"
+        )
+
+
+@router.post(
+    "/predict-plate",
+    response_model=dict,
+    summary="Identify Every Food on a Plate",
+    description="""
+    ## 🍱 Multi-Food Plate Analysis
+    
+    A meal photo often shows several foods (rice, chicken and salad together) while
+    /predict names one. This endpoint scores the whole photo plus a grid of overlapping
+    windows, all in a single forward pass, and merges the windows into a list of foods.
+    
+    ### How it works:
+    1. **Regions**: The photo is decoded once and cut into the whole image plus
+       PLATE_GRID x PLATE_GRID overlapping windows
+    2. **One Batch**: All regions are scored together, so the latency is close to one
+       /predict call rather than one per region
+    3. **Merge**: Regions below PLATE_MIN_CONFIDENCE are dropped; overlapping regions
+       naming the same food become one item
+    4. **Nutrition**: Each food is looked up and the values of the foods found are summed
+    
+    ### Request:
+    - **file**: Food image file (Max 10MB)
+    - **model** (query, optional): Model to use, see **GET /api/food/models**
+    
+    ### Response:
+    - **foods**: Foods by confidence, each with **food_name**, **confidence**, **regions**
+      (number of merged windows), **box** (left, top, right, bottom as fractions of the
+      image), **in_database** and **food_data**
+    - **total_nutrition**: Sum of the foods' nutrition values, per 100 g of each food
+      (portion sizes are not estimated)
+    - **missing_nutrition**: Foods without nutrition data, left out of the total
+    - **regions**: Number of regions scored
+    
+    Plates are scored at full resolution in every serving tier but the cache-only one,
+    where they are refused with 503.
+    """,
+    responses={
+        400: {"model": ErrorResponse, "description": "Invalid file format or undecodable image"},
+        500: {"model": ErrorResponse, "description": "Server error during prediction"}
+    },
+    tags=["Food Recognition"]
+)
+async def predict_plate(
+    request: Request,
+    file: UploadFile = File(..., description="Meal photo (JPG, PNG, WEBP - Max 10MB)"),
+    model_name: Optional[str] = Query(None, alias="model", description=MODEL_QUERY_DESCRIPTION),
+    db: Session = Depends(get_db)
+):
+    try:
+        deadline = _request_deadline(request)
+        
+        if not file.content_type or not file.content_type.startswith("image/"):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="File must be an image"
+            )
+        
+        with stage("upload"):
+            image_bytes = await file.read()
+        if len(image_bytes) > settings.MAX_UPLOAD_SIZE:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"File size exceeds maximum allowed size of {settings.MAX_UPLOAD_SIZE / (1024*1024)}MB"
+            )
+        
+        # Plates always run at full resolution; with no cached answer they are refused in the cache-only tier
+        tier = _serving_tier(request)
+        if tier is not None and tier.cache_only:
+            raise _cache_only_rejection()
+        
+        model = (await _model_registry(model_name)).active.model
+        boxes = region_boxes(settings.PLATE_GRID, settings.PLATE_WINDOW)
+        log_fields(image_name=file.filename, image_bytes=len(image_bytes), regions=len(boxes))
+        
+        with stage("preprocess"):
+            regions = await run_in_threadpool(crop_regions, image_bytes, model.img_size, boxes)
+        with stage("inference"):
+            job = get_inference_scheduler().submit_regions(regions, deadline, model_name)
+            output = await _wait_for_job(request, job, deadline)
+        items = merge_regions(
+            output.probabilities,
+            boxes,
+            model.class_names,
+            settings.PLATE_MIN_CONFIDENCE,
+            settings.PLATE_MAX_ITEMS
+        )
+        log_fields(
+            foods=[item.food_name for item in items],
+            model_version=output.model_version,
+            model=output.model_name
+        )
+        
+        catalog = get_catalog()
+        foods = []
+        nutrition = []
+        missing = []
+        with stage("nutrition"):
+            for item in items:
+                food = catalog.get(db, item.food_name)
+                if food is None:
+                    missing.append(item.food_name)
+                nutrition.append(food.nutrition if food else None)
+                foods.append({
+                    "food_name": item.food_name,
+                    "confidence": item.confidence,
+                    "regions": item.regions,
+                    "box": [round(value, 3) for value in item.box],
+                    "in_database": food is not None,
+                    "food_data": food.fragment if food else None
+                })
+        
+        return FastJSONResponse({
+            "success": bool(foods),
+            "message": f"Identified {len(foods)} food(s)" if foods else "No food recognized with enough confidence",
+            "foods": foods,
+            "total_nutrition": sum_nutrition(nutrition),
+            "nutrition_basis": "per 100 g of each food",
+            "missing_nutrition": missing,
+            "regions": len(boxes),
+            "model_version": output.model_version,
+            "model_name": output.model_name,
+            "nutrition_status": catalog.status()
+        })
+    
+    except HTTPException:
+        raise
+    except ValueError as e:
+        logger.error(f"Validation error: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        logger.error(f"Plate analysis error: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An error occurred during plate analysis"
+        )
+
+
+@router.get(
+    "/lookup",
+    response_model=FoodLookupResponse,
+    summary="Bulk Nutrition Lookup",
+    description="""
+    ## 🍽️ Resolve Several Foods in One Request
+    
+    Look up nutritional information for a whole meal with a single database query.
+    
+    ### Request:
+    - **names**: Comma-separated food names, e.g. `?names=apple,banana,rice`
+      (case-insensitive, at most 100 names)
+    
+    ### Response:
+    - **foods**: Object keyed by each normalized (lowercase, trimmed) name, with the
+      food's nutrition data or `null` if it is not in the database
+    - **found**: Number of names found
+    - **missing**: Names that were not found
+    
+    ### Example Response:
+    ```json
+    {
+      "success": true,
+      "foods": {
+        "apple": {"id": 4, "name": "apple", "calories": 52, "protein": 0.3, ...},
+        "dragon fruit": null
+      },
+      "found": 1,
+      "missing": ["dragon fruit"]
+    }
+    ```
+    """,
+    responses={
+        400: {"model": ErrorResponse, "description": "No names or too many names"},
+        503: {"model": ErrorResponse, "description": "Nutrition database temporarily unavailable"}
+    },
+    tags=["Food Recognition"]
+)
+async def lookup_foods(
+    names: str = Query(..., description="Comma-separated food names"),
+    db: Session = Depends(get_db)
+):
+    # Normalize once, dropping blanks and duplicates while keeping the request order
+    requested = list(dict.fromkeys(
+        name.strip().lower() for name in names.split(",") if name.strip()
+    ))
+    if not requested:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="At least one food name is required"
+        )
+    if len(requested) > settings.FOOD_LOOKUP_MAX_NAMES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.FOOD_LOOKUP_MAX_NAMES} names can be looked up at once"
+        )
+    
+    try:
+        found = await run_in_threadpool(get_db_service().get_foods_by_names, db, requested)
+    except DatabaseUnavailableError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Nutrition database is temporarily unavailable",
+            headers={"Retry-After": str(max(1, round(e.retry_after)))}
+        )
+    return FoodLookupResponse(
+        success=True,
+        foods={
+            name: FoodResponse.model_validate(found[name]) if name in found else None
+            for name in requested
+        },
+        found=len(found),
+        missing=[name for name in requested if name not in found]
+    )
+
+
+@router.get(
+    "/search",
+    response_model=dict,
+    summary="Autocomplete Food Search",
+    description="""
+    ## ⌨️ Type-Ahead Search over Food Names
+    
+    Returns foods whose name, or any later word of it, starts with the typed text.
+    Answered from the in-memory food catalog, not the database.
+    
+    ### Request:
+    - **q**: Typed text (case-insensitive; underscores and spaces are equivalent)
+    - **limit**: Page size (1-20, default: 10)
+    - **cursor**: `next_cursor` from the previous page
+    
+    ### Ordering:
+    Foods whose full name matches come first, then foods matched by a later word
+    ("pie" finds "apple pie"); each group is alphabetical. Pages continue after the
+    last returned food, so results never repeat or skip when paging.
+    
+    ### Example Response:
+    ```json
+    {
+      "success": true,
+      "query": "ch",
+      "results": [
+        {"food_name": "cheesecake", "food_data": {"id": 14, "calories": 321, ...}},
+        {"food_name": "chicken_wings", "food_data": {"id": 15, "calories": 203, ...}}
+      ],
+      "total": 2,
+      "next_cursor": "WzAsICJjaGlja2VuIHdpbmdzIiwgMTVd"
+    }
+    ```
+    """,
+    responses={
+        400: {"model": ErrorResponse, "description": "Invalid cursor"}
+    },
+    tags=["Food Recognition"]
+)
+async def autocomplete_foods(
+    q: str = Query(..., min_length=1, description="Typed text"),
+    limit: int = Query(10, ge=1, le=settings.FOOD_SEARCH_MAX_LIMIT, description="Page size"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    db: Session = Depends(get_db)
+):
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    entries, next_key = get_catalog().autocomplete(db, q, limit=limit, after=after)
+    results = [{"food_name": entry.name, "food_data": entry.fragment} for entry in entries]
+    return FastJSONResponse({
+        "success": True,
+        "query": q,
+        "results": results,
+        "total": len(results),
+        "next_cursor": encode_cursor(next_key) if next_key else None
+    })
+
+
+@router.get(
+    "/suggest",
+    response_model=dict,
+    summary="Fuzzy Food Search",
+    description="""
+    ## 🔎 Search Foods by Name, Tolerating Typos
+    
+    Ranks food names by character n-gram similarity to free text, so misspellings and
+    variants still match ("cinabon" finds "cinnamon roll").
+    
+    ### Request:
+    - **q**: Search text
+    - **limit**: Maximum number of results (1-20, default: 5)
+    
+    ### Example Response:
+    ```json
+    {
+      "success": true,
+      "query": "chiken",
+      "results": [
+        {"food_name": "chicken", "score": 0.5},
+        {"food_name": "chicken wings", "score": 0.33}
+      ],
+      "total": 2
+    }
+    ```
+    """,
+    tags=["Food Recognition"]
+)
+async def suggest_foods(
+    q: str = Query(..., min_length=1, description="Search text"),
+    limit: int = Query(5, ge=1, le=settings.FOOD_SEARCH_MAX_LIMIT, description="Maximum number of results"),
+    db: Session = Depends(get_db)
+):
+    matches = get_catalog().search_names(db, q, limit=limit, min_score=settings.SIMILAR_NAME_MIN_SCORE)
+    results = [{"food_name": name, "score": round(score, 4)} for name, score in matches]
+    return {
+        "success": True,
+        "query": q,
+        "results": results,
+        "total": len(results)
+    }
+
+
+@router.post(
+    "/confirm",
+    response_model=dict,
+    summary="Confirm a Food Image",
+    description="""
+    ## ✅ Add a User-Confirmed Image to Visual Similarity
+    
+    Record that an image shows a given food. The image's embedding is added to the
+    in-memory visual similarity index, so later "similar foods" suggestions are
+    grounded in real photos as well as the model's class references.
+    
+    ### Request:
+    - **file**: Food image file (Max 10MB)
+    - **food_name**: Confirmed food name (a model class or a food in the database)
+    """,
+    responses={
+        400: {"model": ErrorResponse, "description": "Invalid file or unknown food"},
+        503: {"model": ErrorResponse, "description": "Image embeddings unavailable"}
+    },
+    tags=["Food Recognition"]
+)
+async def confirm_food(
+    request: Request,
+    file: UploadFile = File(..., description="Food image file (JPG, PNG, WEBP - Max 10MB)"),
+    food_name: str = Form(..., description="Confirmed food name"),
+    db: Session = Depends(get_db)
+):
+    deadline = _request_deadline(request)
+    
+    if not file.content_type or not file.content_type.startswith("image/"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="File must be an image"
+        )
+    
+    image_bytes = await file.read()
+    if len(image_bytes) > settings.MAX_UPLOAD_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"File size exceeds maximum allowed size of {settings.MAX_UPLOAD_SIZE / (1024*1024)}MB"
+        )
+    
+    # Index under the model's class name when possible so labels line up with predictions
+    model = get_inference_model()
+    label = food_name.strip().lower().replace(" ", "_")
+    if label not in model.class_names:
+        food = get_catalog().get(db, food_name)
+        if food is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unknown food '{food_name}'"
+            )
+        label = food.name
+    
+    index = get_active_embedding_index()
+    if index is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Image embeddings are not available for the current model"
+        )
+    
+    try:
+        output = await _run_inference(request, image_bytes, deadline, use_cache=False)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if output.embedding is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Image embeddings are not available for the current model"
+        )
+    
+    index.add(label, output.embedding)
+    logger.info(f"Indexed confirmed image for '{label}' ({len(index)} vectors)")
+    return {
+        "success": True,
+        "food_name": label,
+        "indexed_vectors": len(index)
+    }
+
+
+@router.get(
+    "/models",
+    response_model=dict,
+    summary="List Available Models",
+    description="Models that can be passed as `model` to the prediction routes, the default first. Models other than the default are loaded on first use and may be unloaded again when idle.",
+    tags=["Food Recognition"]
+)
+async def list_models():
+    stats = get_models().stats()
+    return {
+        "default_model": stats["default_model"],
+        "models": [
+            {"name": m["name"], "loaded": m["loaded"], "version": m["version"]}
+            for m in stats["models"]
+        ]
+    }
+
+
+@router.get(
+    "/metrics",
+    response_model=dict,
+    summary="Inference Scheduler Metrics",
+    description="Active model version, the served models with their load state and approximate memory, counters for submitted, completed, expired, cancelled and failed inference work, the current queue depth, prediction cache hit rate, near-duplicate reuses with the perceptual-hash index hit rate (when enabled), the serving quality tier with its load signals and requests per tier (when adaptive quality is enabled), the food catalog size and freshness, the database circuit breaker state, queued and dropped log records, buffered, written and dropped prediction log records (when enabled), running and queued requests per priority lane with admission rejections, per-client rate limit rejections, open live scan connections with their frame drop rate, process memory (RSS, heap and TensorFlow allocator usage, per-stage growth and the memory budget state), start-up timings (seconds from process start to model ready and to the first prediction, with model artifact cache hits), the cascade escalation rate (when enabled) and the size of the visual similarity index.",
+    tags=["Monitoring"]
+)
+async def get_inference_metrics():
+    registry = get_registry()
+    model = registry.active.model
+    metrics = {
+        "success": True,
+        "model": registry.status(),
+        "models": get_models().stats(),
+        "scheduler": get_inference_scheduler().stats(),
+        "prediction_cache": get_cache().stats(),
+        "food_catalog": get_catalog().stats(),
+        "database_circuit": get_breaker().stats(),
+        "logging": logging_stats(),
+        "admission": get_admission().stats(),
+        "live_scan": get_live_scan().stats(),
+        "memory": {**memory_stats(), "budget": get_budget().stats()}
+    }
+    quality = get_quality()
+    if quality is not None:
+        metrics["quality"] = quality.stats()
+    prediction_log = get_pred_log()
+    if prediction_log is not None:
+        metrics["prediction_log"] = prediction_log.stats()
+    metrics["startup"] = startup_stats()
+    artifacts = get_model_artifacts()
+    if artifacts is not None:
+        metrics["startup"]["artifact_cache"] = artifacts.stats()
+    if settings.RATE_LIMIT_ENABLED:
+        metrics["rate_limit"] = get_limiter().stats()
+    if isinstance(model, CascadeModel):
+        metrics["cascade"] = model.stats()
+    index = get_active_embedding_index()
+    if index is not None:
+        metrics["embedding_index"] = {
+            "vectors": len(index),
+            "labels": len(index.labels),
+            "dtype": str(index.dtype)
+        }
+    return metrics
@@ -0,0 +1,199 @@
+"""
+Live scan WebSocket: continuous camera frames in, smoothed predictions out
+"""
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
+from typing import Optional
+import asyncio
+import json
+import logging
+import time
+
+from ..config import get_settings
+from ..config.database import SessionLocal
+from ..services import DeadlineExceeded, LiveScanSession
+from ..utils import dumps
+from .dependencies import get_budget, get_catalog, get_inference_scheduler, get_live_scan, get_models
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+router = APIRouter(prefix="/api/food", tags=["Live Scan"])
+
+# WebSocket close codes
+WS_POLICY_VIOLATION = 1008
+WS_MESSAGE_TOO_BIG = 1009
+WS_INTERNAL_ERROR = 1011
+WS_TRY_AGAIN_LATER = 1013
+
+
+async def _receive_frames(websocket: WebSocket, session: LiveScanSession) -> None:
+    """
+    Read client messages into the session until the client goes away
+
+    Binary messages are frames; text messages are JSON commands
+    ({"type": "reset"} restarts smoothing). An oversized frame closes the
+    connection with code 1009.
+    """
+    try:
+        while not session.closed:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            frame = message.get("bytes")
+            if frame is not None:
+                if len(frame) > settings.LIVE_SCAN_MAX_FRAME_BYTES:
+                    logger.warning(f"Live scan frame of {len(frame)} bytes exceeds the limit, closing")
+                    session.close(WS_MESSAGE_TOO_BIG)
+                    break
+                session.offer(frame)
+            elif message.get("text"):
+                try:
+                    command = json.loads(message["text"])
+                except ValueError:
+                    continue
+                if isinstance(command, dict) and command.get("type") == "reset":
+                    session.reset()
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        session.close(session.close_code)
+
+
+def _nutrition_message(food_name: str, confidence: float, model_version: str) -> dict:
+    """Look up the stable prediction in the food catalog"""
+    catalog = get_catalog()
+    db = SessionLocal()
+    try:
+        entry = catalog.get(db, food_name)
+    finally:
+        db.close()
+    return {
+        "type": "result",
+        "food_name": food_name,
+        "confidence": round(confidence, 4),
+        "food_data": entry.fragment if entry else None,
+        "nutrition_status": catalog.status(),
+        "model_version": model_version
+    }
+
+
+@router.websocket("/live-scan")
+async def live_scan(websocket: WebSocket, model: Optional[str] = None):
+    """
+    Stream camera frames and receive smoothed predictions
+
+    The client sends downscaled JPEG/PNG/WEBP frames as binary messages, as
+    fast as it likes. The server keeps only the newest frame, runs at most
+    LIVE_SCAN_MAX_FPS of them per second through the shared batching
+    scheduler (so frames from all connected clients share forward passes) and
+    answers each processed frame with a "scan" message:
+
+        {"type": "scan", "food_name": "pho", "confidence": 0.71, "stable": false,
+         "frames": {"received": 40, "processed": 12, "dropped": 28, "failed": 0, "drop_rate": 0.7}}
+
+    Once the smoothed prediction has held for LIVE_SCAN_STABLE_FRAMES frames
+    with at least LIVE_SCAN_MIN_CONFIDENCE, a "result" message with the
+    food's nutrition follows (once per stable food, until it changes or the
+    client sends {"type": "reset"}). The optional `model` query parameter
+    picks a model from GET /api/food/models; an unknown one closes the
+    connection with code 1008.
+    """
+    models = get_models()
+    if model is not None and model not in models.names():
+        await websocket.close(code=WS_POLICY_VIOLATION, reason=f"Unknown model '{model}'")
+        return
+    # Named like HTTP jobs, so live frames batch with them
+    model = model or models.default_name
+
+    if get_budget().state() == "over":
+        logger.warning("Live scan connection rejected: over the memory budget")
+        await websocket.close(code=WS_TRY_AGAIN_LATER, reason="Server low on memory, retry later")
+        return
+
+    manager = get_live_scan()
+    session = manager.open()
+    if session is None:
+        logger.warning("Live scan connection rejected: too many open connections")
+        await websocket.close(code=WS_TRY_AGAIN_LATER, reason="Too many live scans, retry later")
+        return
+
+    await websocket.accept()
+    started = time.monotonic()
+    receiver = asyncio.create_task(_receive_frames(websocket, session))
+    scheduler = get_inference_scheduler()
+    frame_timeout = settings.LIVE_SCAN_FRAME_TIMEOUT_MS / 1000
+
+    try:
+        class_names = (await run_in_threadpool(models.registry, model)).active.model.class_names
+        while True:
+            frame = await session.next_frame()
+            if frame is None:
+                break
+
+            # Anything a single frame breaks is reported to the client; only
+            # a failed send (the client is gone) ends the scan
+            try:
+                job = scheduler.submit(frame, time.monotonic() + frame_timeout, model)
+                output = await asyncio.wrap_future(job.future)
+            except DeadlineExceeded:
+                session.dropped += 1
+                continue
+            except ValueError:
+                session.failed += 1
+                await websocket.send_text(dumps({"type": "error", "detail": "Could not decode frame"}).decode())
+                continue
+            except Exception as e:
+                session.failed += 1
+                logger.exception(f"Live scan inference failed: {e}")
+                await websocket.send_text(dumps({"type": "error", "detail": "Could not process frame"}).decode())
+                continue
+            session.processed += 1
+
+            try:
+                if len(output.probabilities) != len(class_names):
+                    # A new model version was activated mid-scan
+                    class_names = (await run_in_threadpool(models.registry, model)).active.model.class_names
+                    session.reset()
+                top, confidence, stable = session.smoother.update(output.probabilities)
+                food_name = class_names[top]
+            except Exception as e:
+                logger.exception(f"Live scan could not read prediction: {e}")
+                await websocket.send_text(dumps({"type": "error", "detail": "Could not process frame"}).decode())
+                continue
+
+            await websocket.send_text(dumps({
+                "type": "scan",
+                "food_name": food_name,
+                "confidence": round(confidence, 4),
+                "stable": stable,
+                "frames": session.stats()
+            }).decode())
+
+            if stable and session.reported != food_name:
+                try:
+                    message = await run_in_threadpool(_nutrition_message, food_name, confidence, output.model_version)
+                except Exception as e:
+                    # Not marked reported, so the lookup is retried on the next stable frame
+                    logger.exception(f"Live scan nutrition lookup failed for {food_name}: {e}")
+                    message = {"type": "error", "detail": "Could not look up nutrition"}
+                else:
+                    session.reported = food_name
+                await websocket.send_text(dumps(message).decode())
+    except (WebSocketDisconnect, RuntimeError):
+        session.close()
+    except Exception as e:
+        logger.exception(f"Live scan failed: {e}")
+        session.close(WS_INTERNAL_ERROR)
+    finally:
+        session.close(session.close_code)
+        receiver.cancel()
+        manager.close(session)
+        if session.close_code != 1000:
+            try:
+                await websocket.close(code=session.close_code)
+            except RuntimeError:
+                pass
+        logger.info(
+            f"Live scan ended after {time.monotonic() - started:.1f}s",
+            extra={"frames": session.stats(), "reported": session.reported}
+        )
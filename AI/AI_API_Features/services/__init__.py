@@ -1,10 +1,117 @@
 """Services module"""
-from .ml_service import FoodRecognitionModel, get_model
-from .db_service import FoodDatabaseService, get_food_service
+from .ml_service import FoodRecognitionModel
+from .fake_model import FakeFoodModel
+from .cascade import CascadeModel, CascadeConfig
+from .model_registry import ModelRegistry, ModelVersion, get_model_registry, get_model
+from .artifact_cache import ArtifactCache, get_artifact_cache, shutdown_artifact_cache
+from .model_manager import ModelManager, ModelSpec, load_model_specs, get_model_manager
+from .prediction_cache import PredictionCache, get_prediction_cache
+from .shared_cache import SharedPredictionCache
+from .near_duplicate import NearDuplicateIndex, dhash, get_near_duplicate_index
+from .circuit_breaker import CircuitBreaker, CircuitOpenError, get_db_breaker
+from .db_service import FoodDatabaseService, DatabaseUnavailableError, get_food_service
+from .food_catalog import FoodCatalog, CatalogEntry, get_food_catalog, shutdown_food_catalog
+from .name_index import NGramIndex, PrefixIndex, encode_cursor, decode_cursor
+from .hash_ring import ConsistentHashRing, Backend, BackendPool
+from .memory_budget import MemoryBudget, get_memory_budget
+from .live_scan import PredictionSmoother, LiveScanSession, LiveScanManager, get_live_scan_manager
+from .tta import augment_views, average_views, TTA_TRANSFORMS
+from .plate import PlateItem, region_boxes, crop_regions, merge_regions, sum_nutrition
+from .quality import ServingTier, QualityController, build_tiers, get_quality_controller
+from .prediction_log import (
+    PredictionLog,
+    PredictionSink,
+    JSONLSink,
+    ParquetSink,
+    DatabaseSink,
+    ReviewStore,
+    get_prediction_log,
+    shutdown_prediction_log
+)
+from .embedding_index import EmbeddingIndex, get_embedding_index, save_embedding_index
+from .scheduler import (
+    InferenceScheduler,
+    InferenceJob,
+    InferenceOutput,
+    DeadlineExceeded,
+    RequestCancelled,
+    get_scheduler,
+    shutdown_scheduler
+)
 
 __all__ = [
     "FoodRecognitionModel",
+    "FakeFoodModel",
+    "CascadeModel",
+    "CascadeConfig",
+    "ModelRegistry",
+    "ModelVersion",
+    "get_model_registry",
     "get_model",
+    "ArtifactCache",
+    "get_artifact_cache",
+    "shutdown_artifact_cache",
+    "ModelManager",
+    "ModelSpec",
+    "load_model_specs",
+    "get_model_manager",
+    "PredictionCache",
+    "get_prediction_cache",
+    "SharedPredictionCache",
+    "NearDuplicateIndex",
+    "dhash",
+    "get_near_duplicate_index",
+    "CircuitBreaker",
+    "CircuitOpenError",
+    "get_db_breaker",
     "FoodDatabaseService",
-    "get_food_service"
+    "DatabaseUnavailableError",
+    "get_food_service",
+    "FoodCatalog",
+    "CatalogEntry",
+    "get_food_catalog",
+    "shutdown_food_catalog",
+    "NGramIndex",
+    "PrefixIndex",
+    "encode_cursor",
+    "decode_cursor",
+    "ConsistentHashRing",
+    "Backend",
+    "BackendPool",
+    "MemoryBudget",
+    "get_memory_budget",
+    "PredictionSmoother",
+    "LiveScanSession",
+    "LiveScanManager",
+    "get_live_scan_manager",
+    "augment_views",
+    "average_views",
+    "TTA_TRANSFORMS",
+    "PlateItem",
+    "region_boxes",
+    "crop_regions",
+    "merge_regions",
+    "sum_nutrition",
+    "ServingTier",
+    "QualityController",
+    "build_tiers",
+    "get_quality_controller",
+    "PredictionLog",
+    "PredictionSink",
+    "JSONLSink",
+    "ParquetSink",
+    "DatabaseSink",
+    "ReviewStore",
+    "get_prediction_log",
+    "shutdown_prediction_log",
+    "EmbeddingIndex",
+    "get_embedding_index",
+    "save_embedding_index",
+    "InferenceScheduler",
+    "InferenceJob",
+    "InferenceOutput",
+    "DeadlineExceeded",
+    "RequestCancelled",
+    "get_scheduler",
+    "shutdown_scheduler"
 ]
@@ -0,0 +1,223 @@
+"""
+On-disk cache of ready-to-serve model artifacts, so restarts skip model rebuilding and graph tracing
+"""
+import json
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Any, Optional
+import logging
+
+import tensorflow as tf
+from tensorflow import keras
+
+from .model_registry import model_checksum
+
+logger = logging.getLogger(__name__)
+
+SERVING_DIR = "serving"
+KERAS_FILE = "model.keras"
+META_FILE = "meta.json"
+
+
+class ArtifactCache:
+    """
+    Ready-to-serve model artifacts keyed by model file checksum and TensorFlow version
+
+    An entry holds the inference model (class probabilities and embeddings)
+    exported as a SavedModel whose serving function is traced once for any
+    batch size, the full Keras model (for weight access, loaded only when
+    needed) and a small metadata file. Entries are written to a temporary
+    directory and renamed into place, so a crash mid-export never leaves a
+    half-written entry behind. A TensorFlow or Keras upgrade, a changed model
+    file or another input size all map to a new key.
+    """
+
+    def __init__(self, directory: Path):
+        """
+        Initialize the cache
+
+        Args:
+            directory: Folder holding one sub-folder per artifact
+        """
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._storing: set[str] = set()
+        self._threads: list[threading.Thread] = []
+        self._checksums: dict[tuple[str, int, int], str] = {}
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "store_errors": 0, "last_load_seconds": None}
+
+    def key(self, model_path: Path, img_size: int) -> str:
+        """Cache key of a model file at an input size under the running TensorFlow"""
+        stat = model_path.stat()
+        file_id = (str(model_path), stat.st_size, stat.st_mtime_ns)
+        checksum = self._checksums.get(file_id)
+        if checksum is None:
+            checksum = self._checksums[file_id] = model_checksum(model_path)
+        return f"{checksum[:16]}-{img_size}px-tf{tf.__version__}-keras{keras.__version__}"
+
+    def load(self, model_path: Path, img_size: int) -> Optional[tuple[Any, dict, Path]]:
+        """
+        Load a cached artifact
+
+        Args:
+            model_path: Original model file
+            img_size: Model input size
+
+        Returns:
+            (restored SavedModel, metadata, path of the saved Keras model),
+            or None on a miss; unreadable entries are removed and count as misses
+        """
+        entry = self.directory / self.key(model_path, img_size)
+        if not (entry / META_FILE).exists():
+            with self._lock:
+                self._stats["misses"] += 1
+            return None
+
+        started = time.perf_counter()
+        try:
+            with open(entry / META_FILE, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            serving = tf.saved_model.load(str(entry / SERVING_DIR))
+        except Exception as e:
+            logger.warning(f"Discarding unreadable model artifact {entry.name}: {e}")
+            shutil.rmtree(entry, ignore_errors=True)
+            with self._lock:
+                self._stats["misses"] += 1
+            return None
+
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self._stats["hits"] += 1
+            self._stats["last_load_seconds"] = round(elapsed, 3)
+        logger.info(f"Loaded cached model artifact {entry.name} in {elapsed:.1f}s")
+        return serving, meta, entry / KERAS_FILE
+
+    def store(self, model_path: Path, img_size: int, model: keras.Model, inference_model: Optional[keras.Model]) -> bool:
+        """
+        Export a loaded model as a cache entry
+
+        Args:
+            model_path: Original model file
+            img_size: Model input size
+            model: Loaded Keras model
+            inference_model: Model returning [probabilities, embeddings], or None
+
+        Returns:
+            True if the entry was written (or already existed)
+        """
+        key = self.key(model_path, img_size)
+        entry = self.directory / key
+        with self._lock:
+            if key in self._storing or entry.exists():
+                return True
+            self._storing.add(key)
+
+        started = time.perf_counter()
+        tmp = self.directory / f".{key}.tmp"
+        try:
+            shutil.rmtree(tmp, ignore_errors=True)
+            tmp.mkdir(parents=True)
+            serving_model = inference_model or model
+            archive = keras.export.ExportArchive()
+            archive.track(serving_model)
+            archive.add_endpoint(
+                "serve",
+                serving_model.call,
+                input_signature=[tf.TensorSpec((None, img_size, img_size, 3), tf.float32)]
+            )
+            archive.write_out(str(tmp / SERVING_DIR), verbose=False)
+            model.save(str(tmp / KERAS_FILE))
+            meta = {
+                "model_path": str(model_path),
+                "img_size": img_size,
+                "embedding_dim": int(inference_model.outputs[1].shape[-1]) if inference_model is not None else None,
+                "tensorflow": tf.__version__,
+                "keras": keras.__version__,
+                "created": time.time(),
+            }
+            with open(tmp / META_FILE, "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+            tmp.rename(entry)
+        except Exception as e:
+            logger.warning(f"Could not cache model artifact for {model_path.name}: {e}")
+            shutil.rmtree(tmp, ignore_errors=True)
+            with self._lock:
+                self._stats["store_errors"] += 1
+            return False
+        finally:
+            with self._lock:
+                self._storing.discard(key)
+
+        with self._lock:
+            self._stats["stores"] += 1
+        logger.info(f"Cached model artifact {key} in {time.perf_counter() - started:.1f}s")
+        return True
+
+    def store_async(self, model_path: Path, img_size: int, model: keras.Model, inference_model: Optional[keras.Model]) -> None:
+        """Export a cache entry on a background thread (tracing takes a while and is not needed to serve)"""
+        thread = threading.Thread(
+            target=self.store,
+            args=(model_path, img_size, model, inference_model),
+            name="artifact-cache-store",
+            daemon=True
+        )
+        with self._lock:
+            self._threads = [t for t in self._threads if t.is_alive()] + [thread]
+        thread.start()
+
+    def wait(self, timeout: float = 60.0) -> bool:
+        """
+        Wait for background exports to finish
+
+        TensorFlow aborts the process if it exits while an export is still
+        tracing, so shutdown waits for running exports first.
+
+        Args:
+            timeout: Seconds to wait in total
+
+        Returns:
+            False if an export was still running at the timeout
+        """
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            threads = list(self._threads)
+        for thread in threads:
+            if thread.is_alive():
+                logger.info("Waiting for the model artifact export to finish")
+            thread.join(max(deadline - time.monotonic(), 0))
+        return not any(thread.is_alive() for thread in threads)
+
+    def stats(self) -> dict:
+        """Get hit, miss and store counters and the cached entries"""
+        with self._lock:
+            stats = dict(self._stats)
+        entries = sorted(p.name for p in self.directory.glob("*") if (p / META_FILE).exists()) if self.directory.exists() else []
+        return {**stats, "directory": str(self.directory), "entries": entries}
+
+
+# Global cache instance (singleton pattern)
+_cache_instance: Optional[ArtifactCache] = None
+
+
+def shutdown_artifact_cache(timeout: float = 60.0) -> None:
+    """Let running background exports of the global artifact cache finish"""
+    if _cache_instance is not None and not _cache_instance.wait(timeout):
+        logger.warning("Model artifact export still running at shutdown")
+
+
+def get_artifact_cache(directory: Path) -> ArtifactCache:
+    """
+    Get or create the global model artifact cache
+
+    Args:
+        directory: Folder holding the artifacts
+
+    Returns:
+        ArtifactCache instance
+    """
+    global _cache_instance
+    if _cache_instance is None:
+        _cache_instance = ArtifactCache(directory)
+    return _cache_instance
@@ -0,0 +1,192 @@
+"""
+Confidence-gated model cascade: a cheap model first, the full model only when needed
+"""
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Tuple
+import logging
+
+import numpy as np
+import tensorflow as tf
+
+from .ml_service import FoodRecognitionModel
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class CascadeConfig:
+    """Settings for building a cascade around a full model"""
+    fast_img_size: int = 160
+    threshold: float = 0.6
+    fast_model_path: Optional[Path] = None
+
+
+class CascadeModel:
+    """
+    Two-stage classifier with the same interface as FoodRecognitionModel
+
+    Every image goes through the fast model. Images whose top-1 confidence is
+    below the threshold are escalated to the full model, whose probabilities
+    replace the fast ones. Images are preprocessed once at the full model's
+    resolution and downscaled for the fast model.
+    """
+
+    def __init__(self, full_model: FoodRecognitionModel, fast_model: FoodRecognitionModel, threshold: float = 0.6):
+        """
+        Initialize the cascade
+
+        Args:
+            full_model: Accurate model used for escalated images
+            fast_model: Cheap model over the same classes
+            threshold: Fast-model confidence below which an image is escalated
+        """
+        if fast_model.class_names != full_model.class_names:
+            raise ValueError("Fast and full models must share the same class names")
+
+        self.full_model = full_model
+        self.fast_model = fast_model
+        self.threshold = threshold
+        self._shared_embeddings = (
+            full_model.embedding_dim is not None and fast_model.embedding_dim == full_model.embedding_dim
+        )
+        self._lock = threading.Lock()
+        self._stats = {"images": 0, "escalated": 0}
+
+    @property
+    def img_size(self) -> int:
+        return self.full_model.img_size
+
+    @property
+    def class_names(self) -> Optional[list[str]]:
+        return self.full_model.class_names
+
+    @property
+    def embedding_dim(self) -> Optional[int]:
+        return self.full_model.embedding_dim if self._shared_embeddings else None
+
+    def preprocess_image(self, image_bytes: bytes) -> Optional[np.ndarray]:
+        """Preprocess at the full model's resolution (see FoodRecognitionModel.preprocess_image)"""
+        return self.full_model.preprocess_image(image_bytes)
+
+    def resize_for_fast(self, images: np.ndarray) -> np.ndarray:
+        """Downscale a full-resolution batch to the fast model's input size"""
+        if self.fast_model.img_size == self.full_model.img_size:
+            return images
+        size = (self.fast_model.img_size, self.fast_model.img_size)
+        return tf.image.resize(images, size, antialias=True).numpy()
+
+    def predict_stages(self, images: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Run the cascade on a preprocessed batch
+
+        Args:
+            images: Array of shape (batch, img_size, img_size, 3)
+
+        Returns:
+            Tuple of (probabilities, escalated mask)
+        """
+        probabilities, _, escalated = self._run_stages(images, with_embeddings=False)
+        return probabilities, escalated
+
+    def _run_stages(self, images: np.ndarray, with_embeddings: bool):
+        # A separately trained fast model lives in a different embedding space,
+        # so its embeddings cannot be mixed with the full model's
+        with_embeddings = with_embeddings and self._shared_embeddings
+
+        fast_images = self.resize_for_fast(images)
+        if with_embeddings:
+            probabilities, embeddings = self.fast_model.predict_batch_with_embeddings(fast_images)
+        else:
+            probabilities, embeddings = self.fast_model.predict_batch(fast_images), None
+
+        escalated = probabilities.max(axis=1) < self.threshold
+        if escalated.any():
+            if with_embeddings:
+                full_probabilities, full_embeddings = self.full_model.predict_batch_with_embeddings(images[escalated])
+                embeddings[escalated] = full_embeddings
+            else:
+                full_probabilities = self.full_model.predict_batch(images[escalated])
+            probabilities[escalated] = full_probabilities
+
+        with self._lock:
+            self._stats["images"] += len(images)
+            self._stats["escalated"] += int(escalated.sum())
+
+        return probabilities, embeddings, escalated
+
+    def predict_batch(self, images: np.ndarray) -> np.ndarray:
+        """Run the cascade and return class probabilities (see FoodRecognitionModel.predict_batch)"""
+        probabilities, _ = self.predict_stages(images)
+        return probabilities
+
+    def predict_batch_with_embeddings(self, images: np.ndarray) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """Run the cascade and return probabilities and embeddings (see FoodRecognitionModel.predict_batch_with_embeddings)"""
+        probabilities, embeddings, _ = self._run_stages(images, with_embeddings=True)
+        return probabilities, embeddings
+
+    def class_prototypes(self) -> Optional[Tuple[list[str], np.ndarray]]:
+        """Class reference embeddings of the full model (see FoodRecognitionModel.class_prototypes)"""
+        return self.full_model.class_prototypes()
+
+    def decode_predictions(self, probabilities: np.ndarray, top_k: int = 1) -> list[Tuple[str, float]]:
+        """Convert probabilities into ranked predictions (see FoodRecognitionModel.decode_predictions)"""
+        return self.full_model.decode_predictions(probabilities, top_k=top_k)
+
+    def stats(self) -> dict:
+        """Get the number of images seen and the fraction escalated to the full model"""
+        with self._lock:
+            images = self._stats["images"]
+            escalated = self._stats["escalated"]
+        return {
+            "threshold": self.threshold,
+            "fast_img_size": self.fast_model.img_size,
+            "images": images,
+            "escalated": escalated,
+            "escalation_rate": escalated / images if images else 0.0,
+        }
+
+    def is_loaded(self) -> bool:
+        """Check if both stages are loaded and ready"""
+        return self.full_model.is_loaded() and self.fast_model.is_loaded()
+
+
+def build_fast_model(
+    full_model: FoodRecognitionModel,
+    fast_img_size: int,
+    fast_model_path: Optional[Path] = None,
+    artifact_cache=None
+) -> FoodRecognitionModel:
+    """
+    Load or derive the cascade's fast stage
+
+    Args:
+        full_model: Loaded full model
+        fast_img_size: Input size of the fast model
+        fast_model_path: Optional separately trained (e.g. distilled) model file
+        artifact_cache: ArtifactCache the separate model file is served from and exported to
+
+    Returns:
+        FoodRecognitionModel for the fast stage
+    """
+    if fast_model_path is not None:
+        return FoodRecognitionModel(fast_model_path, full_model.class_names_path, fast_img_size, artifact_cache)
+    return FoodRecognitionModel.from_weights(full_model, fast_img_size)
+
+
+def build_cascade_model(full_model: FoodRecognitionModel, config: CascadeConfig, artifact_cache=None) -> CascadeModel:
+    """
+    Wrap a loaded full model in a cascade
+
+    Args:
+        full_model: Loaded full model
+        config: Cascade settings
+        artifact_cache: ArtifactCache a separate fast model file is served from
+
+    Returns:
+        CascadeModel instance
+    """
+    fast_model = build_fast_model(full_model, config.fast_img_size, config.fast_model_path, artifact_cache)
+    logger.info(f"Model cascade enabled (fast stage {config.fast_img_size}px, threshold {config.threshold:.2f})")
+    return CascadeModel(full_model, fast_model, config.threshold)
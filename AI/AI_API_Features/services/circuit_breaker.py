@@ -0,0 +1,154 @@
+"""
+Circuit breaker for calls to an unreliable dependency (the food database)
+"""
+import threading
+import time
+from typing import Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected because the circuit is open"""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} is unavailable (circuit open, retry in {retry_after:.0f}s)")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Closed / open / half-open circuit breaker
+
+    While closed, calls go through and consecutive failures are counted. After
+    failure_threshold failures in a row the circuit opens and callers are
+    rejected immediately for reset_seconds. Then one trial call is let through
+    (half-open): success closes the circuit, failure opens it again.
+
+    Usage:
+        if breaker.allow():
+            try:
+                result = query()
+                breaker.record_success()
+            except Exception:
+                breaker.record_failure()
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 3, reset_seconds: float = 15.0):
+        """
+        Initialize a closed circuit
+
+        Args:
+            name: Dependency name used in logs and errors
+            failure_threshold: Consecutive failures that open the circuit
+            reset_seconds: How long the circuit stays open before a trial call
+        """
+        self.name = name
+        self.failure_threshold = max(failure_threshold, 1)
+        self.reset_seconds = reset_seconds
+        self._state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+        self._stats = {"rejected": 0, "failures": 0, "opened": 0}
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == "open" and time.monotonic() - self._opened_at >= self.reset_seconds:
+                return "half_open"
+            return self._state
+
+    def retry_after(self) -> float:
+        """Seconds until the open circuit lets a trial call through (0 when not open)"""
+        with self._lock:
+            if self._state != "open":
+                return 0.0
+            return max(self.reset_seconds - (time.monotonic() - self._opened_at), 0.0)
+
+    def allow(self) -> bool:
+        """
+        Check whether a call may proceed
+
+        Returns:
+            True if the caller should make the call and then record its outcome
+        """
+        with self._lock:
+            if self._state == "closed":
+                return True
+            if self._state == "open" and time.monotonic() - self._opened_at >= self.reset_seconds:
+                self._state = "half_open"
+                self._trial_in_flight = False
+            if self._state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            self._stats["rejected"] += 1
+            return False
+
+    def check(self) -> None:
+        """
+        Like allow(), but raise instead of returning False
+
+        Raises:
+            CircuitOpenError: If the call is rejected
+        """
+        if not self.allow():
+            raise CircuitOpenError(self.name, self.retry_after())
+
+    def record_success(self) -> None:
+        """Record a successful call, closing the circuit"""
+        with self._lock:
+            if self._state != "closed":
+                logger.info(f"Circuit for {self.name} closed")
+            self._state = "closed"
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        """Record a failed call, opening the circuit once the threshold is reached"""
+        with self._lock:
+            self._failures += 1
+            self._stats["failures"] += 1
+            self._trial_in_flight = False
+            if self._state == "half_open" or self._failures >= self.failure_threshold:
+                if self._state != "open":
+                    self._stats["opened"] += 1
+                    logger.warning(
+                        f"Circuit for {self.name} opened after {self._failures} consecutive failures; "
+                        f"retrying in {self.reset_seconds:.0f}s"
+                    )
+                self._state = "open"
+                self._opened_at = time.monotonic()
+
+    def stats(self) -> dict:
+        """Get the state and failure/rejection counters"""
+        state = self.state
+        with self._lock:
+            return {
+                "state": state,
+                "consecutive_failures": self._failures,
+                **self._stats,
+            }
+
+
+# Global breaker instance for the food database (singleton pattern)
+_db_breaker_instance: Optional[CircuitBreaker] = None
+
+
+def get_db_breaker(failure_threshold: int = 3, reset_seconds: float = 15.0) -> CircuitBreaker:
+    """
+    Get or create the circuit breaker guarding food database queries
+
+    Args:
+        failure_threshold: Consecutive failures that open the circuit
+        reset_seconds: How long the circuit stays open before a trial call
+
+    Returns:
+        CircuitBreaker instance
+    """
+    global _db_breaker_instance
+    if _db_breaker_instance is None:
+        _db_breaker_instance = CircuitBreaker("food database", failure_threshold, reset_seconds)
+    return _db_breaker_instance
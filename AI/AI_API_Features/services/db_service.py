@@ -3,18 +3,63 @@ Database service for food data operations
 """
 from sqlalchemy.orm import Session
 from sqlalchemy import func
-from typing import Optional, List
+from typing import Any, Callable, Optional, List, Dict
 from ..models.database import Food
+from .circuit_breaker import CircuitBreaker, CircuitOpenError
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+class DatabaseUnavailableError(Exception):
+    """Raised when the food database failed or is skipped by the open circuit breaker"""
+    
+    def __init__(self, message: str, retry_after: float = 0.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
 class FoodDatabaseService:
     """Service for interacting with food database"""
     
-    @staticmethod
-    def get_food_by_name(db: Session, food_name: str) -> Optional[Food]:
+    def __init__(self, breaker: Optional[CircuitBreaker] = None):
+        """
+        Initialize the service
+        
+        Args:
+            breaker: Circuit breaker shared by all database calls (optional)
+        """
+        self.breaker = breaker
+    
+    def _run(self, db: Session, description: str, query: Callable[[], Any]) -> Any:
+        """
+        Run a query through the circuit breaker
+        
+        Raises:
+            DatabaseUnavailableError: If the circuit is open or the query fails
+        """
+        if self.breaker is not None:
+            try:
+                self.breaker.check()
+            except CircuitOpenError as e:
+                raise DatabaseUnavailableError(str(e), e.retry_after)
+        
+        try:
+            result = query()
+        except Exception as e:
+            logger.error(f"Error {description}: {e}")
+            db.rollback()
+            retry_after = 0.0
+            if self.breaker is not None:
+                self.breaker.record_failure()
+                retry_after = self.breaker.retry_after()
+            raise DatabaseUnavailableError(f"Error {description}", retry_after) from e
+        
+        if self.breaker is not None:
+            self.breaker.record_success()
+        return result
+    
+    def get_food_by_name(self, db: Session, food_name: str) -> Optional[Food]:
         """
         Get food by exact name match (case-insensitive)
         
@@ -24,20 +69,42 @@ class FoodDatabaseService:
             
         Returns:
             Food object or None if not found
+            
+        Raises:
+            DatabaseUnavailableError: If the database is unavailable
         """
-        try:
-            # Normalize the food name (lowercase, trim)
-            normalized_name = food_name.strip().lower()
+        # Normalize the food name (lowercase, trim)
+        normalized_name = food_name.strip().lower()
+        
+        return self._run(db, f"fetching food by name '{food_name}'", lambda: db.query(Food).filter(
+            func.lower(Food.name) == normalized_name
+        ).first())
+    
+    def get_foods_by_names(self, db: Session, food_names: List[str]) -> Dict[str, Food]:
+        """
+        Get several foods by exact name match (case-insensitive) in one query
+        
+        Args:
+            db: Database session
+            food_names: Names of the foods to look up
             
-            return db.query(Food).filter(
-                func.lower(Food.name) == normalized_name
-            ).first()
-        except Exception as e:
-            logger.error(f"Error fetching food by name '{food_name}': {e}")
-            return None
+        Returns:
+            Dictionary mapping each normalized (lowercase, trimmed) name that
+            was found to its Food object
+            
+        Raises:
+            DatabaseUnavailableError: If the database is unavailable
+        """
+        normalized_names = {name.strip().lower() for name in food_names if name and name.strip()}
+        if not normalized_names:
+            return {}
+        
+        foods = self._run(db, f"fetching foods by names {sorted(normalized_names)}", lambda: db.query(Food).filter(
+            func.lower(Food.name).in_(normalized_names)
+        ).all())
+        return {food.name.strip().lower(): food for food in foods}
     
-    @staticmethod
-    def search_foods_by_name(db: Session, search_term: str, limit: int = 5) -> List[Food]:
+    def search_foods_by_name(self, db: Session, search_term: str, limit: int = 5) -> List[Food]:
         """
         Search foods by partial name match
         
@@ -48,19 +115,17 @@ class FoodDatabaseService:
             
         Returns:
             List of matching Food objects
-        """
-        try:
-            normalized_term = search_term.strip().lower()
             
-            return db.query(Food).filter(
-                func.lower(Food.name).like(f"%{normalized_term}%")
-            ).limit(limit).all()
-        except Exception as e:
-            logger.error(f"Error searching foods with term '{search_term}': {e}")
-            return []
+        Raises:
+            DatabaseUnavailableError: If the database is unavailable
+        """
+        normalized_term = search_term.strip().lower()
+        
+        return self._run(db, f"searching foods with term '{search_term}'", lambda: db.query(Food).filter(
+            func.lower(Food.name).like(f"%{normalized_term}%")
+        ).limit(limit).all())
     
-    @staticmethod
-    def get_all_food_names(db: Session) -> List[str]:
+    def get_all_food_names(self, db: Session) -> List[str]:
         """
         Get all food names from database
         
@@ -69,16 +134,14 @@ class FoodDatabaseService:
             
         Returns:
             List of all food names
+            
+        Raises:
+            DatabaseUnavailableError: If the database is unavailable
         """
-        try:
-            foods = db.query(Food.name).all()
-            return [food.name for food in foods]
-        except Exception as e:
-            logger.error(f"Error fetching all food names: {e}")
-            return []
+        foods = self._run(db, "fetching all food names", lambda: db.query(Food.name).all())
+        return [food.name for food in foods]
     
-    @staticmethod
-    def find_similar_foods(db: Session, food_name: str, limit: int = 3) -> List[str]:
+    def find_similar_foods(self, db: Session, food_name: str, limit: int = 3) -> List[str]:
         """
         Find similar food names (for suggestions when food not found)
         
@@ -89,25 +152,24 @@ class FoodDatabaseService:
             
         Returns:
             List of similar food names
-        """
-        try:
-            # Extract key words from the food name
-            words = food_name.lower().replace('_', ' ').split()
             
-            suggestions = set()
-            for word in words:
-                if len(word) > 2:  # Skip very short words
-                    similar = db.query(Food.name).filter(
-                        func.lower(Food.name).like(f"%{word}%")
-                    ).limit(limit).all()
-                    suggestions.update([food.name for food in similar])
-            
-            return list(suggestions)[:limit]
-        except Exception as e:
-            logger.error(f"Error finding similar foods for '{food_name}': {e}")
-            return []
+        Raises:
+            DatabaseUnavailableError: If the database is unavailable
+        """
+        # Extract key words from the food name
+        words = food_name.lower().replace('_', ' ').split()
+        
+        suggestions = set()
+        for word in words:
+            if len(word) > 2:  # Skip very short words
+                similar = self._run(db, f"finding similar foods for '{food_name}'", lambda: db.query(Food.name).filter(
+                    func.lower(Food.name).like(f"%{word}%")
+                ).limit(limit).all())
+                suggestions.update([food.name for food in similar])
+        
+        return list(suggestions)[:limit]
 
 
-def get_food_service() -> FoodDatabaseService:
-    """Get food database service instance"""
-    return FoodDatabaseService()
+def get_food_service(breaker: Optional[CircuitBreaker] = None) -> FoodDatabaseService:
+    """Get food database service instance, optionally guarded by a circuit breaker"""
+    return FoodDatabaseService(breaker)
@@ -0,0 +1,229 @@
+"""
+In-memory vector index of food image embeddings for visual similarity
+"""
+import threading
+from pathlib import Path
+from typing import Optional, Tuple
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalize rows so dot products are cosine similarities"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class EmbeddingIndex:
+    """
+    Labeled, L2-normalized embeddings answering top-k cosine similarity
+
+    Vectors are stored in a contiguous matrix (float16 by default, which halves
+    memory); a query is a single matrix-vector product followed by a per-label
+    max, so the cost grows with the number of stored vectors, not DB round-trips.
+    Several vectors may share a label (class reference plus user-confirmed
+    images); a label scores as its best-matching vector.
+    """
+
+    def __init__(self, dim: int, dtype: str = "float16", capacity: int = 256):
+        """
+        Initialize an empty index
+
+        Args:
+            dim: Embedding dimension
+            dtype: Storage dtype for vectors ("float16" or "float32")
+            capacity: Initial number of vector slots
+        """
+        self.dim = dim
+        self.dtype = np.dtype(dtype)
+        self._vectors = np.zeros((capacity, dim), dtype=self.dtype)
+        self._label_ids = np.zeros(capacity, dtype=np.int32)
+        self._labels: list[str] = []
+        self._label_index: dict[str, int] = {}
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def labels(self) -> list[str]:
+        return list(self._labels)
+
+    def _label_id(self, label: str) -> int:
+        label_id = self._label_index.get(label)
+        if label_id is None:
+            label_id = len(self._labels)
+            self._labels.append(label)
+            self._label_index[label] = label_id
+        return label_id
+
+    def add_many(self, labels: list[str], vectors: np.ndarray) -> None:
+        """
+        Add embeddings to the index
+
+        Args:
+            labels: One label per vector
+            vectors: Array of shape (len(labels), dim)
+        """
+        vectors = _normalize(vectors).reshape(-1, self.dim)
+        if len(labels) != len(vectors):
+            raise ValueError("labels and vectors must have the same length")
+
+        with self._lock:
+            needed = self._size + len(vectors)
+            if needed > len(self._vectors):
+                capacity = max(needed, 2 * len(self._vectors))
+                grown = np.zeros((capacity, self.dim), dtype=self.dtype)
+                grown[:self._size] = self._vectors[:self._size]
+                grown_ids = np.zeros(capacity, dtype=np.int32)
+                grown_ids[:self._size] = self._label_ids[:self._size]
+                self._vectors, self._label_ids = grown, grown_ids
+
+            self._vectors[self._size:needed] = vectors
+            self._label_ids[self._size:needed] = [self._label_id(label) for label in labels]
+            self._size = needed
+
+    def add(self, label: str, vector: np.ndarray) -> None:
+        """Add a single embedding under a label"""
+        self.add_many([label], np.asarray(vector).reshape(1, -1))
+
+    def search(self, query: np.ndarray, k: int = 3, exclude: Optional[set[str]] = None) -> list[Tuple[str, float]]:
+        """
+        Find the labels most similar to a query embedding
+
+        Args:
+            query: Embedding vector of length dim
+            k: Number of labels to return
+            exclude: Labels to leave out of the results
+
+        Returns:
+            List of (label, cosine similarity) pairs, most similar first
+        """
+        query = _normalize(query).reshape(self.dim)
+        with self._lock:
+            size = self._size
+            vectors = self._vectors[:size]
+            label_ids = self._label_ids[:size]
+            num_labels = len(self._labels)
+            labels = self._labels
+            excluded = [self._label_index[label] for label in exclude or () if label in self._label_index]
+
+        if size == 0:
+            return []
+
+        scores = vectors @ query
+        best = np.full(num_labels, -np.inf, dtype=np.float32)
+        np.maximum.at(best, label_ids, scores)
+        best[excluded] = -np.inf
+
+        k = min(k, num_labels)
+        top = np.argpartition(-best, k - 1)[:k]
+        top = top[np.argsort(-best[top])]
+        return [(labels[i], float(best[i])) for i in top if np.isfinite(best[i])]
+
+    def reference_vector(self, label: str) -> Optional[np.ndarray]:
+        """Get the first vector stored under a label (its class reference when seeded)"""
+        with self._lock:
+            label_id = self._label_index.get(label)
+            if label_id is None:
+                return None
+            rows = np.flatnonzero(self._label_ids[:self._size] == label_id)
+            return self._vectors[rows[0]].astype(np.float32) if len(rows) else None
+
+    def save(self, path: Path, model_version: str = "") -> None:
+        """Persist the index to a .npz file, tagged with the model version it belongs to"""
+        with self._lock:
+            labels = np.array([self._labels[i] for i in self._label_ids[:self._size]])
+            vectors = self._vectors[:self._size].copy()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        np.savez_compressed(path, labels=labels, vectors=vectors, model_version=np.array(model_version))
+        logger.info(f"Saved embedding index with {len(labels)} vectors to {path}")
+
+    @classmethod
+    def load(cls, path: Path, dtype: str = "float16") -> "EmbeddingIndex":
+        """Load an index saved with save()"""
+        data = np.load(path)
+        vectors = data["vectors"]
+        index = cls(vectors.shape[1], dtype=dtype, capacity=max(len(vectors), 1))
+        index.add_many([str(label) for label in data["labels"]], vectors)
+        logger.info(f"Loaded embedding index with {len(index)} vectors from {path}")
+        return index
+
+    @staticmethod
+    def saved_model_version(path: Path) -> Optional[str]:
+        """Get the model version a saved index belongs to"""
+        with np.load(path) as data:
+            return str(data["model_version"]) if "model_version" in data.files else None
+
+
+# Global index instances, one per model version (embedding spaces differ between versions)
+_index_instances: dict[str, EmbeddingIndex] = {}
+_index_lock = threading.Lock()
+_last_used_version: Optional[str] = None
+
+
+def get_embedding_index(
+    model,
+    model_version: str,
+    index_path: Optional[Path] = None,
+    dtype: str = "float16"
+) -> Optional[EmbeddingIndex]:
+    """
+    Get or create the embedding index for a model version
+
+    Loads a saved index when one exists for this version; otherwise seeds one
+    reference vector per class from the model's classifier weights.
+
+    Args:
+        model: Loaded FoodRecognitionModel (or cascade) exposing class_prototypes()
+        model_version: Version label of the model
+        index_path: Optional .npz file saved by EmbeddingIndex.save
+        dtype: Storage dtype for vectors
+
+    Returns:
+        EmbeddingIndex, or None if the model exposes no embeddings
+    """
+    global _last_used_version
+    with _index_lock:
+        index = _index_instances.get(model_version)
+        if index is not None:
+            _last_used_version = model_version
+            return index
+
+        if index_path is not None and index_path.exists() \
+                and EmbeddingIndex.saved_model_version(index_path) == model_version:
+            index = EmbeddingIndex.load(index_path, dtype=dtype)
+        else:
+            prototypes = model.class_prototypes()
+            if prototypes is None or model.embedding_dim is None:
+                return None
+            class_names, vectors = prototypes
+            index = EmbeddingIndex(vectors.shape[1], dtype=dtype, capacity=len(class_names))
+            index.add_many(class_names, vectors)
+            logger.info(f"Seeded embedding index for model {model_version} with {len(class_names)} class reference vectors")
+
+        _index_instances[model_version] = index
+        _last_used_version = model_version
+        return index
+
+
+def drop_embedding_index(model_version: str) -> None:
+    """Forget the index of an unloaded model version"""
+    with _index_lock:
+        _index_instances.pop(model_version, None)
+
+
+def save_embedding_index(index_path: Optional[Path], model_version: Optional[str] = None) -> None:
+    """Persist a model version's index (default: the most recently used one) if one was created"""
+    model_version = model_version or _last_used_version
+    index = _index_instances.get(model_version) if model_version else None
+    if index is not None and index_path is not None:
+        try:
+            index.save(index_path, model_version)
+        except Exception as e:
+            logger.error(f"Failed to save embedding index: {e}")
@@ -0,0 +1,82 @@
+"""
+Deterministic stand-in for the food recognition model, for local clusters and load tests
+"""
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Optional, Tuple
+import logging
+
+import numpy as np
+
+from .ml_service import FoodRecognitionModel
+
+logger = logging.getLogger(__name__)
+
+
+class FakeFoodModel(FoodRecognitionModel):
+    """
+    Model with the FoodRecognitionModel interface that needs no weights file
+
+    Each image gets a fixed pseudo-random prediction derived from its pixels,
+    so the same photo always yields the same answer (and cache behaviour can
+    be observed), while a forward pass only costs latency_ms per batch.
+    """
+
+    def __init__(
+        self,
+        class_names_path: Path,
+        img_size: int = 224,
+        latency_ms: float = 20.0,
+        embedding_dim: int = 64
+    ):
+        """
+        Initialize the fake model
+
+        Args:
+            class_names_path: Path to the class names JSON file
+            img_size: Input image size
+            latency_ms: Simulated time per forward pass
+            embedding_dim: Size of the generated image embeddings
+        """
+        self.model_path = Path("fake")
+        self.class_names_path = class_names_path
+        self.img_size = img_size
+        self.latency_ms = latency_ms
+        self._embedding_dim = embedding_dim
+        # Nothing to serve from an exported artifact
+        self._keras_lock = threading.Lock()
+        self._artifact_path = None
+        self._serving = None
+        self._serving_meta = {}
+        self.model = self
+        self.inference_model = None
+        self.class_names = None
+        self._load_class_names()
+        logger.info(f"Using fake model ({len(self.class_names)} classes, {latency_ms:.0f}ms per batch)")
+
+    @property
+    def embedding_dim(self) -> Optional[int]:
+        return self._embedding_dim
+
+    def _outputs_for(self, image: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        rng = np.random.default_rng(zlib.crc32(np.ascontiguousarray(image).data))
+        logits = rng.normal(0.0, 1.0, len(self.class_names))
+        logits[rng.integers(len(self.class_names))] += 4.0
+        probabilities = np.exp(logits - logits.max())
+        probabilities /= probabilities.sum()
+        embedding = rng.normal(0.0, 1.0, self._embedding_dim)
+        return probabilities.astype(np.float32), embedding.astype(np.float32)
+
+    def predict_batch_with_embeddings(self, images: np.ndarray) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        if self.latency_ms > 0:
+            time.sleep(self.latency_ms / 1000)
+        outputs = [self._outputs_for(image) for image in images]
+        return np.stack([p for p, _ in outputs]), np.stack([e for _, e in outputs])
+
+    def predict_batch(self, images: np.ndarray) -> np.ndarray:
+        return self.predict_batch_with_embeddings(images)[0]
+
+    def class_prototypes(self) -> Optional[Tuple[list[str], np.ndarray]]:
+        return None
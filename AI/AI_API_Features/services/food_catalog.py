@@ -0,0 +1,363 @@
+"""
+In-memory snapshot of the food table with pre-serialized nutrition payloads
+"""
+import hashlib
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Optional, Tuple
+import logging
+
+from sqlalchemy import event, func
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.orm import Session
+
+from ..models.database import Food
+from ..models.schemas import FoodResponse
+from ..utils.fast_json import dumps, fragment
+from .name_index import NGramIndex, PrefixIndex
+from .circuit_breaker import CircuitBreaker
+
+logger = logging.getLogger(__name__)
+
+# Every column that ends up in a payload; any change to one of them changes the digest
+_DIGEST_COLUMNS = (
+    Food.id, Food.name, Food.calories, Food.protein, Food.carbohydrate,
+    Food.fat, Food.sugar, Food.pic, Food.createdAt, Food.updatedAt,
+)
+
+
+def table_fingerprint(db: Session) -> tuple[int, Optional[str]]:
+    """
+    Row count and an MD5 digest of the food table's served columns in id order
+
+    PostgreSQL computes the digest itself, so only one short row crosses the
+    network; other databases stream the columns and they are hashed here.
+
+    Args:
+        db: Database session
+
+    Returns:
+        Tuple of (row count, hex digest)
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        row = func.concat_ws("|", *_DIGEST_COLUMNS)
+        count, digest = db.query(
+            func.count(Food.id),
+            func.md5(func.string_agg(aggregate_order_by(row, Food.id), ","))
+        ).one()
+        return count, digest
+
+    digest = hashlib.md5()
+    count = 0
+    for row in db.query(*_DIGEST_COLUMNS).order_by(Food.id).yield_per(1000):
+        digest.update("|".join("" if value is None else str(value) for value in row).encode())
+        digest.update(b",")
+        count += 1
+    return count, digest.hexdigest()
+
+
+@dataclass(frozen=True)
+class CatalogEntry:
+    """One food with its FoodResponse payload encoded once as JSON"""
+    food_id: int
+    name: str
+    nutrition: dict[str, float]
+    payload: bytes
+    fragment: Any
+
+    @classmethod
+    def from_food(cls, food: Food) -> "CatalogEntry":
+        data = FoodResponse.model_validate(food).model_dump(mode="json")
+        payload = dumps(data)
+        return cls(
+            food_id=food.id,
+            name=food.name,
+            nutrition={key: data[key] for key in ("calories", "protein", "carbohydrate", "fat", "sugar")},
+            payload=payload,
+            fragment=fragment(payload)
+        )
+
+
+class FoodCatalog:
+    """
+    Read-mostly copy of the food table keyed by lowercased name
+
+    Nutrition rows change rarely, so each food's response payload is validated
+    and serialized once per snapshot instead of once per request. The snapshot
+    is rebuilt when a row is written through this process's ORM session, or
+    when the table's fingerprint (row count and a digest of the served
+    columns) shows that another writer changed it; the fingerprint is
+    checked at most once per refresh interval. Each snapshot
+    carries an n-gram index over the food names for fuzzy suggestions and a
+    sorted prefix index for autocomplete.
+
+    Once start() runs, a background thread does the refreshing and reads only
+    look at the in-memory snapshot, so a slow or unreachable database never
+    holds up a request. Without it (tools, tests) reads refresh inline.
+
+    Refreshes go through the database circuit breaker. While the database is
+    failing the last good snapshot keeps being served and status() reports
+    it as stale, or as unavailable if no snapshot was ever loaded.
+    """
+
+    def __init__(self, refresh_seconds: float = 30.0, breaker: Optional[CircuitBreaker] = None):
+        """
+        Initialize an empty catalog
+
+        Args:
+            refresh_seconds: Minimum interval between fingerprint checks
+            breaker: Circuit breaker guarding database queries (optional)
+        """
+        self.refresh_seconds = refresh_seconds
+        self.breaker = breaker
+        self._entries: dict[str, CatalogEntry] = {}
+        self._name_index = NGramIndex([])
+        self._prefix_index = PrefixIndex([])
+        self._fingerprint: Optional[tuple] = None
+        self._checked_at = 0.0
+        self._changes = 0  # ORM writes seen; the snapshot is current when it has seen them all
+        self._built_changes = -1
+        self._lock = threading.Lock()
+        self._loads = 0
+        self._loaded = False
+        self._healthy = True
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def mark_dirty(self) -> None:
+        """Force a rebuild on the next refresh"""
+        self._changes += 1
+        self._wake.set()
+
+    def start(self, session_factory: Callable[[], Session]) -> None:
+        """
+        Refresh the snapshot on a background thread from now on
+
+        Args:
+            session_factory: Creates a database session for each refresh
+        """
+        if self._thread is not None:
+            return
+        self._running = True
+        self._thread = threading.Thread(
+            target=self._run, args=(session_factory,), name="food-catalog", daemon=True
+        )
+        self._thread.start()
+
+    def close(self) -> None:
+        """Stop the background refresh thread"""
+        self._running = False
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self, session_factory: Callable[[], Session]) -> None:
+        """Check the fingerprint every refresh interval, or right after an ORM write"""
+        while True:
+            self._wake.wait(timeout=self.refresh_seconds)
+            self._wake.clear()
+            if not self._running:
+                return
+            try:
+                db = session_factory()
+                try:
+                    self.refresh(db)
+                finally:
+                    db.close()
+            except Exception as e:
+                logger.error(f"Food catalog refresh failed: {e}")
+
+    def _refresh_inline(self, db: Optional[Session]) -> None:
+        """Refresh on the calling thread unless the background thread does it"""
+        if self._thread is None and db is not None:
+            self.refresh(db)
+
+    def refresh(self, db: Session, force: bool = False) -> bool:
+        """
+        Rebuild the snapshot if the food table changed
+
+        Database errors, and checks skipped by an open circuit breaker, are
+        logged and the previous snapshot is kept.
+
+        Args:
+            db: Database session
+            force: Check the fingerprint even if the refresh interval has not passed
+
+        Returns:
+            True if the snapshot was rebuilt
+        """
+        now = time.monotonic()
+        if not (force or self._changes != self._built_changes or now - self._checked_at >= self.refresh_seconds):
+            return False
+
+        # Once a snapshot exists, requests never queue behind another thread's refresh
+        if not self._lock.acquire(blocking=not self._loaded):
+            return False
+        try:
+            changes = self._changes
+            if not (force or changes != self._built_changes or now - self._checked_at >= self.refresh_seconds):
+                return False
+            if self.breaker is not None and not self.breaker.allow():
+                self._healthy = False
+                return False
+            try:
+                fingerprint = table_fingerprint(db)
+                self._checked_at = now
+                if changes == self._built_changes and fingerprint == self._fingerprint:
+                    self._record_success()
+                    return False
+
+                entries = {}
+                for food in db.query(Food).all():
+                    entries[food.name.strip().lower()] = CatalogEntry.from_food(food)
+            except Exception as e:
+                logger.error(f"Error refreshing food catalog: {e}")
+                db.rollback()
+                self._healthy = False
+                if self.breaker is not None:
+                    self.breaker.record_failure()
+                return False
+
+            self._record_success()
+            self._loaded = True
+            self._built_changes = changes
+            self._entries = entries
+            self._name_index = NGramIndex(entry.name for entry in entries.values())
+            self._prefix_index = PrefixIndex((entry.name, entry.food_id) for entry in entries.values())
+            self._fingerprint = fingerprint
+            self._loads += 1
+            logger.info(f"Loaded food catalog with {len(entries)} foods")
+            return True
+        finally:
+            self._lock.release()
+
+    def _record_success(self) -> None:
+        self._healthy = True
+        if self.breaker is not None:
+            self.breaker.record_success()
+
+    def status(self) -> str:
+        """
+        Get how fresh the served nutrition data is
+
+        Returns:
+            "ok" when the last database check succeeded, "stale" when serving
+            the last good snapshot while the database is failing, and
+            "unavailable" when no snapshot could be loaded yet
+        """
+        if self._healthy and self._loaded:
+            return "ok"
+        return "stale" if self._loaded else "unavailable"
+
+    def get(self, db: Optional[Session], food_name: str) -> Optional[CatalogEntry]:
+        """
+        Get a food by exact name match (case-insensitive)
+
+        Args:
+            db: Database session, used only to refresh inline (without start())
+            food_name: Name of the food
+
+        Returns:
+            CatalogEntry or None if not found
+        """
+        self._refresh_inline(db)
+        return self._entries.get(food_name.strip().lower())
+
+    def search_names(
+        self,
+        db: Optional[Session],
+        query: str,
+        limit: int = 5,
+        min_score: float = 0.15,
+        exclude: Optional[set[str]] = None
+    ) -> list[Tuple[str, float]]:
+        """
+        Rank food names by n-gram similarity to a query
+
+        Args:
+            db: Database session, used only to refresh inline (without start())
+            query: Free text or a (possibly misspelled) food name
+            limit: Maximum number of results
+            min_score: Minimum similarity (0-1) for a name to be returned
+            exclude: Food names to leave out of the results
+
+        Returns:
+            List of (food name, similarity) pairs, most similar first
+        """
+        self._refresh_inline(db)
+        return self._name_index.search(query, limit, min_score, exclude)
+
+    def autocomplete(
+        self,
+        db: Optional[Session],
+        prefix: str,
+        limit: int = 10,
+        after: Optional[Tuple[int, str, int]] = None
+    ) -> Tuple[list[CatalogEntry], Optional[Tuple[int, str, int]]]:
+        """
+        Find foods whose name, or a later word of it, starts with a prefix
+
+        Args:
+            db: Database session, used only to refresh inline (without start())
+            prefix: Typed text
+            limit: Maximum number of results
+            after: Sort key returned with the previous page
+
+        Returns:
+            Tuple of (matching entries in stable order, sort key of the next
+            page or None when there are no more results)
+        """
+        self._refresh_inline(db)
+        entries = self._entries
+        matches, next_key = self._prefix_index.search(prefix, limit, after)
+        found = (entries.get(name.strip().lower()) for name, _ in matches)
+        return [entry for entry in found if entry is not None], next_key
+
+    def stats(self) -> dict:
+        """Get the number of foods and how often the snapshot was rebuilt"""
+        return {
+            "status": self.status(),
+            "foods": len(self._entries),
+            "loads": self._loads,
+            "refresh_seconds": self.refresh_seconds,
+        }
+
+
+# Global catalog instance (singleton pattern)
+_catalog_instance: Optional[FoodCatalog] = None
+
+
+def get_food_catalog(refresh_seconds: float = 30.0, breaker: Optional[CircuitBreaker] = None) -> FoodCatalog:
+    """
+    Get or create the global food catalog
+
+    Args:
+        refresh_seconds: Minimum interval between fingerprint checks
+        breaker: Circuit breaker guarding database queries (optional)
+
+    Returns:
+        FoodCatalog instance
+    """
+    global _catalog_instance
+    if _catalog_instance is None:
+        catalog = FoodCatalog(refresh_seconds, breaker)
+
+        def mark_dirty(mapper, connection, target) -> None:
+            catalog.mark_dirty()
+
+        for event_name in ("after_insert", "after_update", "after_delete"):
+            event.listen(Food, event_name, mark_dirty)
+        _catalog_instance = catalog
+    return _catalog_instance
+
+
+def shutdown_food_catalog() -> None:
+    """Stop the global catalog's background refresh thread if it was started"""
+    if _catalog_instance is not None:
+        _catalog_instance.close()
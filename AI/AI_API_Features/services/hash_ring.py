@@ -0,0 +1,247 @@
+"""
+Consistent-hash ring and health/load-aware backend selection for the request router
+"""
+import bisect
+import hashlib
+import math
+import threading
+import time
+from dataclasses import dataclass
+from typing import Iterator, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def ring_hash(value: str) -> int:
+    """Map a string to a 64-bit position on the ring"""
+    return int.from_bytes(hashlib.md5(value.encode("utf-8")).digest()[:8], "big")
+
+
+class ConsistentHashRing:
+    """
+    Consistent-hash ring with virtual nodes
+
+    Each node is placed on the ring virtual_nodes times; a key belongs to the
+    first node clockwise from its hash. Adding or removing a node only moves
+    the keys of that node's arcs.
+    """
+
+    def __init__(self, nodes: list[str], virtual_nodes: int = 100):
+        """
+        Build the ring
+
+        Args:
+            nodes: Node names (backend URLs)
+            virtual_nodes: Ring positions per node; more gives a more even split
+        """
+        self.virtual_nodes = max(virtual_nodes, 1)
+        self.nodes: list[str] = []
+        self._positions: list[int] = []
+        self._owners: list[str] = []
+        for node in nodes:
+            self.add(node)
+
+    def add(self, node: str) -> None:
+        """Place a node on the ring"""
+        if node in self.nodes:
+            return
+        self.nodes.append(node)
+        for i in range(self.virtual_nodes):
+            position = ring_hash(f"{node}#{i}")
+            index = bisect.bisect(self._positions, position)
+            self._positions.insert(index, position)
+            self._owners.insert(index, node)
+
+    def remove(self, node: str) -> None:
+        """Take a node off the ring"""
+        if node not in self.nodes:
+            return
+        self.nodes.remove(node)
+        keep = [i for i, owner in enumerate(self._owners) if owner != node]
+        self._positions = [self._positions[i] for i in keep]
+        self._owners = [self._owners[i] for i in keep]
+
+    def walk(self, key: str) -> Iterator[str]:
+        """
+        Yield each node once, in ring order starting from the key's owner
+
+        Args:
+            key: Routing key (e.g. an image hash)
+        """
+        if not self._positions:
+            return
+        start = bisect.bisect(self._positions, ring_hash(key)) % len(self._positions)
+        seen = set()
+        for offset in range(len(self._positions)):
+            node = self._owners[(start + offset) % len(self._positions)]
+            if node not in seen:
+                seen.add(node)
+                yield node
+                if len(seen) == len(self.nodes):
+                    return
+
+    def shares(self) -> dict[str, float]:
+        """Fraction of the key space owned by each node"""
+        shares = {node: 0.0 for node in self.nodes}
+        if not self._positions:
+            return shares
+        size = float(2 ** 64)
+        for i, owner in enumerate(self._owners):
+            previous = self._positions[i - 1] if i else self._positions[-1] - 2 ** 64
+            shares[owner] += (self._positions[i] - previous) / size
+        return {node: round(share, 4) for node, share in shares.items()}
+
+
+@dataclass
+class Backend:
+    """A routed-to API instance and its health and load counters"""
+    url: str
+    healthy: bool = True
+    in_flight: int = 0
+    requests: int = 0
+    failures: int = 0
+    consecutive_failures: int = 0
+    last_error: Optional[str] = None
+    checked_at: float = 0.0
+
+    def describe(self) -> dict:
+        return {
+            "url": self.url,
+            "healthy": self.healthy,
+            "in_flight": self.in_flight,
+            "requests": self.requests,
+            "failures": self.failures,
+            "last_error": self.last_error,
+        }
+
+
+class BackendPool:
+    """
+    Chooses backends for keys with consistent hashing and bounded load
+
+    A key goes to the first healthy backend clockwise on the ring whose
+    in-flight count is below load_factor times the average, so one hot key
+    range cannot overload a backend (consistent hashing with bounded loads).
+    Backends are marked down after failure_threshold consecutive failures,
+    from requests or health checks, and back up after one successful check.
+    """
+
+    def __init__(
+        self,
+        urls: list[str],
+        virtual_nodes: int = 100,
+        load_factor: float = 1.25,
+        failure_threshold: int = 2
+    ):
+        """
+        Initialize the pool
+
+        Args:
+            urls: Backend base URLs
+            virtual_nodes: Ring positions per backend
+            load_factor: Allowed in-flight requests per backend relative to the average (> 1)
+            failure_threshold: Consecutive failures that mark a backend down
+        """
+        self.backends = {url: Backend(url) for url in urls}
+        self.ring = ConsistentHashRing(list(self.backends), virtual_nodes)
+        self.load_factor = max(load_factor, 1.0)
+        self.failure_threshold = max(failure_threshold, 1)
+        self._lock = threading.Lock()
+        self._stats = {"routed": 0, "spilled": 0, "failovers": 0, "no_backend": 0}
+
+    def load_bound(self) -> int:
+        """Maximum in-flight requests a backend may hold before keys spill to the next one"""
+        healthy = [b for b in self.backends.values() if b.healthy]
+        if not healthy:
+            return 0
+        total = sum(b.in_flight for b in healthy) + 1
+        return math.ceil(self.load_factor * total / len(healthy))
+
+    def candidates(self, key: Optional[str]) -> list[Backend]:
+        """
+        Order the healthy backends for a request
+
+        Args:
+            key: Routing key, or None for requests without cache affinity
+
+        Returns:
+            Backends to try in order: the chosen one first, then failover targets
+        """
+        with self._lock:
+            healthy = [b for b in self.backends.values() if b.healthy]
+            if not healthy:
+                self._stats["no_backend"] += 1
+                return []
+            if key is None:
+                # No affinity: least loaded first
+                return sorted(healthy, key=lambda b: b.in_flight)
+
+            bound = self.load_bound()
+            ordered = [self.backends[url] for url in self.ring.walk(key) if self.backends[url].healthy]
+            for i, backend in enumerate(ordered):
+                if backend.in_flight < bound:
+                    if i:
+                        self._stats["spilled"] += 1
+                    return ordered[i:] + ordered[:i]
+            return ordered
+
+    def start(self, backend: Backend) -> None:
+        """Count a request sent to a backend"""
+        with self._lock:
+            backend.in_flight += 1
+            backend.requests += 1
+            self._stats["routed"] += 1
+
+    def finish(self, backend: Backend, error: Optional[str] = None) -> None:
+        """
+        Record the outcome of a request sent to a backend
+
+        Args:
+            backend: Backend the request went to
+            error: Failure description, or None on success
+        """
+        with self._lock:
+            backend.in_flight -= 1
+        if error is None:
+            self.record_success(backend)
+        else:
+            self.record_failure(backend, error)
+
+    def record_success(self, backend: Backend) -> None:
+        with self._lock:
+            backend.consecutive_failures = 0
+            if not backend.healthy:
+                backend.healthy = True
+                logger.info(f"Backend {backend.url} is healthy again")
+
+    def record_failure(self, backend: Backend, error: str) -> None:
+        with self._lock:
+            backend.failures += 1
+            backend.consecutive_failures += 1
+            backend.last_error = error
+            if backend.healthy and backend.consecutive_failures >= self.failure_threshold:
+                backend.healthy = False
+                logger.warning(f"Backend {backend.url} marked down after {backend.consecutive_failures} failures: {error}")
+
+    def record_failover(self) -> None:
+        with self._lock:
+            self._stats["failovers"] += 1
+
+    def record_check(self, backend: Backend, ok: bool, error: Optional[str] = None) -> None:
+        """Record a health check result"""
+        backend.checked_at = time.time()
+        if ok:
+            self.record_success(backend)
+        else:
+            self.record_failure(backend, error or "health check failed")
+
+    def stats(self) -> dict:
+        """Get per-backend state, ring shares and routing counters"""
+        shares = self.ring.shares()
+        with self._lock:
+            return {
+                "backends": [{**b.describe(), "ring_share": shares.get(b.url, 0.0)} for b in self.backends.values()],
+                "load_bound": self.load_bound(),
+                **self._stats,
+            }
@@ -0,0 +1,252 @@
+"""
+Live scan sessions: latest-frame mailboxes and prediction smoothing for camera streams
+"""
+import asyncio
+import threading
+import time
+from typing import Optional
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class PredictionSmoother:
+    """
+    Exponential moving average over per-frame class probabilities
+
+    A prediction counts as stable once the smoothed top class has stayed the
+    same for stable_frames frames in a row with at least min_confidence.
+    """
+
+    def __init__(self, alpha: float = 0.4, stable_frames: int = 3, min_confidence: float = 0.5):
+        """
+        Initialize the smoother
+
+        Args:
+            alpha: Weight of the newest frame (1.0 disables smoothing)
+            stable_frames: Consecutive frames the top class must hold
+            min_confidence: Minimum smoothed confidence of a stable prediction
+        """
+        self.alpha = alpha
+        self.stable_frames = max(stable_frames, 1)
+        self.min_confidence = min_confidence
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget all previous frames"""
+        self._smoothed: Optional[np.ndarray] = None
+        self._top = -1
+        self._streak = 0
+
+    def update(self, probabilities: np.ndarray) -> tuple[int, float, bool]:
+        """
+        Add one frame's probabilities
+
+        Args:
+            probabilities: Class probabilities of the frame
+
+        Returns:
+            Tuple of (smoothed top class index, smoothed confidence, stable)
+        """
+        probabilities = np.asarray(probabilities, dtype=np.float32)
+        if self._smoothed is None or self._smoothed.shape != probabilities.shape:
+            self._smoothed = probabilities.copy()
+        else:
+            self._smoothed *= 1 - self.alpha
+            self._smoothed += self.alpha * probabilities
+
+        top = int(np.argmax(self._smoothed))
+        confidence = float(self._smoothed[top])
+        self._streak = self._streak + 1 if top == self._top else 1
+        self._top = top
+        return top, confidence, self._streak >= self.stable_frames and confidence >= self.min_confidence
+
+
+class LiveScanSession:
+    """
+    State of one live scan connection
+
+    Holds only the newest frame: a frame arriving before the previous one was
+    taken for inference replaces it and is counted as dropped. Frames are
+    taken at most max_fps times per second, which bounds the inference work a
+    single connection can cause no matter how fast it sends.
+    """
+
+    def __init__(self, smoother: PredictionSmoother, max_fps: float = 5.0):
+        """
+        Initialize the session
+
+        Args:
+            smoother: Smoother for this connection's predictions
+            max_fps: Maximum frames per second taken for inference
+        """
+        self.smoother = smoother
+        self.min_interval = 1 / max_fps if max_fps > 0 else 0.0
+        self.reported: Optional[str] = None
+        self.close_code = 1000
+        self.closed = False
+        self._latest: Optional[bytes] = None
+        self._ready = asyncio.Event()
+        self._last_taken = 0.0
+        self.received = 0
+        self.dropped = 0
+        self.processed = 0
+        self.failed = 0
+
+    def offer(self, frame: bytes) -> None:
+        """Store a frame, replacing (and dropping) any frame not yet taken"""
+        self.received += 1
+        if self._latest is not None:
+            self.dropped += 1
+        self._latest = frame
+        self._ready.set()
+
+    def reset(self) -> None:
+        """Restart smoothing, e.g. when the camera moves to another plate"""
+        self.smoother.reset()
+        self.reported = None
+
+    def close(self, code: int = 1000) -> None:
+        """Stop the session; next_frame() returns None from now on"""
+        if not self.closed:
+            self.closed = True
+            self.close_code = code
+        self._ready.set()
+
+    async def next_frame(self) -> Optional[bytes]:
+        """
+        Wait for the newest frame, no sooner than min_interval after the last one
+
+        Returns:
+            Frame bytes, or None once the session is closed
+        """
+        wait = self._last_taken + self.min_interval - time.monotonic()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        while self._latest is None and not self.closed:
+            self._ready.clear()
+            await self._ready.wait()
+        if self.closed:
+            return None
+        frame, self._latest = self._latest, None
+        self._last_taken = time.monotonic()
+        return frame
+
+    def stats(self) -> dict:
+        """Get frame counters and the share of received frames that were dropped"""
+        return {
+            "received": self.received,
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "drop_rate": round(self.dropped / self.received, 4) if self.received else 0.0
+        }
+
+
+class LiveScanManager:
+    """Caps concurrent live scan connections and totals their frame counters"""
+
+    def __init__(
+        self,
+        max_connections: int = 50,
+        max_fps: float = 5.0,
+        smoothing: float = 0.4,
+        stable_frames: int = 3,
+        min_confidence: float = 0.5
+    ):
+        """
+        Initialize the manager
+
+        Args:
+            max_connections: Maximum concurrent live scan connections
+            max_fps: Maximum frames per second taken per connection
+            smoothing: Weight of the newest frame in the moving average
+            stable_frames: Consecutive frames a prediction must hold to be stable
+            min_confidence: Minimum smoothed confidence of a stable prediction
+        """
+        self.max_connections = max_connections
+        self.max_fps = max_fps
+        self.smoothing = smoothing
+        self.stable_frames = stable_frames
+        self.min_confidence = min_confidence
+        self._sessions: set[LiveScanSession] = set()
+        self._lock = threading.Lock()
+        self._totals = {"received": 0, "processed": 0, "dropped": 0, "failed": 0}
+        self._stats = {"connections": 0, "rejected_connections": 0}
+
+    def open(self) -> Optional[LiveScanSession]:
+        """
+        Start a session
+
+        Returns:
+            LiveScanSession, or None when max_connections are already open
+        """
+        with self._lock:
+            if len(self._sessions) >= self.max_connections:
+                self._stats["rejected_connections"] += 1
+                return None
+            smoother = PredictionSmoother(self.smoothing, self.stable_frames, self.min_confidence)
+            session = LiveScanSession(smoother, self.max_fps)
+            self._sessions.add(session)
+            self._stats["connections"] += 1
+            return session
+
+    def close(self, session: LiveScanSession) -> None:
+        """End a session and add its counters to the totals"""
+        session.close(session.close_code)
+        with self._lock:
+            if session in self._sessions:
+                self._sessions.remove(session)
+                for key in self._totals:
+                    self._totals[key] += getattr(session, key)
+
+    def stats(self) -> dict:
+        """Get open connections and frame counters across all sessions"""
+        with self._lock:
+            totals = dict(self._totals)
+            for session in self._sessions:
+                for key in totals:
+                    totals[key] += getattr(session, key)
+            active = len(self._sessions)
+            stats = dict(self._stats)
+        return {
+            "active": active,
+            "max_connections": self.max_connections,
+            **stats,
+            "frames": {
+                **totals,
+                "drop_rate": round(totals["dropped"] / totals["received"], 4) if totals["received"] else 0.0
+            }
+        }
+
+
+# Global manager instance (singleton pattern)
+_manager_instance: Optional[LiveScanManager] = None
+
+
+def get_live_scan_manager(
+    max_connections: int = 50,
+    max_fps: float = 5.0,
+    smoothing: float = 0.4,
+    stable_frames: int = 3,
+    min_confidence: float = 0.5
+) -> LiveScanManager:
+    """
+    Get or create the global live scan manager
+
+    Args:
+        max_connections: Maximum concurrent live scan connections
+        max_fps: Maximum frames per second taken per connection
+        smoothing: Weight of the newest frame in the moving average
+        stable_frames: Consecutive frames a prediction must hold to be stable
+        min_confidence: Minimum smoothed confidence of a stable prediction
+
+    Returns:
+        LiveScanManager instance
+    """
+    global _manager_instance
+    if _manager_instance is None:
+        _manager_instance = LiveScanManager(max_connections, max_fps, smoothing, stable_frames, min_confidence)
+    return _manager_instance
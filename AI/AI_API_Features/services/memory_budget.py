@@ -0,0 +1,149 @@
+"""
+Memory budget: hold back or shed new work before the process is OOM-killed
+"""
+import asyncio
+import gc
+import threading
+import time
+from typing import Optional
+import logging
+
+from ..utils.memory import rss_bytes
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryBudget:
+    """
+    Admission decisions based on the process's resident memory
+
+    Below soft_ratio of the budget, work is admitted. Between the soft limit
+    and the budget, new work waits (up to max_wait_ms) for memory to drop,
+    e.g. as in-flight batches finish. At or above the budget, new work is
+    rejected at once. Readings are cached for check_interval_ms, so checking
+    on every request is cheap.
+    """
+
+    def __init__(
+        self,
+        budget_bytes: int,
+        soft_ratio: float = 0.85,
+        max_wait_ms: int = 1000,
+        check_interval_ms: int = 50
+    ):
+        """
+        Initialize the budget
+
+        Args:
+            budget_bytes: Resident memory at which new work is shed (0 disables the budget)
+            soft_ratio: Fraction of the budget above which new work is queued
+            max_wait_ms: How long queued work waits for memory before it is shed
+            check_interval_ms: How long an RSS reading is reused
+        """
+        self.budget_bytes = budget_bytes
+        self.soft_bytes = int(budget_bytes * soft_ratio)
+        self.max_wait = max_wait_ms / 1000
+        self.check_interval = check_interval_ms / 1000
+        self._rss = 0
+        self._read_at = 0.0
+        self._collected_at = 0.0
+        self._lock = threading.Lock()
+        self._stats = {"admitted": 0, "queued": 0, "shed": 0, "collections": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.budget_bytes > 0
+
+    def current(self) -> int:
+        """Resident memory in bytes (cached for check_interval)"""
+        now = time.monotonic()
+        if now - self._read_at >= self.check_interval:
+            self._rss = rss_bytes()
+            self._read_at = now
+        return self._rss
+
+    def state(self) -> str:
+        """ "ok", "high" (above the soft limit) or "over" (at or above the budget)"""
+        if not self.enabled:
+            return "ok"
+        rss = self.current()
+        if rss >= self.budget_bytes:
+            return "over"
+        return "high" if rss >= self.soft_bytes else "ok"
+
+    def _collect(self) -> None:
+        # Free Python garbage (decoded images held by reference cycles) at most every 5s
+        now = time.monotonic()
+        if now - self._collected_at < 5.0:
+            return
+        self._collected_at = now
+        gc.collect()
+        self._read_at = 0.0
+        with self._lock:
+            self._stats["collections"] += 1
+
+    async def admit(self) -> bool:
+        """
+        Decide whether a new request may start
+
+        Returns:
+            True to proceed, False to shed the request
+        """
+        state = self.state()
+        if state != "ok":
+            self._collect()
+            state = self.state()
+
+        if state == "high":
+            with self._lock:
+                self._stats["queued"] += 1
+            deadline = time.monotonic() + self.max_wait
+            while state == "high" and time.monotonic() < deadline:
+                await asyncio.sleep(self.check_interval)
+                state = self.state()
+
+        with self._lock:
+            if state == "ok":
+                self._stats["admitted"] += 1
+                return True
+            self._stats["shed"] += 1
+        logger.warning(f"Shedding request: RSS {self.current() / 2**20:.0f}MB, budget {self.budget_bytes / 2**20:.0f}MB")
+        return False
+
+    def stats(self) -> dict:
+        """Get the budget, current usage and admission counters"""
+        with self._lock:
+            stats = dict(self._stats)
+        return {
+            "budget_bytes": self.budget_bytes,
+            "soft_limit_bytes": self.soft_bytes,
+            "rss_bytes": self.current(),
+            "state": self.state(),
+            **stats,
+        }
+
+
+# Global budget instance (singleton pattern)
+_budget_instance: Optional[MemoryBudget] = None
+
+
+def get_memory_budget(
+    budget_bytes: int = 0,
+    soft_ratio: float = 0.85,
+    max_wait_ms: int = 1000
+) -> MemoryBudget:
+    """
+    Get or create the global memory budget
+
+    Args:
+        budget_bytes: Resident memory at which new work is shed (0 disables the budget)
+        soft_ratio: Fraction of the budget above which new work is queued
+        max_wait_ms: How long queued work waits for memory before it is shed
+
+    Returns:
+        MemoryBudget instance
+    """
+    global _budget_instance
+    if _budget_instance is None:
+        _budget_instance = MemoryBudget(budget_bytes, soft_ratio, max_wait_ms)
+    return _budget_instance
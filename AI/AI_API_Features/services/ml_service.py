@@ -6,19 +6,20 @@ from tensorflow import keras
 from tensorflow.keras import layers
 import numpy as np
 import json
-from PIL import Image
-import io
+import threading
 from pathlib import Path
-from typing import Tuple, Optional
+from typing import Any, Tuple, Optional
 import logging
 
+from .preprocessing import decode_image
+
 logger = logging.getLogger(__name__)
 
 
 class FoodRecognitionModel:
     """Service for loading and using the food recognition model"""
     
-    def __init__(self, model_path: Path, class_names_path: Path, img_size: int = 224):
+    def __init__(self, model_path: Path, class_names_path: Path, img_size: int = 224, artifact_cache: Any = None):
         """
         Initialize the food recognition model
         
@@ -26,15 +27,59 @@ class FoodRecognitionModel:
             model_path: Path to the Keras model file
             class_names_path: Path to the class names JSON file
             img_size: Input image size for the model
+            artifact_cache: ArtifactCache to serve a previously exported copy
+                of this model from (and to export it to after a fresh load)
         """
         self.model_path = model_path
         self.class_names_path = class_names_path
         self.img_size = img_size
-        self.model = None
+        self._model = None
+        self._keras_lock = threading.Lock()
+        self._artifact_path: Optional[Path] = None
+        self._serving = None
+        self._serving_meta: dict = {}
+        self.inference_model = None
         self.class_names = None
-        self._load_model()
+        if not self._load_artifact(artifact_cache):
+            self._load_model()
+            self._build_inference_model()
+            if artifact_cache is not None:
+                artifact_cache.store_async(self.model_path, self.img_size, self._model, self.inference_model)
         self._load_class_names()
     
+    @property
+    def model(self) -> Optional[keras.Model]:
+        """The Keras model; when serving from a cached artifact it is loaded on first access"""
+        if self._model is None and self._artifact_path is not None:
+            with self._keras_lock:
+                if self._model is None:
+                    logger.info(f"Loading Keras model from cached artifact {self._artifact_path.parent.name}")
+                    self._model = tf.keras.models.load_model(str(self._artifact_path))
+        return self._model
+    
+    @model.setter
+    def model(self, value: Optional[keras.Model]) -> None:
+        self._model = value
+    
+    def _load_artifact(self, artifact_cache: Any) -> bool:
+        """
+        Serve from a cached, already traced artifact of this model file
+        
+        Skips both the load_model attempt (and the rebuild fallback) and graph
+        tracing; the Keras model itself is only loaded if its layers or weights
+        are needed (class prototypes, resolution variants).
+        
+        Returns:
+            True if a cached artifact was loaded
+        """
+        if artifact_cache is None:
+            return False
+        cached = artifact_cache.load(self.model_path, self.img_size)
+        if cached is None:
+            return False
+        self._serving, self._serving_meta, self._artifact_path = cached
+        return True
+    
     def _load_model(self) -> None:
         """Load the trained Keras model"""
         try:
@@ -57,6 +102,64 @@ class FoodRecognitionModel:
             logger.error(f"Failed to load model: {e}")
             raise RuntimeError(f"Model loading failed: {e}")
     
+    @classmethod
+    def from_weights(cls, source: "FoodRecognitionModel", img_size: int) -> "FoodRecognitionModel":
+        """
+        Create a copy of a loaded model that runs at a different input resolution
+        
+        EfficientNetB0 followed by global average pooling accepts any spatial size,
+        so the trained weights can be reused as-is on smaller (cheaper) inputs.
+        
+        Args:
+            source: Loaded model to copy weights and class names from
+            img_size: Input image size for the new model
+            
+        Returns:
+            FoodRecognitionModel sharing the source's class names
+        """
+        if not source.is_loaded():
+            raise RuntimeError("Source model is not loaded")
+        
+        variant = cls.__new__(cls)
+        variant.model_path = source.model_path
+        variant.class_names_path = source.class_names_path
+        variant.img_size = img_size
+        variant.class_names = source.class_names
+        variant._keras_lock = threading.Lock()
+        variant._artifact_path = None
+        variant._serving = None
+        variant._serving_meta = {}
+        variant.model = variant._build_model()
+        try:
+            variant.model.set_weights(source.model.get_weights())
+        except ValueError as e:
+            raise RuntimeError(f"Cannot build {img_size}px variant: weights do not match architecture: {e}")
+        variant._build_inference_model()
+        logger.info(f"Built {img_size}px variant of {source.model_path.name}")
+        return variant
+    
+    @property
+    def embedding_dim(self) -> Optional[int]:
+        """Size of the pooled image embedding, or None if unavailable"""
+        if self._serving is not None:
+            return self._serving_meta.get("embedding_dim")
+        if self.inference_model is None:
+            return None
+        return int(self.inference_model.outputs[1].shape[-1])
+    
+    def _build_inference_model(self) -> None:
+        """Expose the pooled penultimate-layer embedding next to the class probabilities"""
+        try:
+            pooling_layer = self.model.get_layer("pooling_layer")
+            self.inference_model = keras.Model(
+                self.model.inputs,
+                [self.model.outputs[0], pooling_layer.output],
+                name=f"{self.model.name}_with_embeddings"
+            )
+        except ValueError:
+            logger.warning("Model has no pooling_layer; image embeddings are unavailable")
+            self.inference_model = None
+    
     def _build_model(self) -> keras.Model:
         """Build the EfficientNetB0 model architecture"""
         # Data augmentation layer (not used during inference)
@@ -108,15 +211,8 @@ class FoodRecognitionModel:
             Preprocessed image array or None if processing fails
         """
         try:
-            # Open image from bytes
-            image = Image.open(io.BytesIO(image_bytes))
-            
-            # Convert to RGB if needed
-            if image.mode != "RGB":
-                image = image.convert("RGB")
-            
-            # Resize to model input size
-            image = image.resize((self.img_size, self.img_size))
+            # Decode, convert to RGB and resize to model input size
+            image = decode_image(image_bytes, self.img_size)
             
             # Convert to numpy array and add batch dimension
             img_array = np.array(image)
@@ -128,6 +224,91 @@ class FoodRecognitionModel:
             logger.error(f"Image preprocessing failed: {e}")
             return None
     
+    def predict_batch(self, images: np.ndarray) -> np.ndarray:
+        """
+        Run the model on a batch of preprocessed images
+        
+        Args:
+            images: Array of shape (batch, img_size, img_size, 3)
+            
+        Returns:
+            Array of class probabilities with shape (batch, num_classes)
+        """
+        if self._serving is not None:
+            probabilities, _ = self._serve(images)
+            return probabilities
+        if self.model is None:
+            raise RuntimeError("Model not loaded")
+        
+        return np.asarray(self.model.predict_on_batch(images))
+    
+    def _serve(self, images: np.ndarray) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """Run the cached artifact's serving function (traced for any batch size)"""
+        outputs = self._serving.serve(tf.convert_to_tensor(images, dtype=tf.float32))
+        if self._serving_meta.get("embedding_dim") is None:
+            return np.asarray(outputs), None
+        return np.asarray(outputs[0]), np.asarray(outputs[1])
+    
+    def predict_batch_with_embeddings(self, images: np.ndarray) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """
+        Run the model on a batch and also return the pooled image embeddings
+        
+        Args:
+            images: Array of shape (batch, img_size, img_size, 3)
+            
+        Returns:
+            Tuple of (probabilities, embeddings); embeddings is None when the
+            model has no pooling_layer
+        """
+        if self._serving is not None:
+            return self._serve(images)
+        if self.inference_model is None:
+            return self.predict_batch(images), None
+        
+        probabilities, embeddings = self.inference_model.predict_on_batch(images)
+        return np.asarray(probabilities), np.asarray(embeddings)
+    
+    def class_prototypes(self) -> Optional[Tuple[list[str], np.ndarray]]:
+        """
+        Get one reference embedding per class from the classifier weights
+        
+        Each column of the output layer's kernel is the direction in embedding
+        space that scores highest for its class, which makes it a usable class
+        reference before any real images have been indexed.
+        
+        Returns:
+            Tuple of (class_names, array of shape (num_classes, embedding_dim)),
+            or None if the model has no output_layer
+        """
+        try:
+            kernel = self.model.get_layer("output_layer").get_weights()[0]
+        except ValueError:
+            return None
+        return list(self.class_names), np.asarray(kernel).T
+    
+    def decode_predictions(self, probabilities: np.ndarray, top_k: int = 1) -> list[Tuple[str, float]]:
+        """
+        Convert a single probability vector into ranked (class_name, confidence) pairs
+        
+        Args:
+            probabilities: Class probabilities for one image
+            top_k: Number of top predictions to return
+            
+        Returns:
+            List of (class_name, confidence) tuples, highest confidence first
+        """
+        if self.class_names is None:
+            raise RuntimeError("Class names not loaded")
+        
+        top_indices = np.argsort(probabilities)[-top_k:][::-1]
+        
+        results = []
+        for idx in top_indices:
+            if 0 <= idx < len(self.class_names):
+                results.append((self.class_names[idx], float(probabilities[idx])))
+        
+        return results
+    
     def predict(self, image_bytes: bytes) -> Tuple[str, float]:
         """
         Predict food class from image
@@ -138,7 +319,7 @@ class FoodRecognitionModel:
         Returns:
             Tuple of (predicted_class_name, confidence_score)
         """
-        if self.model is None or self.class_names is None:
+        if not self.is_loaded():
             raise RuntimeError("Model or class names not loaded")
         
         # Preprocess image
@@ -147,7 +328,7 @@ class FoodRecognitionModel:
             raise ValueError("Image preprocessing failed")
         
         # Make prediction
-        predictions = self.model.predict(processed_image, verbose=0)
+        predictions = self.predict_batch(processed_image)
         
         # Get the class with highest probability
         predicted_index = np.argmax(predictions[0])
@@ -172,7 +353,7 @@ class FoodRecognitionModel:
         Returns:
             List of (class_name, confidence) tuples
         """
-        if self.model is None or self.class_names is None:
+        if not self.is_loaded():
             raise RuntimeError("Model or class names not loaded")
         
         # Preprocess image
@@ -181,42 +362,10 @@ class FoodRecognitionModel:
             raise ValueError("Image preprocessing failed")
         
         # Make prediction
-        predictions = self.model.predict(processed_image, verbose=0)
-        
-        # Get top K predictions
-        top_indices = np.argsort(predictions[0])[-top_k:][::-1]
+        predictions = self.predict_batch(processed_image)
         
-        results = []
-        for idx in top_indices:
-            if 0 <= idx < len(self.class_names):
-                class_name = self.class_names[idx]
-                confidence = float(predictions[0][idx])
-                results.append((class_name, confidence))
-        
-        return results
+        return self.decode_predictions(predictions[0], top_k=top_k)
     
     def is_loaded(self) -> bool:
         """Check if model is loaded and ready"""
-        return self.model is not None and self.class_names is not None
-
-
-# Global model instance (singleton pattern)
-_model_instance: Optional[FoodRecognitionModel] = None
-
-
-def get_model(model_path: Path, class_names_path: Path, img_size: int = 224) -> FoodRecognitionModel:
-    """
-    Get or create the global model instance
-    
-    Args:
-        model_path: Path to the Keras model file
-        class_names_path: Path to the class names JSON file
-        img_size: Input image size for the model
-        
-    Returns:
-        FoodRecognitionModel instance
-    """
-    global _model_instance
-    if _model_instance is None:
-        _model_instance = FoodRecognitionModel(model_path, class_names_path, img_size)
-    return _model_instance
+        return (self._serving is not None or self._model is not None) and self.class_names is not None
@@ -0,0 +1,361 @@
+"""
+Several named models served side by side, loaded on demand and unloaded least recently used first
+"""
+import gc
+import json
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Optional
+import logging
+
+from ..utils.memory import rss_bytes
+from .ml_service import FoodRecognitionModel
+from .fake_model import FakeFoodModel
+from .model_registry import ModelRegistry, ModelVersion, model_checksum
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ModelSpec:
+    """Where a named model and its class list live"""
+    name: str
+    model_path: Path
+    class_names_path: Path
+    img_size: int = 224
+    version: Optional[str] = None  # defaults to the name and the model file's checksum prefix
+
+
+@dataclass
+class ManagedModel:
+    """A named model's registry and its memory accounting"""
+    spec: ModelSpec
+    registry: Optional[ModelRegistry] = None
+    memory_bytes: int = 0
+    last_used: float = field(default_factory=time.monotonic)
+    loads: int = 0
+    pinned: bool = False
+
+    def describe(self) -> dict:
+        registry = self.registry
+        return {
+            "name": self.spec.name,
+            "loaded": registry is not None,
+            "version": registry.active.version if registry is not None else None,
+            "img_size": self.spec.img_size,
+            "memory_bytes": self.memory_bytes if registry is not None else 0,
+            "idle_seconds": round(time.monotonic() - self.last_used, 1),
+            "loads": self.loads,
+            "pinned": self.pinned,
+        }
+
+
+def load_model_specs(config_path: Optional[Path], default_img_size: int = 224) -> list[ModelSpec]:
+    """
+    Read extra model definitions from a JSON file
+
+    The file maps model names to {"model_path", "class_names_path", "img_size"};
+    relative paths are resolved against the file's directory.
+
+    Args:
+        config_path: Path to the JSON file (None for no extra models)
+        default_img_size: Input size for entries without "img_size"
+
+    Returns:
+        Model specs in file order
+    """
+    if config_path is None:
+        return []
+    with open(config_path, "r", encoding="utf-8") as f:
+        entries = json.load(f)
+
+    base_dir = config_path.parent
+    specs = []
+    for name, entry in entries.items():
+        specs.append(ModelSpec(
+            name=name,
+            model_path=base_dir / entry["model_path"],
+            class_names_path=base_dir / entry["class_names_path"],
+            img_size=int(entry.get("img_size", default_img_size))
+        ))
+    return specs
+
+
+class ModelManager:
+    """
+    Serves several named models, each with its own class list
+
+    The default model is the existing versioned registry and always stays
+    loaded (its memory, estimated from the model file size, still counts
+    toward the budget). Other models get a registry of their own on first use. After each
+    load, while the models' combined memory exceeds the budget, the least
+    recently used idle model is unloaded; it is loaded again when next asked
+    for. A model's memory is the process RSS growth while it loaded and
+    warmed (the model file size if that reads as zero), so the accounting is
+    approximate when loads overlap with other work.
+    """
+
+    def __init__(
+        self,
+        default_name: str,
+        default_registry: ModelRegistry,
+        specs: list[ModelSpec],
+        registry_factory: Callable[[ModelSpec], ModelRegistry],
+        memory_budget_bytes: int = 0
+    ):
+        """
+        Initialize the manager
+
+        Args:
+            default_name: Name the default model is served under
+            default_registry: Registry of the default model (already loaded)
+            specs: Models that are loaded on demand
+            registry_factory: Builds an empty registry able to load a spec's model
+            memory_budget_bytes: Combined model memory above which idle models are unloaded (0: never)
+        """
+        self.default_name = default_name
+        self.memory_budget_bytes = memory_budget_bytes
+        self._factory = registry_factory
+        self._lock = threading.Lock()
+        self._load_locks: dict[str, threading.Lock] = {}
+        default_path = default_registry.active.model_path
+        self._models: dict[str, ManagedModel] = {
+            default_name: ManagedModel(
+                spec=ModelSpec(default_name, default_path, Path(), default_registry.active.model.img_size),
+                registry=default_registry,
+                memory_bytes=default_path.stat().st_size if default_path.exists() else 0,
+                pinned=True,
+                loads=1
+            )
+        }
+        for spec in specs:
+            if spec.name in self._models:
+                raise ValueError(f"Model name {spec.name} is configured twice")
+            self._models[spec.name] = ManagedModel(spec=spec)
+            self._load_locks[spec.name] = threading.Lock()
+        self._unloads = 0
+
+    def names(self) -> list[str]:
+        """Names of all servable models, the default first"""
+        return list(self._models)
+
+    def is_loaded(self, name: Optional[str] = None) -> bool:
+        """Check whether a model can serve without loading first"""
+        managed = self._models.get(name or self.default_name)
+        return managed is not None and managed.registry is not None
+
+    def registry(self, name: Optional[str] = None) -> ModelRegistry:
+        """
+        Get a model's registry, loading the model if needed
+
+        Args:
+            name: Model name (None for the default model)
+
+        Returns:
+            ModelRegistry with an active version
+
+        Raises:
+            KeyError: If no model of that name is configured
+        """
+        name = name or self.default_name
+        managed = self._models.get(name)
+        if managed is None:
+            raise KeyError(f"Unknown model {name}")
+        managed.last_used = time.monotonic()
+        registry = managed.registry
+        if registry is not None:
+            return registry
+
+        with self._load_locks[name]:
+            if managed.registry is None:
+                self._load(managed)
+            registry = managed.registry
+        self._enforce_budget(keep=name)
+        return registry
+
+    def acquire(self, name: Optional[str] = None) -> tuple[ModelRegistry, ModelVersion]:
+        """
+        Pin a model's active version for one batch, loading the model if needed
+
+        Args:
+            name: Model name (None for the default model)
+
+        Returns:
+            The model's registry (release the version there) and the pinned version
+        """
+        while True:
+            registry = self.registry(name)
+            try:
+                return registry, registry.acquire()
+            except RuntimeError:
+                # Unloaded between the lookup and the pin; load it again
+                continue
+
+    def try_acquire(self, name: Optional[str] = None) -> Optional[tuple[ModelRegistry, ModelVersion]]:
+        """
+        Pin a model's active version for one batch if the model is loaded
+
+        Args:
+            name: Model name (None for the default model)
+
+        Returns:
+            The model's registry and the pinned version, or None if the model
+            is not loaded (load it with registry() first)
+
+        Raises:
+            KeyError: If no model of that name is configured
+        """
+        name = name or self.default_name
+        managed = self._models.get(name)
+        if managed is None:
+            raise KeyError(f"Unknown model {name}")
+        registry = managed.registry
+        if registry is None:
+            return None
+        managed.last_used = time.monotonic()
+        try:
+            return registry, registry.acquire()
+        except RuntimeError:
+            # Unloaded between the lookup and the pin
+            return None
+
+    def _load(self, managed: ManagedModel) -> None:
+        spec = managed.spec
+        started = time.perf_counter()
+        rss_before = rss_bytes()
+        registry = self._factory(spec)
+        # Versions are prefixed with the model name so two names sharing a file
+        # (with different class lists) never share cached predictions
+        version = spec.version or f"{spec.name}-{model_checksum(spec.model_path)[:12]}"
+        registry.load(spec.model_path, version)
+        growth = rss_bytes() - rss_before
+        if growth <= 0:
+            growth = spec.model_path.stat().st_size if spec.model_path.exists() else 0
+        with self._lock:
+            managed.memory_bytes = growth
+            managed.registry = registry
+            managed.loads += 1
+            managed.last_used = time.monotonic()
+        logger.info(
+            f"Loaded model {spec.name} in {time.perf_counter() - started:.1f}s "
+            f"(~{managed.memory_bytes / 2**20:.0f}MB)"
+        )
+
+    def memory_bytes(self) -> int:
+        """Approximate memory held by the loaded models"""
+        with self._lock:
+            return sum(m.memory_bytes for m in self._models.values() if m.registry is not None)
+
+    def _enforce_budget(self, keep: str) -> None:
+        """Unload least recently used idle models until the loaded ones fit the budget"""
+        if not self.memory_budget_bytes:
+            return
+        while self.memory_bytes() > self.memory_budget_bytes:
+            with self._lock:
+                candidates = sorted(
+                    (m for m in self._models.values() if m.registry is not None and not m.pinned and m.spec.name != keep),
+                    key=lambda m: m.last_used
+                )
+            if not any(self.unload(m.spec.name) for m in candidates):
+                logger.warning(
+                    f"Loaded models use ~{self.memory_bytes() / 2**20:.0f}MB, over the "
+                    f"{self.memory_budget_bytes / 2**20:.0f}MB budget, but none can be unloaded"
+                )
+                return
+
+    def unload(self, name: str) -> bool:
+        """
+        Unload a model until it is next asked for
+
+        Args:
+            name: Model name
+
+        Returns:
+            True if it was unloaded; False if it is the default model, not
+            loaded or running a batch
+        """
+        managed = self._models.get(name)
+        if managed is None or managed.pinned:
+            return False
+        with self._load_locks[name]:
+            registry = managed.registry
+            if registry is None or not registry.unload():
+                return False
+            with self._lock:
+                managed.registry = None
+                freed, managed.memory_bytes = managed.memory_bytes, 0
+                self._unloads += 1
+        gc.collect()
+        logger.info(f"Unloaded model {name} (~{freed / 2**20:.0f}MB)")
+        return True
+
+    def stats(self) -> dict:
+        """Get every model's load state and the memory budget"""
+        with self._lock:
+            models = [m.describe() for m in self._models.values()]
+            unloads = self._unloads
+        return {
+            "default_model": self.default_name,
+            "memory_bytes": sum(m["memory_bytes"] for m in models),
+            "memory_budget_bytes": self.memory_budget_bytes,
+            "unloads": unloads,
+            "models": models,
+        }
+
+
+# Global manager instance (singleton pattern)
+_manager_instance: Optional[ModelManager] = None
+
+
+def get_model_manager(
+    default_name: str,
+    default_registry: ModelRegistry,
+    config_path: Optional[Path] = None,
+    img_size: int = 224,
+    warmup_batch_sizes: tuple[int, ...] = (1,),
+    memory_budget_bytes: int = 0,
+    fake_latency_ms: Optional[float] = None,
+    artifact_cache: Any = None
+) -> ModelManager:
+    """
+    Get or create the global model manager
+
+    Args:
+        default_name: Name the default model is served under
+        default_registry: Registry of the default model
+        config_path: JSON file naming the models loaded on demand (None for none)
+        img_size: Input size for models that do not set one
+        warmup_batch_sizes: Batch sizes to run once after a model loads
+        memory_budget_bytes: Combined model memory above which idle models are unloaded (0: never)
+        fake_latency_ms: Serve FakeFoodModels with this latency per batch instead of
+            loading the model files (for local clusters and load tests)
+        artifact_cache: ArtifactCache that model files are served from and exported to
+
+    Returns:
+        ModelManager instance
+    """
+    global _manager_instance
+    if _manager_instance is None:
+        specs = load_model_specs(config_path, img_size)
+
+        def registry_factory(spec: ModelSpec) -> ModelRegistry:
+            if fake_latency_ms is not None:
+                spec.version = spec.version or f"fake-{spec.name}"
+                return ModelRegistry(
+                    lambda path: FakeFoodModel(spec.class_names_path, spec.img_size, fake_latency_ms),
+                    keep_versions=1
+                )
+            return ModelRegistry(
+                lambda path: FoodRecognitionModel(path, spec.class_names_path, spec.img_size, artifact_cache),
+                warmup_batch_sizes,
+                keep_versions=1
+            )
+
+        _manager_instance = ModelManager(
+            default_name, default_registry, specs, registry_factory, memory_budget_bytes
+        )
+        if specs:
+            logger.info(f"Serving models: {', '.join(_manager_instance.names())}")
+    return _manager_instance
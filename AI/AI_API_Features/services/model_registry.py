@@ -0,0 +1,325 @@
+"""
+Versioned model registry with zero-downtime hot-swap and rollback
+"""
+import hashlib
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Optional
+import logging
+
+import numpy as np
+
+from .ml_service import FoodRecognitionModel
+from .fake_model import FakeFoodModel
+from .cascade import CascadeConfig, build_cascade_model
+from .embedding_index import drop_embedding_index
+
+logger = logging.getLogger(__name__)
+
+
+def model_checksum(model_path: Path) -> str:
+    """
+    Calculate the SHA-256 checksum of a model file
+
+    Args:
+        model_path: Path to the model file
+
+    Returns:
+        Hex digest string
+    """
+    digest = hashlib.sha256()
+    with open(model_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@dataclass
+class ModelVersion:
+    """A loaded model and its serving state"""
+    version: str
+    model_path: Path
+    model: Any
+    loaded_at: float = field(default_factory=time.time)
+    state: str = "standby"
+    in_flight: int = 0
+
+    def describe(self) -> dict:
+        return {
+            "version": self.version,
+            "model_path": str(self.model_path),
+            "state": self.state,
+            "in_flight": self.in_flight,
+            "loaded_at": self.loaded_at,
+        }
+
+
+class ModelRegistry:
+    """
+    Keeps the serving model and the previous one for instant rollback
+
+    New versions are loaded and warmed in the background, then swapped in
+    atomically. A swapped-out version keeps serving the batches it already
+    started ("draining") and then stays loaded as the rollback target; older
+    versions are unloaded once idle.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[Path], Any],
+        warmup_batch_sizes: tuple[int, ...] = (1,),
+        keep_versions: int = 2
+    ):
+        """
+        Initialize an empty registry
+
+        Args:
+            loader: Builds a ready-to-serve model from a model file
+            warmup_batch_sizes: Batch sizes to run once before a version goes live
+            keep_versions: Versions kept loaded, including the active one
+        """
+        self._loader = loader
+        self.warmup_batch_sizes = warmup_batch_sizes
+        self.keep_versions = max(keep_versions, 1)
+        self._versions: dict[str, ModelVersion] = {}
+        self._history: list[str] = []  # activation order, most recent last
+        self._active: Optional[ModelVersion] = None
+        self._lock = threading.Lock()
+        self._loading: dict[str, str] = {}
+        self._last_error: Optional[str] = None
+
+    @property
+    def active(self) -> ModelVersion:
+        """The version new requests are served from"""
+        active = self._active
+        if active is None:
+            raise RuntimeError("No model version loaded")
+        return active
+
+    def acquire(self) -> ModelVersion:
+        """Pin the active version for one batch; pair with release()"""
+        with self._lock:
+            active = self.active
+            active.in_flight += 1
+            return active
+
+    def release(self, model_version: ModelVersion) -> None:
+        """Unpin a version, finishing its drain if this was its last batch"""
+        with self._lock:
+            model_version.in_flight -= 1
+            if model_version.state == "draining" and model_version.in_flight == 0:
+                model_version.state = "standby"
+                logger.info(f"Model version {model_version.version} drained")
+                self._retire_old_locked()
+
+    def _warm(self, model: Any) -> None:
+        """Run dummy batches so graph tracing happens before the version takes traffic"""
+        for batch_size in self.warmup_batch_sizes:
+            images = np.zeros((batch_size, model.img_size, model.img_size, 3), dtype=np.uint8)
+            model.predict_batch_with_embeddings(images)
+
+    def load(self, model_path: Path, version: Optional[str] = None, activate: bool = True) -> ModelVersion:
+        """
+        Load and warm a model version, optionally making it active
+
+        Args:
+            model_path: Path to the model file
+            version: Version label (defaults to the file's checksum prefix)
+            activate: Swap the new version in once it is warm
+
+        Returns:
+            The loaded ModelVersion
+        """
+        version = version or model_checksum(model_path)[:12]
+        with self._lock:
+            existing = self._versions.get(version)
+        if existing is not None:
+            logger.info(f"Model version {version} already loaded")
+        else:
+            started = time.perf_counter()
+            model = self._loader(model_path)
+            self._warm(model)
+            existing = ModelVersion(version=version, model_path=model_path, model=model)
+            with self._lock:
+                self._versions[version] = existing
+            logger.info(f"Loaded and warmed model version {version} in {time.perf_counter() - started:.1f}s")
+
+        if activate:
+            self.activate(version)
+        return existing
+
+    def load_async(self, model_path: Path, version: Optional[str] = None) -> None:
+        """Load, warm and activate a version on a background thread"""
+        key = version or str(model_path)
+
+        def run() -> None:
+            try:
+                self.load(model_path, version)
+                self._last_error = None
+            except Exception as e:
+                logger.error(f"Background model load from {model_path} failed: {e}", exc_info=True)
+                self._last_error = f"{model_path}: {e}"
+            finally:
+                with self._lock:
+                    self._loading.pop(key, None)
+
+        with self._lock:
+            if key in self._loading:
+                raise RuntimeError(f"{key} is already loading")
+            self._loading[key] = str(model_path)
+        threading.Thread(target=run, name=f"model-load-{key}", daemon=True).start()
+
+    def activate(self, version: str) -> ModelVersion:
+        """
+        Atomically make a loaded version the active one
+
+        Args:
+            version: Version label
+
+        Returns:
+            The newly active ModelVersion
+        """
+        with self._lock:
+            target = self._versions.get(version)
+            if target is None:
+                raise KeyError(f"Model version {version} is not loaded")
+
+            previous = self._active
+            if previous is target:
+                return target
+
+            target.state = "active"
+            self._active = target
+            if version in self._history:
+                self._history.remove(version)
+            self._history.append(version)
+
+            if previous is not None:
+                previous.state = "draining" if previous.in_flight else "standby"
+                logger.info(f"Swapped model version {previous.version} -> {version}")
+            else:
+                logger.info(f"Activated model version {version}")
+
+            self._retire_old_locked()
+            return target
+
+    def rollback(self) -> ModelVersion:
+        """Re-activate the most recently replaced version"""
+        with self._lock:
+            candidates = [v for v in self._history[:-1] if v in self._versions]
+        if not candidates:
+            raise RuntimeError("No previous model version to roll back to")
+        return self.activate(candidates[-1])
+
+    def _retire_old_locked(self) -> None:
+        """Unload idle versions beyond the ones kept for serving and rollback"""
+        keep = set(self._history[-self.keep_versions:])
+        for version, model_version in list(self._versions.items()):
+            if version in keep or model_version.in_flight > 0:
+                continue
+            model_version.state = "retired"
+            model_version.model = None
+            del self._versions[version]
+            if version in self._history:
+                self._history.remove(version)
+            drop_embedding_index(version)
+            logger.info(f"Unloaded model version {version}")
+
+    def unload(self) -> bool:
+        """
+        Unload every version, leaving the registry empty
+
+        Returns:
+            False (and nothing unloaded) while any version is running a batch
+        """
+        with self._lock:
+            if any(v.in_flight for v in self._versions.values()):
+                return False
+            for version, model_version in self._versions.items():
+                model_version.state = "retired"
+                model_version.model = None
+                drop_embedding_index(version)
+            self._versions.clear()
+            self._history.clear()
+            self._active = None
+        return True
+
+    def status(self) -> dict:
+        """Get the active version, loaded versions and background loads"""
+        with self._lock:
+            return {
+                "active_version": self._active.version if self._active else None,
+                "versions": [self._versions[v].describe() for v in reversed(self._history) if v in self._versions],
+                "loading": list(self._loading.values()),
+                "last_error": self._last_error,
+            }
+
+
+# Global registry instance (singleton pattern)
+_registry_instance: Optional[ModelRegistry] = None
+
+
+def get_model_registry(
+    model_path: Path,
+    class_names_path: Path,
+    img_size: int = 224,
+    cascade: Optional[CascadeConfig] = None,
+    warmup_batch_sizes: tuple[int, ...] = (1,),
+    fake_latency_ms: Optional[float] = None,
+    artifact_cache: Any = None
+) -> ModelRegistry:
+    """
+    Get or create the global model registry, loading the initial version
+
+    Args:
+        model_path: Path to the initial Keras model file
+        class_names_path: Path to the class names JSON file
+        img_size: Input image size for the model
+        cascade: Wrap every version in a fast/full cascade when set
+        warmup_batch_sizes: Batch sizes to run once before a version goes live
+        fake_latency_ms: Serve a FakeFoodModel with this latency per batch instead of
+            loading model_path (for local clusters and load tests)
+        artifact_cache: ArtifactCache that model files are served from and exported to
+
+    Returns:
+        ModelRegistry with an active version
+    """
+    global _registry_instance
+    if _registry_instance is None:
+        if fake_latency_ms is not None:
+            registry = ModelRegistry(lambda path: FakeFoodModel(class_names_path, img_size, fake_latency_ms))
+            registry.load(model_path, version="fake")
+            _registry_instance = registry
+            return _registry_instance
+
+        def loader(path: Path):
+            model = FoodRecognitionModel(path, class_names_path, img_size, artifact_cache)
+            return build_cascade_model(model, cascade, artifact_cache) if cascade else model
+
+        registry = ModelRegistry(loader, warmup_batch_sizes)
+        registry.load(model_path)
+        _registry_instance = registry
+    return _registry_instance
+
+
+def get_model(
+    model_path: Path,
+    class_names_path: Path,
+    img_size: int = 224,
+    cascade: Optional[CascadeConfig] = None
+):
+    """
+    Get the active serving model
+
+    Args:
+        model_path: Path to the initial Keras model file
+        class_names_path: Path to the class names JSON file
+        img_size: Input image size for the model
+        cascade: Wrap the model in a fast/full cascade when set
+
+    Returns:
+        FoodRecognitionModel (or CascadeModel) of the active version
+    """
+    return get_model_registry(model_path, class_names_path, img_size, cascade).active.model
@@ -0,0 +1,207 @@
+"""
+In-memory food name indexes for fuzzy matching and prefix autocomplete
+"""
+import base64
+import bisect
+import json
+from typing import Iterable, Optional, Tuple
+
+from ..utils.helpers import normalize_food_name
+
+
+def ngrams(text: str, sizes: tuple[int, ...] = (2, 3)) -> set[str]:
+    """
+    Split text into the set of its character n-grams
+
+    Each word is padded with n-1 leading spaces and one trailing space (as
+    PostgreSQL's pg_trgm does for trigrams), so word starts weigh more than
+    word middles.
+
+    Args:
+        text: Food name or query
+        sizes: N-gram lengths to extract
+
+    Returns:
+        Set of n-grams
+    """
+    grams = set()
+    for word in normalize_food_name(text).split():
+        for n in sizes:
+            padded = " " * (n - 1) + word + " "
+            grams.update(padded[i:i + n] for i in range(len(padded) - n + 1))
+    return grams
+
+
+class NGramIndex:
+    """
+    Inverted index from character n-grams to names, ranked by n-gram similarity
+
+    Similarity is the Jaccard overlap of the two n-gram sets, so typos and
+    spelling variants ("cinabon", "cinnamon roll") still share many n-grams.
+    Trigrams carry most of the signal; bigrams keep very short names ("ful"
+    vs "fool") matchable. A query only touches the names that share at least
+    one n-gram with it. The index is immutable; rebuild it when the set of
+    names changes.
+    """
+
+    def __init__(self, names: Iterable[str], sizes: tuple[int, ...] = (2, 3)):
+        """
+        Build the index
+
+        Args:
+            names: Names to index (duplicates are ignored)
+            sizes: N-gram lengths to index
+        """
+        self.names = list(dict.fromkeys(names))
+        self.sizes = sizes
+        self._gram_counts: list[int] = []
+        self._postings: dict[str, list[int]] = {}
+        for name_id, name in enumerate(self.names):
+            grams = ngrams(name, sizes)
+            self._gram_counts.append(len(grams))
+            for gram in grams:
+                self._postings.setdefault(gram, []).append(name_id)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def search(
+        self,
+        query: str,
+        limit: int = 5,
+        min_score: float = 0.15,
+        exclude: Optional[set[str]] = None
+    ) -> list[Tuple[str, float]]:
+        """
+        Find the names most similar to a query
+
+        Args:
+            query: Free text or a (possibly misspelled) food name
+            limit: Maximum number of results
+            min_score: Minimum similarity (0-1) for a name to be returned
+            exclude: Names to leave out of the results
+
+        Returns:
+            List of (name, similarity) pairs, most similar first (ties by name)
+        """
+        query_grams = ngrams(query, self.sizes)
+        if not query_grams:
+            return []
+
+        shared: dict[int, int] = {}
+        for gram in query_grams:
+            for name_id in self._postings.get(gram, ()):
+                shared[name_id] = shared.get(name_id, 0) + 1
+
+        matches = []
+        for name_id, count in shared.items():
+            score = count / (len(query_grams) + self._gram_counts[name_id] - count)
+            name = self.names[name_id]
+            if score >= min_score and not (exclude and name in exclude):
+                matches.append((name, score))
+
+        matches.sort(key=lambda match: (-match[1], match[0]))
+        return matches[:limit]
+
+
+def encode_cursor(key: Tuple[int, str, int]) -> str:
+    """Encode a PrefixIndex sort key as an opaque URL-safe cursor"""
+    rank, name, food_id = key
+    return base64.urlsafe_b64encode(json.dumps([rank, name, food_id]).encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[int, str, int]:
+    """
+    Decode a cursor produced by encode_cursor
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        rank, name, food_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return int(rank), str(name), int(food_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+class PrefixIndex:
+    """
+    Sorted arrays of normalized names answering prefix queries with bisect
+
+    Every name is stored under its full normalized form and, as aliases, under
+    each of its later words ("apple pie" is also found by "pie"). Results are
+    ordered by a stable key (full-name matches before alias matches, then
+    alphabetically, then by id), and pages continue from the last key
+    returned, so pagination stays consistent even if the index is rebuilt
+    between requests.
+    """
+
+    def __init__(self, entries: Iterable[Tuple[str, int]]):
+        """
+        Build the index
+
+        Args:
+            entries: (name, id) pairs
+        """
+        names: list[Tuple[str, int, str]] = []
+        aliases: list[Tuple[str, int, str]] = []
+        for name, item_id in entries:
+            normalized = normalize_food_name(name)
+            names.append((normalized, item_id, name))
+            words = normalized.split()
+            for i in range(1, len(words)):
+                aliases.append((" ".join(words[i:]), item_id, name))
+        names.sort()
+        aliases.sort()
+        # rank 0: full names, rank 1: aliases
+        self._tiers = [
+            ([(key, item_id) for key, item_id, _ in tier], [name for _, _, name in tier])
+            for tier in (names, aliases)
+        ]
+        self._normalized = {item_id: key for key, item_id, _ in names}
+
+    def __len__(self) -> int:
+        return len(self._tiers[0][0])
+
+    def search(
+        self,
+        prefix: str,
+        limit: int = 10,
+        after: Optional[Tuple[int, str, int]] = None
+    ) -> Tuple[list[Tuple[str, int]], Optional[Tuple[int, str, int]]]:
+        """
+        Find names starting with a prefix
+
+        Args:
+            prefix: Typed text
+            limit: Maximum number of results
+            after: Sort key of the last result of the previous page
+
+        Returns:
+            Tuple of ((name, id) results, sort key to continue from or None
+            when there are no more results)
+        """
+        prefix = normalize_food_name(prefix)
+        if not prefix or limit <= 0:
+            return [], None
+
+        results: list[Tuple[str, int]] = []
+        last_key = None
+        start_rank = after[0] if after else 0
+        for rank in range(start_rank, len(self._tiers)):
+            keys, names = self._tiers[rank]
+            if after and rank == after[0]:
+                position = bisect.bisect_right(keys, (after[1], after[2]))
+            else:
+                position = bisect.bisect_left(keys, (prefix,))
+            while position < len(keys) and keys[position][0].startswith(prefix):
+                key, item_id = keys[position]
+                position += 1
+                # A name matched by its full form is not repeated through an alias
+                if rank > 0 and self._normalized[item_id].startswith(prefix):
+                    continue
+                if len(results) == limit:
+                    return results, last_key
+                results.append((names[position - 1], item_id))
+                last_key = (rank, key, item_id)
+        return results, None
@@ -0,0 +1,204 @@
+"""
+Perceptual-hash index that reuses predictions for re-encoded or slightly re-cropped photos
+"""
+import itertools
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+import logging
+
+import numpy as np
+from PIL import Image
+
+from .prediction_cache import CachedPrediction, top_k_prediction
+
+logger = logging.getLogger(__name__)
+
+HASH_BITS = 64
+# Thumbnails flatter than this (gray-level standard deviation) hash to 0
+MIN_CONTRAST = 2.0
+# Hashes with fewer set (or unset) bits than this say too little to tell photos apart
+MIN_SET_BITS = 8
+
+
+def dhash(images: np.ndarray) -> np.ndarray:
+    """
+    64-bit difference hashes of a batch of preprocessed images
+
+    Each image is reduced to a 9x8 grayscale thumbnail; bit i is set when a
+    pixel is brighter than its right neighbour. Recompression, resizing and
+    small crops barely move these gradients, so copies of a photo land a
+    few bits apart while different photos differ in about half the bits.
+    Flat images (a plain background, a lens cap) have no gradients to
+    hash and get 0.
+
+    Args:
+        images: Batch of shape (n, size, size, 3), uint8
+
+    Returns:
+        Array of n uint64 hashes
+    """
+    hashes = np.empty(len(images), dtype=np.uint64)
+    weights = np.array([0.299, 0.587, 0.114], dtype=np.float32)
+    for i, image in enumerate(images):
+        gray = Image.fromarray((image @ weights).astype(np.uint8))
+        pixels = np.asarray(gray.resize((9, 8), Image.BOX), dtype=np.int16)
+        if pixels.std() < MIN_CONTRAST:
+            hashes[i] = 0
+            continue
+        bits = (pixels[:, 1:] > pixels[:, :-1]).ravel()
+        hashes[i] = np.packbits(bits).view(">u8")[0]
+    return hashes
+
+
+def is_informative(image_hash: int) -> bool:
+    """
+    Check whether a hash has enough gradient detail to identify a photo
+
+    Flat images hash to 0 and smooth gradients to nearly all ones, so
+    unrelated photos of that kind collide; they are never indexed.
+    """
+    bits = int(image_hash).bit_count()
+    return MIN_SET_BITS <= bits <= HASH_BITS - MIN_SET_BITS
+
+
+@dataclass
+class _Entry:
+    image_hash: int
+    prediction: CachedPrediction
+
+
+class NearDuplicateIndex:
+    """
+    Predictions indexed by perceptual hash, searchable by Hamming distance
+
+    Multi-index hashing: each 64-bit hash is split into more chunks than the
+    distance threshold, so any hash within the threshold matches at least
+    one chunk exactly (pigeonhole). A lookup gathers the entries sharing a
+    chunk with the query and keeps the nearest one of the same model
+    version. Entries are evicted least recently used first. Uninformative
+    hashes (see is_informative) are neither stored nor looked up.
+    """
+
+    def __init__(self, max_entries: int = 10000, max_distance: int = 5, top_k: int = 10):
+        """
+        Initialize the index
+
+        Args:
+            max_entries: Maximum number of stored predictions
+            max_distance: Largest Hamming distance (bits of 64) treated as the same photo
+            top_k: Number of classes stored per prediction
+        """
+        chunks = next((c for c in (2, 4, 8, 16) if c > max_distance), None)
+        if chunks is None:
+            raise ValueError("max_distance must be below 16 bits")
+        self.max_entries = max_entries
+        self.max_distance = max_distance
+        self.top_k = top_k
+        self.chunks = chunks
+        self._chunk_bits = HASH_BITS // chunks
+        self._chunk_mask = (1 << self._chunk_bits) - 1
+        self._entries: OrderedDict[int, _Entry] = OrderedDict()
+        self._tables: list[dict[int, set[int]]] = [{} for _ in range(chunks)]
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._stats = {"lookups": 0, "hits": 0, "distance_total": 0, "evictions": 0, "uninformative": 0}
+
+    def _split(self, image_hash: int) -> list[int]:
+        return [(image_hash >> (i * self._chunk_bits)) & self._chunk_mask for i in range(self.chunks)]
+
+    def lookup(self, image_hash: int, model_version: str) -> Optional[tuple[CachedPrediction, int]]:
+        """
+        Find the stored prediction of the nearest photo within the threshold
+
+        Args:
+            image_hash: dHash of the query image
+            model_version: Only predictions of this model version are reused
+
+        Returns:
+            (prediction, Hamming distance), or None
+        """
+        image_hash = int(image_hash)
+        if not is_informative(image_hash):
+            with self._lock:
+                self._stats["uninformative"] += 1
+            return None
+        with self._lock:
+            self._stats["lookups"] += 1
+            best_id, best_distance = None, self.max_distance + 1
+            for table, chunk in zip(self._tables, self._split(image_hash)):
+                for entry_id in table.get(chunk, ()):
+                    entry = self._entries[entry_id]
+                    if entry.prediction.model_version != model_version:
+                        continue
+                    distance = (entry.image_hash ^ image_hash).bit_count()
+                    if distance < best_distance:
+                        best_id, best_distance = entry_id, distance
+            if best_id is None:
+                return None
+            self._entries.move_to_end(best_id)
+            self._stats["hits"] += 1
+            self._stats["distance_total"] += best_distance
+            return self._entries[best_id].prediction, best_distance
+
+    def add(self, image_hash: int, model_version: str, probabilities: np.ndarray) -> None:
+        """Store the top-k of a fresh prediction, evicting the least recently used entry if full"""
+        if self.max_entries <= 0:
+            return
+        image_hash = int(image_hash)
+        if not is_informative(image_hash):
+            return
+        entry = _Entry(image_hash, top_k_prediction(probabilities, model_version, self.top_k))
+        chunks = self._split(image_hash)
+        with self._lock:
+            entry_id = next(self._ids)
+            self._entries[entry_id] = entry
+            for table, chunk in zip(self._tables, chunks):
+                table.setdefault(chunk, set()).add(entry_id)
+            while len(self._entries) > self.max_entries:
+                old_id, old = self._entries.popitem(last=False)
+                for table, chunk in zip(self._tables, self._split(old.image_hash)):
+                    ids = table[chunk]
+                    ids.discard(old_id)
+                    if not ids:
+                        del table[chunk]
+                self._stats["evictions"] += 1
+
+    def stats(self) -> dict:
+        """Get lookup and hit counters, the mean distance of hits and the number of entries"""
+        with self._lock:
+            stats = dict(self._stats)
+            entries = len(self._entries)
+        distance_total = stats.pop("distance_total")
+        return {
+            **stats,
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "max_distance": self.max_distance,
+            "chunks": self.chunks,
+            "hit_rate": stats["hits"] / stats["lookups"] if stats["lookups"] else 0.0,
+            "mean_hit_distance": distance_total / stats["hits"] if stats["hits"] else None,
+        }
+
+
+# Global index instance (singleton pattern)
+_index_instance: Optional[NearDuplicateIndex] = None
+
+
+def get_near_duplicate_index(max_entries: int = 10000, max_distance: int = 5, top_k: int = 10) -> NearDuplicateIndex:
+    """
+    Get or create the global near-duplicate index
+
+    Args:
+        max_entries: Maximum number of stored predictions
+        max_distance: Largest Hamming distance treated as the same photo
+        top_k: Number of classes stored per prediction
+
+    Returns:
+        NearDuplicateIndex instance
+    """
+    global _index_instance
+    if _index_instance is None:
+        _index_instance = NearDuplicateIndex(max_entries, max_distance, top_k)
+    return _index_instance
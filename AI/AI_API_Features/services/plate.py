@@ -0,0 +1,179 @@
+"""
+Plate analysis: classify overlapping regions of one photo and merge them into the foods on the plate
+"""
+import io
+import math
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+from PIL import Image
+
+# (left, top, right, bottom) as fractions of the image width and height
+Box = tuple[float, float, float, float]
+
+
+@dataclass
+class PlateItem:
+    """One food found on the plate"""
+    food_name: str
+    confidence: float
+    regions: int
+    box: Box
+
+
+def region_boxes(grid: int = 3, window: float = 0.5) -> list[Box]:
+    """
+    Windows covering the image: the whole image first, then a grid of overlapping squares
+
+    Args:
+        grid: Windows per side (0 or 1 for the whole image only)
+        window: Window side relative to the image side
+
+    Returns:
+        Boxes as fractions of the image size
+    """
+    boxes = [(0.0, 0.0, 1.0, 1.0)]
+    if grid < 2:
+        return boxes
+    stride = (1.0 - window) / (grid - 1)
+    for row in range(grid):
+        for col in range(grid):
+            left, top = col * stride, row * stride
+            boxes.append((left, top, left + window, top + window))
+    return boxes
+
+
+def crop_regions(image_bytes: bytes, img_size: int, boxes: list[Box]) -> np.ndarray:
+    """
+    Decode an image once and cut each box out at the model input size
+
+    JPEGs are decoded at the lowest resolution that still gives every
+    window at least img_size pixels per side.
+
+    Args:
+        image_bytes: Raw image bytes
+        img_size: Model input width and height
+        boxes: Regions to cut, as fractions of the image size
+
+    Returns:
+        Array of shape (len(boxes), img_size, img_size, 3), uint8
+
+    Raises:
+        ValueError: If the image cannot be decoded
+    """
+    try:
+        image = Image.open(io.BytesIO(image_bytes))
+        if image.format == "JPEG":
+            smallest = min(min(right - left, bottom - top) for left, top, right, bottom in boxes)
+            side = math.ceil(img_size / smallest)
+            image.draft("RGB", (side, side))
+        image = image.convert("RGB")
+    except Exception as e:
+        raise ValueError(f"Could not decode image: {e}") from e
+
+    width, height = image.size
+    crops = np.empty((len(boxes), img_size, img_size, 3), dtype=np.uint8)
+    for i, (left, top, right, bottom) in enumerate(boxes):
+        crop = image.crop((
+            round(left * width), round(top * height), round(right * width), round(bottom * height)
+        ))
+        crops[i] = np.asarray(crop.resize((img_size, img_size), Image.BILINEAR))
+    return crops
+
+
+def _overlaps(a: Box, b: Box) -> bool:
+    return min(a[2], b[2]) > max(a[0], b[0]) and min(a[3], b[3]) > max(a[1], b[1])
+
+
+def _covers_image(box: Box) -> bool:
+    return box[0] <= 0.0 and box[1] <= 0.0 and box[2] >= 1.0 and box[3] >= 1.0
+
+
+def merge_regions(
+    probabilities: np.ndarray,
+    boxes: list[Box],
+    class_names: list[str],
+    min_confidence: float = 0.5,
+    max_items: int = 5
+) -> list[PlateItem]:
+    """
+    Merge the regions' predictions into a list of foods
+
+    Regions below min_confidence are dropped. Regions predicting the same
+    food whose boxes overlap, directly or through a chain of others, are
+    one item: its confidence is the best region's and its box is their
+    bounding box. The same food in disjoint regions (two separate servings)
+    stays two items. The whole-image region overlaps every window, so it
+    never joins regions; it only adds a food that no window found.
+
+    Args:
+        probabilities: Model output of shape (len(boxes), num_classes)
+        boxes: The regions, in the same order
+        class_names: Model class names
+        min_confidence: Top-1 probability a region needs to count
+        max_items: Maximum number of foods returned
+
+    Returns:
+        Foods ordered by confidence, highest first
+    """
+    labels = probabilities.argmax(axis=1)
+    confidences = probabilities.max(axis=1)
+    confident = [i for i in range(len(boxes)) if confidences[i] >= min_confidence]
+    regions = [i for i in confident if not _covers_image(boxes[i])]
+    found = {labels[i] for i in regions}
+    regions += [i for i in confident if _covers_image(boxes[i]) and labels[i] not in found]
+
+    # Union-find over regions of the same class with overlapping boxes
+    parent = {i: i for i in regions}
+
+    def root(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for a_pos, a in enumerate(regions):
+        for b in regions[a_pos + 1:]:
+            if labels[a] == labels[b] and _overlaps(boxes[a], boxes[b]):
+                parent[root(b)] = root(a)
+
+    groups: dict[int, list[int]] = {}
+    for i in regions:
+        groups.setdefault(root(i), []).append(i)
+
+    items = []
+    for members in groups.values():
+        best = max(members, key=lambda i: confidences[i])
+        items.append(PlateItem(
+            food_name=class_names[labels[best]],
+            confidence=float(confidences[best]),
+            regions=len(members),
+            box=(
+                min(boxes[i][0] for i in members),
+                min(boxes[i][1] for i in members),
+                max(boxes[i][2] for i in members),
+                max(boxes[i][3] for i in members),
+            )
+        ))
+    items.sort(key=lambda item: item.confidence, reverse=True)
+    return items[:max_items]
+
+
+def sum_nutrition(nutrition: list[Optional[dict[str, float]]]) -> dict[str, float]:
+    """
+    Add up nutrition values of the foods found in the database
+
+    Args:
+        nutrition: Per-food nutrition dicts (None for foods not in the database)
+
+    Returns:
+        Totals per nutrient, rounded to 0.1
+    """
+    totals: dict[str, float] = {}
+    for values in nutrition:
+        if values is None:
+            continue
+        for key, value in values.items():
+            totals[key] = totals.get(key, 0.0) + (value or 0.0)
+    return {key: round(value, 1) for key, value in totals.items()}
@@ -0,0 +1,148 @@
+"""
+In-process LRU cache of predictions keyed by image hash and model version
+"""
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CachedPrediction:
+    """Top-k classes and probabilities of one image under one model version"""
+    indices: np.ndarray
+    probabilities: np.ndarray
+    model_version: str
+
+    def dense(self, num_classes: int) -> np.ndarray:
+        """Expand into a full probability vector (classes outside the top-k get 0)"""
+        probabilities = np.zeros(num_classes, dtype=np.float32)
+        probabilities[self.indices] = self.probabilities
+        return probabilities
+
+
+def top_k_prediction(probabilities: np.ndarray, model_version: str, top_k: int) -> CachedPrediction:
+    """
+    Keep the top-k classes of a probability vector in storage form
+
+    Args:
+        probabilities: Full probability vector
+        model_version: Version of the model that produced it
+        top_k: Number of classes kept (models with fewer classes are stored whole)
+
+    Returns:
+        CachedPrediction with uint16 indices and float16 probabilities
+    """
+    top_k = min(top_k, len(probabilities))
+    top = np.argpartition(probabilities, -top_k)[-top_k:]
+    return CachedPrediction(
+        indices=top.astype(np.uint16),
+        probabilities=probabilities[top].astype(np.float16),
+        model_version=model_version
+    )
+
+
+class PredictionCache:
+    """
+    Least-recently-used cache of top-k predictions
+
+    Keys include the model version, so after a model swap lookups naturally
+    miss instead of serving the previous model's answer; stale entries age
+    out of the LRU order.
+    """
+
+    def __init__(self, max_entries: int = 10000, top_k: int = 10):
+        """
+        Initialize the cache
+
+        Args:
+            max_entries: Maximum number of cached predictions
+            top_k: Number of classes stored per prediction
+        """
+        self.max_entries = max_entries
+        self.top_k = top_k
+        self._entries: OrderedDict[tuple[str, str], CachedPrediction] = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, image_hash: str, model_version: str) -> Optional[CachedPrediction]:
+        """Look up a prediction, marking it as recently used"""
+        key = (model_version, image_hash)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry
+
+    def _top(self, probabilities: np.ndarray, model_version: str) -> CachedPrediction:
+        return top_k_prediction(probabilities, model_version, self.top_k)
+
+    def put(self, image_hash: str, model_version: str, probabilities: np.ndarray) -> None:
+        """Store the top-k of a probability vector, evicting the least recently used entry if full"""
+        if self.max_entries <= 0:
+            return
+        entry = self._top(probabilities, model_version)
+        key = (model_version, image_hash)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        """Get hit/miss counters and the number of cached entries"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "backend": "memory",
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+            }
+
+
+# Global cache instance (singleton pattern)
+_cache_instance: Optional[PredictionCache] = None
+
+
+def get_prediction_cache(
+    max_entries: int = 10000,
+    top_k: int = 10,
+    backend: str = "memory",
+    shared_path: Optional[Path] = None
+) -> PredictionCache:
+    """
+    Get or create the global prediction cache
+
+    Args:
+        max_entries: Maximum number of cached predictions (0 disables caching)
+        top_k: Number of classes stored per prediction
+        backend: "memory" (per process) or "shared" (one cache for all workers on the node)
+        shared_path: Memory-mapped cache file for the shared backend
+
+    Returns:
+        PredictionCache instance
+    """
+    global _cache_instance
+    if _cache_instance is None:
+        if backend == "shared" and max_entries > 0:
+            if shared_path is None:
+                raise ValueError("shared_path is required for the shared prediction cache backend")
+            from .shared_cache import SharedPredictionCache
+
+            _cache_instance = SharedPredictionCache(shared_path, max_entries, top_k)
+        else:
+            _cache_instance = PredictionCache(max_entries, top_k)
+    return _cache_instance
@@ -0,0 +1,411 @@
+"""
+Append-only prediction log, buffered in memory and written in bulk by a background thread
+"""
+import asyncio
+import os
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Optional
+import logging
+
+from ..models.database import PredictionLogEntry
+from ..utils import dumps
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - optional dependency
+    pa = None
+    pq = None
+
+logger = logging.getLogger(__name__)
+
+# Fields of a prediction record, in column order
+RECORD_FIELDS = (
+    "ts",
+    "request_id",
+    "endpoint",
+    "image_hash",
+    "model_name",
+    "model_version",
+    "predicted_food",
+    "confidence",
+    "top_foods",
+    "top_probabilities",
+    "latency_ms",
+    "cached",
+    "views",
+)
+
+
+class PredictionSink(ABC):
+    """Destination of flushed prediction records"""
+
+    name = "sink"
+
+    @abstractmethod
+    def write(self, records: list[dict]) -> None:
+        """Persist a batch of records; raise to have the batch retried"""
+
+    def close(self) -> None:
+        pass
+
+
+class JSONLSink(PredictionSink):
+    """One JSON line per prediction, in a file per UTC day"""
+
+    name = "jsonl"
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def write(self, records: list[dict]) -> None:
+        path = self.directory / f"predictions-{datetime.now(timezone.utc):%Y-%m-%d}.jsonl"
+        with open(path, "ab") as f:
+            f.write(b"".join(dumps(record) + b"\n" for record in records))
+
+
+class ParquetSink(PredictionSink):
+    """A Parquet part file per flush (written to a temporary name, then renamed)"""
+
+    name = "parquet"
+
+    def __init__(self, directory: Path):
+        if pa is None:
+            raise RuntimeError("PREDICTION_LOG_SINK=parquet requires pyarrow (pip install pyarrow)")
+        self.directory = directory
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.schema = pa.schema([
+            ("ts", pa.timestamp("ms", tz="UTC")),
+            ("request_id", pa.string()),
+            ("endpoint", pa.string()),
+            ("image_hash", pa.string()),
+            ("model_name", pa.string()),
+            ("model_version", pa.string()),
+            ("predicted_food", pa.string()),
+            ("confidence", pa.float32()),
+            ("top_foods", pa.list_(pa.string())),
+            ("top_probabilities", pa.list_(pa.float32())),
+            ("latency_ms", pa.float32()),
+            ("cached", pa.bool_()),
+            ("views", pa.int16()),
+        ])
+        self._seq = 0
+
+    def write(self, records: list[dict]) -> None:
+        table = pa.Table.from_pylist(records, schema=self.schema)
+        self._seq += 1
+        name = f"predictions-{datetime.now(timezone.utc):%Y%m%d-%H%M%S}-{os.getpid()}-{self._seq:06d}.parquet"
+        tmp_path = self.directory / f".{name}.tmp"
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, self.directory / name)
+
+
+class DatabaseSink(PredictionSink):
+    """
+    Bulk INSERTs into the prediction_log table (created if missing)
+
+    SQLAlchemy sends a list of rows as multi-row INSERT statements, so a
+    flush costs one round trip per few hundred predictions instead of one
+    per request. The table is created on the first write, on the flush
+    thread, so an unreachable database only delays (and retries) flushes.
+    """
+
+    name = "database"
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.table = PredictionLogEntry.__table__
+        self._table_ready = False
+
+    def write(self, records: list[dict]) -> None:
+        if not self._table_ready:
+            self.table.create(self.engine, checkfirst=True)
+            self._table_ready = True
+        with self.engine.begin() as connection:
+            connection.execute(self.table.insert(), records)
+
+
+class ReviewStore:
+    """Keeps a sample of low-confidence images on local disk for labeling"""
+
+    def __init__(self, directory: Path, confidence_threshold: float, sample_rate: float):
+        """
+        Initialize the store
+
+        Args:
+            directory: Folder for the images (one sub-folder per UTC day)
+            confidence_threshold: Only predictions below this confidence are sampled
+            sample_rate: Fraction of those images that are kept
+        """
+        self.directory = directory
+        self.confidence_threshold = confidence_threshold
+        self.sample_rate = sample_rate
+        self.saved = 0
+
+    def wants(self, confidence: float) -> bool:
+        """Decide whether to keep the image of a prediction"""
+        return confidence < self.confidence_threshold and random.random() < self.sample_rate
+
+    @staticmethod
+    def _extension(image_bytes: bytes) -> str:
+        if image_bytes[:3] == b"\xff\xd8\xff":
+            return ".jpg"
+        if image_bytes[:8] == b"\x89PNG\r\n\x1a\n":
+            return ".png"
+        if image_bytes[:4] == b"RIFF" and image_bytes[8:12] == b"WEBP":
+            return ".webp"
+        return ".img"
+
+    def save(self, image_bytes: bytes, record: dict) -> None:
+        """Write the image and its prediction record next to it"""
+        day_dir = self.directory / f"{record['ts']:%Y-%m-%d}"
+        day_dir.mkdir(parents=True, exist_ok=True)
+        stem = record["image_hash"][:16]
+        (day_dir / f"{stem}{self._extension(image_bytes)}").write_bytes(image_bytes)
+        (day_dir / f"{stem}.json").write_bytes(dumps(record))
+        self.saved += 1
+
+
+class PredictionLog:
+    """
+    Buffers prediction records and flushes them to a sink in bulk
+
+    Requests only append to an in-memory list. A background thread writes
+    the buffer when it reaches flush_rows or every flush_interval seconds.
+    When the sink falls behind and the buffer is full, new records wait up
+    to max_wait_ms for room and are then dropped (and counted); records of
+    a failed flush go back into the buffer and are retried.
+    """
+
+    def __init__(
+        self,
+        sink: PredictionSink,
+        flush_rows: int = 500,
+        flush_interval: float = 5.0,
+        max_buffer: int = 10000,
+        max_wait_ms: int = 50,
+        review: Optional[ReviewStore] = None
+    ):
+        """
+        Initialize the log
+
+        Args:
+            sink: Where flushed records go
+            flush_rows: Buffered records that trigger a flush
+            flush_interval: Seconds after which a non-empty buffer is flushed anyway
+            max_buffer: Records held at most while the sink is slow or failing
+            max_wait_ms: How long a request waits for buffer room before its record is dropped
+            review: Store sampling low-confidence images, if any
+        """
+        self.sink = sink
+        self.flush_rows = max(flush_rows, 1)
+        self.flush_interval = flush_interval
+        self.max_buffer = max(max_buffer, self.flush_rows)
+        self.max_wait = max_wait_ms / 1000
+        self.review = review
+        self._buffer: list[tuple[dict, Optional[bytes]]] = []
+        self._in_flight = 0  # records handed to the sink and not yet written
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+        self._stats = {
+            "recorded": 0,
+            "written": 0,
+            "dropped": 0,
+            "waited": 0,
+            "flushes": 0,
+            "failed_flushes": 0,
+            "last_flush_ms": 0.0,
+        }
+
+    def start(self) -> None:
+        """Start the background flush thread"""
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._run, name="prediction-log", daemon=True)
+        self._thread.start()
+        logger.info(f"Prediction log writing to the {self.sink.name} sink")
+
+    def close(self, timeout: float = 10.0) -> None:
+        """Stop the flush thread and write everything still buffered"""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+        self._flush()
+        self.sink.close()
+        logger.info(f"Prediction log closed ({self._stats['written']} records written)")
+
+    async def record(self, record: dict[str, Any], image_bytes: Optional[bytes] = None) -> bool:
+        """
+        Append a prediction record
+
+        Args:
+            record: Prediction fields (see RECORD_FIELDS)
+            image_bytes: The image, kept for review if the store samples it
+
+        Returns:
+            False if the record was dropped because the buffer stayed full
+        """
+        if image_bytes is not None and not (self.review and self.review.wants(record["confidence"])):
+            image_bytes = None
+
+        if self._pending() >= self.max_buffer:
+            # Backpressure: give the flush thread a moment to catch up
+            deadline = time.monotonic() + self.max_wait
+            with self._cond:
+                self._stats["waited"] += 1
+                self._cond.notify()
+            while self._pending() >= self.max_buffer and time.monotonic() < deadline:
+                await asyncio.sleep(0.005)
+
+        with self._cond:
+            if self._pending() >= self.max_buffer:
+                self._stats["dropped"] += 1
+                return False
+            self._buffer.append((record, image_bytes))
+            self._stats["recorded"] += 1
+            if len(self._buffer) >= self.flush_rows:
+                self._cond.notify()
+        return True
+
+    def _pending(self) -> int:
+        return len(self._buffer) + self._in_flight
+
+    def _take(self) -> list[tuple[dict, Optional[bytes]]]:
+        with self._cond:
+            batch, self._buffer = self._buffer, []
+            self._in_flight = len(batch)
+        return batch
+
+    def _flush(self) -> bool:
+        """Write the buffer to the sink; on failure put it back for the next attempt"""
+        batch = self._take()
+        if not batch:
+            return True
+        started = time.perf_counter()
+        try:
+            self.sink.write([record for record, _ in batch])
+        except Exception as e:
+            logger.error(f"Prediction log flush of {len(batch)} records failed: {e}")
+            with self._cond:
+                self._stats["failed_flushes"] += 1
+                # Retry with the next flush; the oldest records go first if they no longer all fit
+                pending = batch + self._buffer
+                self._stats["dropped"] += max(0, len(pending) - self.max_buffer)
+                self._buffer = pending[-self.max_buffer:]
+                self._in_flight = 0
+            return False
+
+        with self._cond:
+            self._in_flight = 0
+            self._stats["flushes"] += 1
+            self._stats["written"] += len(batch)
+            self._stats["last_flush_ms"] = (time.perf_counter() - started) * 1000
+        if self.review is not None:
+            for record, image_bytes in batch:
+                if image_bytes is None:
+                    continue
+                try:
+                    self.review.save(image_bytes, record)
+                except OSError as e:
+                    logger.warning(f"Could not save review image: {e}")
+        return True
+
+    def _run(self) -> None:
+        """Flush on size or age; back off while the sink is failing"""
+        backoff = 0.0
+        while True:
+            with self._cond:
+                deadline = time.monotonic() + max(self.flush_interval, backoff)
+                # While backing off, a full buffer does not cut the wait short
+                while self._running and (backoff or len(self._buffer) < self.flush_rows):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(timeout=remaining)
+                if not self._running:
+                    return
+            if self._flush():
+                backoff = 0.0
+            else:
+                backoff = min(max(backoff * 2, 1.0), 60.0)
+
+    def stats(self) -> dict:
+        """Get buffer depth, write and drop counters and the last flush time"""
+        with self._cond:
+            stats = {**self._stats, "buffered": self._pending()}
+        stats["sink"] = self.sink.name
+        if self.review is not None:
+            stats["review_saved"] = self.review.saved
+        return stats
+
+
+# Global prediction log instance (singleton pattern)
+_log_instance: Optional[PredictionLog] = None
+
+
+def get_prediction_log(
+    sink: str = "jsonl",
+    directory: Optional[Path] = None,
+    engine=None,
+    flush_rows: int = 500,
+    flush_interval: float = 5.0,
+    max_buffer: int = 10000,
+    max_wait_ms: int = 50,
+    review_dir: Optional[Path] = None,
+    review_confidence_threshold: float = 0.3,
+    review_sample_rate: float = 0.0
+) -> PredictionLog:
+    """
+    Get or create the global prediction log, starting its flush thread
+
+    Args:
+        sink: "jsonl", "parquet" (files under directory) or "database" (rows via engine)
+        directory: Folder for file sinks
+        engine: SQLAlchemy engine for the database sink
+        flush_rows: Buffered records that trigger a flush
+        flush_interval: Seconds after which a non-empty buffer is flushed anyway
+        max_buffer: Records held at most while the sink is slow or failing
+        max_wait_ms: How long a request waits for buffer room before its record is dropped
+        review_dir: Folder for sampled low-confidence images
+        review_confidence_threshold: Only predictions below this confidence are sampled
+        review_sample_rate: Fraction of low-confidence images kept (0 disables sampling)
+
+    Returns:
+        Running PredictionLog instance
+    """
+    global _log_instance
+    if _log_instance is None:
+        if sink == "database":
+            sink_instance = DatabaseSink(engine)
+        elif sink == "parquet":
+            sink_instance = ParquetSink(directory)
+        elif sink == "jsonl":
+            sink_instance = JSONLSink(directory)
+        else:
+            raise ValueError(f"Unknown prediction log sink: {sink}")
+        review = None
+        if review_dir is not None and review_sample_rate > 0:
+            review = ReviewStore(review_dir, review_confidence_threshold, review_sample_rate)
+        _log_instance = PredictionLog(sink_instance, flush_rows, flush_interval, max_buffer, max_wait_ms, review)
+        _log_instance.start()
+    return _log_instance
+
+
+def shutdown_prediction_log() -> None:
+    """Flush and close the global prediction log if it was started"""
+    global _log_instance
+    if _log_instance is not None:
+        _log_instance.close()
+        _log_instance = None
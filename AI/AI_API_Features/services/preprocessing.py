@@ -0,0 +1,195 @@
+"""
+Parallel batched image preprocessing into preallocated input buffers
+"""
+import io
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+import logging
+
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+
+def decode_image(image_bytes: bytes, img_size: int) -> Image.Image:
+    """
+    Decode image bytes into an RGB image resized to the model input size
+
+    Args:
+        image_bytes: Raw image bytes
+        img_size: Target width and height
+
+    Returns:
+        Resized RGB PIL image
+    """
+    image = Image.open(io.BytesIO(image_bytes))
+
+    # Let the JPEG decoder scale down by 1/2, 1/4 or 1/8 while decoding, so a
+    # 12-megapixel photo never materializes at full resolution
+    if image.format == "JPEG":
+        image.draft("RGB", (img_size, img_size))
+
+    # Convert to RGB if needed
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+
+    # Resize to model input size
+    return image.resize((img_size, img_size))
+
+
+class BufferPool:
+    """Fixed set of reusable (batch, size, size, 3) uint8 input buffers"""
+
+    def __init__(self, batch_size: int, img_size: int, pool_size: int = 2):
+        """
+        Initialize the pool
+
+        Args:
+            batch_size: Number of image slots per buffer
+            img_size: Width and height of each slot
+            pool_size: Number of buffers to preallocate
+        """
+        self.shape = (batch_size, img_size, img_size, 3)
+        self._free: queue.SimpleQueue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self.allocations = 0
+        for _ in range(pool_size):
+            self._free.put(self._allocate())
+
+    def _allocate(self) -> np.ndarray:
+        with self._lock:
+            self.allocations += 1
+        return np.empty(self.shape, dtype=np.uint8)
+
+    def acquire(self) -> np.ndarray:
+        """Take a free buffer, allocating a new one only if the pool is exhausted"""
+        try:
+            return self._free.get_nowait()
+        except queue.Empty:
+            logger.debug("Input buffer pool exhausted, allocating a new buffer")
+            return self._allocate()
+
+    def release(self, buffer: np.ndarray) -> None:
+        """Return a buffer to the pool"""
+        self._free.put(buffer)
+
+
+@dataclass
+class PreparedBatch:
+    """Decoded images written into the first rows of a pooled buffer"""
+    buffer: np.ndarray
+    ok: list[bool]
+    seconds: float
+
+    @property
+    def images(self) -> np.ndarray:
+        """View over the rows that were filled (no copy)"""
+        return self.buffer[:len(self.ok)]
+
+    def compact(self, keep: list[int]) -> np.ndarray:
+        """
+        Move the selected rows to the front of the buffer in place
+
+        Args:
+            keep: Ascending row indices to keep
+
+        Returns:
+            View over the first len(keep) rows
+        """
+        for target, source in enumerate(keep):
+            if target != source:
+                self.buffer[target] = self.buffer[source]
+        return self.buffer[:len(keep)]
+
+
+class BatchPreprocessor:
+    """
+    Decodes a batch of images on a thread pool straight into a pooled buffer
+
+    Pillow releases the GIL while decoding and resizing, so decoding a batch
+    in parallel scales with cores. Each image is written into its slot of a
+    reused (batch, size, size, 3) buffer that is handed to the model as-is.
+    """
+
+    def __init__(self, img_size: int, max_batch_size: int, workers: int = 4, pool_size: int = 2):
+        """
+        Initialize the preprocessor
+
+        Args:
+            img_size: Model input width and height
+            max_batch_size: Maximum number of images per batch
+            workers: Number of decode threads
+            pool_size: Number of preallocated batch buffers
+        """
+        self.img_size = img_size
+        self.max_batch_size = max_batch_size
+        self.pool = BufferPool(max_batch_size, img_size, pool_size)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="preprocess")
+        self._lock = threading.Lock()
+        self._stats = {"batches": 0, "images": 0, "failed": 0, "seconds": 0.0, "last_batch_ms": 0.0}
+
+    def _decode_into(self, image_bytes: bytes, out: np.ndarray) -> bool:
+        try:
+            out[...] = decode_image(image_bytes, self.img_size)
+            return True
+        except Exception as e:
+            logger.error(f"Image preprocessing failed: {e}")
+            return False
+
+    def preprocess(self, images: list[bytes]) -> PreparedBatch:
+        """
+        Decode a batch of images in parallel
+
+        The returned batch must be passed to release() once the model is done
+        with it.
+
+        Args:
+            images: Raw image bytes, at most max_batch_size items
+
+        Returns:
+            PreparedBatch with one ok flag per input image
+        """
+        if len(images) > self.max_batch_size:
+            raise ValueError(f"Batch of {len(images)} exceeds maximum of {self.max_batch_size}")
+
+        started = time.perf_counter()
+        buffer = self.pool.acquire()
+        if len(images) == 1:
+            ok = [self._decode_into(images[0], buffer[0])]
+        else:
+            ok = list(self._executor.map(self._decode_into, images, buffer[:len(images)]))
+        seconds = time.perf_counter() - started
+
+        with self._lock:
+            self._stats["batches"] += 1
+            self._stats["images"] += len(images)
+            self._stats["failed"] += ok.count(False)
+            self._stats["seconds"] += seconds
+            self._stats["last_batch_ms"] = seconds * 1000
+
+        return PreparedBatch(buffer=buffer, ok=ok, seconds=seconds)
+
+    def release(self, batch: PreparedBatch) -> None:
+        """Return a batch's buffer to the pool"""
+        self.pool.release(batch.buffer)
+
+    def stats(self) -> dict:
+        """Get buffer allocation counts and preprocessing time per batch"""
+        with self._lock:
+            stats = dict(self._stats)
+        batches = stats.pop("batches")
+        total_seconds = stats.pop("seconds")
+        return {
+            **stats,
+            "batches": batches,
+            "buffer_allocations": self.pool.allocations,
+            "avg_batch_ms": total_seconds * 1000 / batches if batches else 0.0,
+        }
+
+    def shutdown(self) -> None:
+        """Stop the decode threads"""
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,221 @@
+"""
+Load-adaptive serving quality: trade accuracy for latency while the server is overloaded
+"""
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ServingTier:
+    """How a request is served at one quality level"""
+    name: str
+    img_size: Optional[int] = None  # None: the model's own input size
+    tta: bool = True
+    cache_only: bool = False
+
+
+def build_tiers(resolutions: list[int], cache_only: bool = True) -> list[ServingTier]:
+    """
+    Serving tiers from full quality down to the cheapest, each degrading the one before
+
+    Test-time augmentation goes first (it only affects low-confidence
+    requests but costs several forward passes each), then the input
+    resolution steps down through the given buckets, and finally only
+    cached predictions are served.
+
+    Args:
+        resolutions: Reduced input sizes, largest first
+        cache_only: Add a last tier that answers from the prediction cache only
+
+    Returns:
+        Tiers, full quality first
+    """
+    tiers = [ServingTier("full"), ServingTier("no_tta", tta=False)]
+    for size in sorted(set(resolutions), reverse=True):
+        tiers.append(ServingTier(f"{size}px", img_size=size, tta=False))
+    if cache_only:
+        tiers.append(ServingTier("cache_only", img_size=tiers[-1].img_size, tta=False, cache_only=True))
+    return tiers
+
+
+class QualityController:
+    """
+    Picks the serving tier from queue depth and latency, with hysteresis
+
+    The scheduler reports the queue depth and the slowest job's latency
+    (queue wait plus inference) after every batch; latency is smoothed
+    with an exponential moving average. While the queue is deeper than
+    queue_high or the smoothed latency is above latency_high, the
+    controller steps down one tier at most every step_down_seconds. Once
+    both stay below half their limit for step_up_seconds it steps back up
+    one tier, and needs another calm period for the next step. With no
+    batches for step_up_seconds the server is idle and counts as calm.
+    """
+
+    def __init__(
+        self,
+        tiers: list[ServingTier],
+        queue_high: int = 32,
+        latency_high_ms: float = 500.0,
+        step_down_seconds: float = 2.0,
+        step_up_seconds: float = 15.0,
+        smoothing: float = 0.2
+    ):
+        """
+        Initialize the controller at full quality
+
+        Args:
+            tiers: Serving tiers, full quality first
+            queue_high: Scheduler queue depth that counts as overload
+            latency_high_ms: Smoothed job latency that counts as overload
+            step_down_seconds: Minimum time between two steps down
+            step_up_seconds: Calm time required for each step up
+            smoothing: Weight of the newest latency sample in the moving average
+        """
+        self.tiers = tiers
+        self.queue_high = queue_high
+        self.latency_high = latency_high_ms / 1000
+        self.step_down_seconds = step_down_seconds
+        self.step_up_seconds = step_up_seconds
+        self.smoothing = smoothing
+
+        self._lock = threading.Lock()
+        self._level = 0
+        now = time.monotonic()
+        self._changed_at = now
+        self._observed_at = now
+        self._calm_since: Optional[float] = None
+        self._latency = 0.0
+        self._queue_depth = 0
+        self._transitions = 0
+        self._served = {tier.name: 0 for tier in tiers}
+        self._seconds_in = {tier.name: 0.0 for tier in tiers}
+
+    def observe(self, queue_depth: int, latency: float) -> None:
+        """
+        Record the load after a batch
+
+        Args:
+            queue_depth: Jobs still waiting in the scheduler
+            latency: Seconds from enqueue to result of the batch's slowest job
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._queue_depth = queue_depth
+            self._latency += self.smoothing * (latency - self._latency)
+            self._observed_at = now
+            self._adjust(now)
+
+    def tier(self) -> ServingTier:
+        """Get the tier to serve a new request at (counted as served at it)"""
+        now = time.monotonic()
+        with self._lock:
+            self._adjust(now)
+            tier = self.tiers[self._level]
+            self._served[tier.name] += 1
+        return tier
+
+    def _set_level(self, level: int, now: float) -> None:
+        old = self.tiers[self._level].name
+        stepping_down = level > self._level
+        self._seconds_in[old] += now - self._changed_at
+        self._level = level
+        self._changed_at = now
+        self._transitions += 1
+        new = self.tiers[level].name
+        if stepping_down:
+            logger.warning(
+                f"Serving quality {old} -> {new} (queue {self._queue_depth}, "
+                f"latency {self._latency * 1000:.0f}ms)"
+            )
+        else:
+            logger.info(f"Serving quality {old} -> {new}")
+
+    def _adjust(self, now: float) -> None:
+        """Step the tier down or up if the load calls for it (lock held)"""
+        if now - self._observed_at >= self.step_up_seconds:
+            # No batch ran for a while: nothing is queued or slow any more, since the last batch
+            self._queue_depth = 0
+            self._latency = 0.0
+            if self._calm_since is None:
+                self._calm_since = self._observed_at
+
+        overloaded = self._queue_depth > self.queue_high or self._latency > self.latency_high
+        calm = self._queue_depth <= self.queue_high / 2 and self._latency <= self.latency_high / 2
+
+        if overloaded:
+            self._calm_since = None
+            if self._level < len(self.tiers) - 1 and now - self._changed_at >= self.step_down_seconds:
+                self._set_level(self._level + 1, now)
+        elif calm:
+            if self._calm_since is None:
+                self._calm_since = now
+            # One step per calm period that has passed (several after an idle spell)
+            while self._level > 0:
+                due = max(self._calm_since, self._changed_at) + self.step_up_seconds
+                if now < due:
+                    break
+                self._set_level(self._level - 1, due)
+        else:
+            self._calm_since = None
+
+    def stats(self) -> dict:
+        """Get the current tier, the load signals and requests and time spent per tier"""
+        now = time.monotonic()
+        with self._lock:
+            self._adjust(now)
+            seconds_in = dict(self._seconds_in)
+            seconds_in[self.tiers[self._level].name] += now - self._changed_at
+            return {
+                "tier": self.tiers[self._level].name,
+                "level": self._level,
+                "tiers": [tier.name for tier in self.tiers],
+                "queue_depth": self._queue_depth,
+                "latency_ms": round(self._latency * 1000, 1),
+                "transitions": self._transitions,
+                "requests_by_tier": dict(self._served),
+                "seconds_by_tier": {name: round(seconds, 1) for name, seconds in seconds_in.items()},
+            }
+
+
+# Global controller instance (singleton pattern)
+_controller_instance: Optional[QualityController] = None
+
+
+def get_quality_controller(
+    resolutions: list[int],
+    queue_high: int = 32,
+    latency_high_ms: float = 500.0,
+    step_down_seconds: float = 2.0,
+    step_up_seconds: float = 15.0,
+    cache_only: bool = True
+) -> QualityController:
+    """
+    Get or create the global serving quality controller
+
+    Args:
+        resolutions: Reduced input sizes to step through
+        queue_high: Scheduler queue depth that counts as overload
+        latency_high_ms: Smoothed job latency that counts as overload
+        step_down_seconds: Minimum time between two steps down
+        step_up_seconds: Calm time required for each step up
+        cache_only: End with a tier that answers from the prediction cache only
+
+    Returns:
+        QualityController instance
+    """
+    global _controller_instance
+    if _controller_instance is None:
+        _controller_instance = QualityController(
+            build_tiers(resolutions, cache_only),
+            queue_high,
+            latency_high_ms,
+            step_down_seconds,
+            step_up_seconds
+        )
+    return _controller_instance
@@ -0,0 +1,599 @@
+"""
+Deadline-aware batching scheduler in front of the food recognition model
+"""
+import heapq
+import itertools
+import threading
+import time
+import weakref
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Optional
+import logging
+
+import numpy as np
+
+from ..utils.startup import mark_startup
+from .ml_service import FoodRecognitionModel
+from .model_manager import ModelManager
+from .model_registry import ModelVersion
+from .near_duplicate import NearDuplicateIndex, dhash
+from .preprocessing import BatchPreprocessor
+from .quality import QualityController
+from .tta import MAX_VIEWS, augment_views, average_views
+
+logger = logging.getLogger(__name__)
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a request's deadline passes before inference runs"""
+
+
+class RequestCancelled(Exception):
+    """Raised when the client disconnected before inference ran"""
+
+
+@dataclass
+class InferenceOutput:
+    """Model output for a single image (one row per region for region jobs)"""
+    probabilities: np.ndarray
+    embedding: Optional[np.ndarray] = None
+    model_version: Optional[str] = None
+    cached: bool = False
+    model_name: Optional[str] = None
+    views: int = 1
+    image_hash: Optional[str] = None
+    near_duplicate_distance: Optional[int] = None
+    img_size: Optional[int] = None
+
+
+@dataclass(order=True)
+class InferenceJob:
+    """A single image waiting for inference, ordered by deadline"""
+    deadline: float
+    seq: int
+    image_bytes: bytes = field(compare=False, repr=False)
+    model: Optional[str] = field(compare=False, default=None)
+    views: int = field(compare=False, default=1)
+    reuse: bool = field(compare=False, default=False)
+    regions: Optional[np.ndarray] = field(compare=False, default=None, repr=False)
+    img_size: Optional[int] = field(compare=False, default=None)
+    future: Future = field(compare=False, default_factory=Future, repr=False)
+    enqueued_at: float = field(compare=False, default_factory=time.monotonic)
+
+    @property
+    def rows(self) -> int:
+        """Batch rows the job takes: one per view or per region"""
+        return len(self.regions) if self.regions is not None else self.views
+
+    @property
+    def kind(self) -> tuple:
+        """Jobs are batched only with jobs of the same kind"""
+        return self.model, self.views, self.regions is not None, self.img_size
+
+    def cancel(self) -> bool:
+        """Mark the job as abandoned; returns False if it is already running"""
+        return self.future.cancel()
+
+    def expired(self, now: float) -> bool:
+        """Check whether the job's deadline has passed"""
+        return now >= self.deadline
+
+
+class InferenceScheduler:
+    """
+    Collects prediction requests into batches, earliest deadline first
+
+    Requests whose deadline has passed or whose client has disconnected are
+    dropped before they take a batch slot, so an overloaded server spends its
+    time on answers somebody is still waiting for. Every batch runs on a
+    single model: the most urgent job picks it and only jobs for the same
+    model join; the others wait for a later batch. Jobs asking for test-time
+    augmentation are batched only with each other, one row per view; so are
+    jobs carrying already-cut region crops of one photo, one row per region.
+    With a near-duplicate index, jobs that allow reuse are matched by
+    perceptual hash after preprocessing; a re-encoded or slightly cropped copy
+    of a recently scored photo gets the stored prediction and skips the model.
+    Jobs may ask for a smaller input size (load-adaptive quality); they run on
+    a copy of the model at that size, built in the background on first use,
+    and at full size until it is ready.
+    """
+
+    def __init__(
+        self,
+        models: ModelManager,
+        max_batch_size: int = 16,
+        batch_wait_ms: int = 5,
+        preprocess_workers: int = 4,
+        buffer_pool_size: int = 2,
+        near_duplicates: Optional[NearDuplicateIndex] = None,
+        quality: Optional[QualityController] = None
+    ):
+        """
+        Initialize the scheduler
+
+        Args:
+            models: Model manager; each batch runs on the version of its model active when it starts
+            max_batch_size: Maximum number of images per forward pass
+            batch_wait_ms: How long to wait for more requests to fill a batch
+            preprocess_workers: Number of threads decoding images in parallel
+            buffer_pool_size: Number of preallocated batch input buffers
+            near_duplicates: Perceptual-hash index of recent predictions (None to disable reuse)
+            quality: Serving quality controller told about the load after every batch
+        """
+        self.models = models
+        self.max_batch_size = max_batch_size
+        self.batch_wait = batch_wait_ms / 1000
+        self._preprocess_workers = preprocess_workers
+        self._buffer_pool_size = buffer_pool_size
+        self.near_duplicates = near_duplicates
+        self.quality = quality
+        # Reduced-resolution copies per model; None while a copy is being built
+        self._variants: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        self._variants_lock = threading.Lock()
+        img_size = models.registry().active.model.img_size
+        self.preprocessor = BatchPreprocessor(img_size, max_batch_size, preprocess_workers, buffer_pool_size)
+        # Models with other input sizes get their own preprocessor on first use
+        self._preprocessors = {img_size: self.preprocessor}
+
+        self._heap: list[InferenceJob] = []
+        # Jobs waiting for their model to load, by model name
+        self._parked: dict[str, list[InferenceJob]] = {}
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+        self._stats = {
+            "submitted": 0,
+            "completed": 0,
+            "expired": 0,
+            "cancelled": 0,
+            "failed": 0,
+            "batches": 0,
+            "augmented": 0,
+            "near_duplicates": 0,
+            "regions": 0,
+            "reduced_resolution": 0,
+        }
+
+    def start(self) -> None:
+        """Start the background worker thread"""
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._run, name="inference-scheduler", daemon=True)
+        self._thread.start()
+        logger.info("Inference scheduler started")
+
+    def stop(self) -> None:
+        """Stop the worker and fail any jobs still waiting"""
+        with self._cond:
+            self._running = False
+            pending, self._heap = self._heap, []
+            for parked in self._parked.values():
+                pending.extend(parked)
+            self._parked = {}
+            self._cond.notify_all()
+        for job in pending:
+            if job.future.set_running_or_notify_cancel():
+                job.future.set_exception(RuntimeError("Inference scheduler stopped"))
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        with self._cond:
+            preprocessors = list(self._preprocessors.values())
+        for preprocessor in preprocessors:
+            preprocessor.shutdown()
+        logger.info("Inference scheduler stopped")
+
+    def submit(
+        self,
+        image_bytes: bytes,
+        deadline: float,
+        model: Optional[str] = None,
+        views: int = 1,
+        reuse: bool = False,
+        img_size: Optional[int] = None
+    ) -> InferenceJob:
+        """
+        Queue an image for inference
+
+        Args:
+            image_bytes: Raw image bytes
+            deadline: Absolute time.monotonic() value after which the result is useless
+            model: Name of the model to run (None for the default model)
+            views: Test-time augmentation views to average (1 for none)
+            reuse: Allow answering with the prediction of a near-duplicate image
+                (top classes only, no embedding)
+            img_size: Smaller input size to run the model at (None for the model's own)
+
+        Returns:
+            InferenceJob whose future resolves to an InferenceOutput
+        """
+        job = InferenceJob(
+            deadline=deadline,
+            seq=next(self._seq),
+            image_bytes=image_bytes,
+            model=model,
+            views=min(max(views, 1), MAX_VIEWS, self.max_batch_size),
+            reuse=reuse,
+            img_size=img_size
+        )
+        with self._cond:
+            heapq.heappush(self._heap, job)
+            self._stats["submitted"] += 1
+            self._cond.notify()
+        return job
+
+    def submit_regions(
+        self,
+        regions: np.ndarray,
+        deadline: float,
+        model: Optional[str] = None
+    ) -> InferenceJob:
+        """
+        Queue the region crops of one photo to be scored in a single forward pass
+
+        Args:
+            regions: Crops at the model input size, shape (n, size, size, 3), uint8
+            deadline: Absolute time.monotonic() value after which the result is useless
+            model: Name of the model to run (None for the default model)
+
+        Returns:
+            InferenceJob whose future resolves to an InferenceOutput with one
+            probability row per region
+
+        Raises:
+            ValueError: If there are more regions than fit in one batch
+        """
+        if not 0 < len(regions) <= self.max_batch_size:
+            raise ValueError(f"Between 1 and {self.max_batch_size} regions fit in one forward pass")
+        job = InferenceJob(
+            deadline=deadline,
+            seq=next(self._seq),
+            image_bytes=b"",
+            model=model,
+            regions=regions
+        )
+        with self._cond:
+            heapq.heappush(self._heap, job)
+            self._stats["submitted"] += 1
+            self._cond.notify()
+        return job
+
+    def stats(self) -> dict:
+        """Get scheduler counters, current queue depth and preprocessing stats"""
+        with self._cond:
+            stats = {**self._stats, "queue_depth": len(self._heap)}
+            # The worker adds a preprocessor the first time it sees a new input size
+            preprocessors = dict(self._preprocessors)
+        stats["preprocessing"] = self.preprocessor.stats()
+        if self.near_duplicates is not None:
+            stats["near_duplicate_index"] = self.near_duplicates.stats()
+        if len(preprocessors) > 1:
+            stats["preprocessing_by_size"] = {size: p.stats() for size, p in preprocessors.items()}
+        return stats
+
+    def _preprocessor(self, img_size: int) -> BatchPreprocessor:
+        # Only the worker thread adds entries, so lookup and insert need no common lock hold
+        preprocessor = self._preprocessors.get(img_size)
+        if preprocessor is None:
+            preprocessor = BatchPreprocessor(img_size, self.max_batch_size, self._preprocess_workers, self._buffer_pool_size)
+            with self._cond:
+                self._preprocessors[img_size] = preprocessor
+        return preprocessor
+
+    def _build_variant(self, model: FoodRecognitionModel, img_size: int) -> None:
+        try:
+            variant = FoodRecognitionModel.from_weights(model, img_size)
+            # Trace the new input size before the first request needs it
+            variant.predict_batch(np.zeros((1, img_size, img_size, 3), dtype=np.uint8))
+        except Exception as e:
+            logger.error(f"Could not build the {img_size}px model variant: {e}")
+            return
+        with self._variants_lock:
+            self._variants.setdefault(model, {})[img_size] = variant
+
+    def _serving_model(self, model, img_size: Optional[int]):
+        """
+        The model to run a batch on: a reduced-resolution copy when asked for and ready
+
+        Only single models can be copied at another size; cascades and fake
+        models always run as they are.
+        """
+        if img_size is None or img_size == model.img_size or not isinstance(model, FoodRecognitionModel):
+            return model
+        with self._variants_lock:
+            variants = self._variants.setdefault(model, {})
+            if img_size in variants:
+                return variants[img_size] or model
+            variants[img_size] = None
+        threading.Thread(
+            target=self._build_variant, args=(model, img_size), name="model-variant-build", daemon=True
+        ).start()
+        return model
+
+    def _park_until_loaded(self, batch: list[InferenceJob], model_name: str) -> None:
+        """Hold a batch whose model is not loaded and load it off the scheduler thread"""
+        with self._cond:
+            parked = self._parked.get(model_name)
+            if parked is not None:
+                # A load is already running; these jobs go back with the others
+                parked.extend(batch)
+                return
+            self._parked[model_name] = list(batch)
+        logger.info(f"Loading model {model_name} for {len(batch)} queued jobs")
+        threading.Thread(
+            target=self._load_parked, args=(model_name,), name="model-load", daemon=True
+        ).start()
+
+    def _load_parked(self, model_name: str) -> None:
+        """Load a model, then queue its parked jobs again (or fail them if the load failed)"""
+        try:
+            self.models.registry(model_name)
+            error = None
+        except Exception as e:
+            logger.error(f"Loading model {model_name} failed: {e}", exc_info=True)
+            error = e
+        with self._cond:
+            jobs = self._parked.pop(model_name, [])
+            if error is None:
+                for job in jobs:
+                    heapq.heappush(self._heap, job)
+                self._cond.notify()
+                return
+            self._stats["failed"] += len(jobs)
+        for job in jobs:
+            if job.future.set_running_or_notify_cancel():
+                job.future.set_exception(error)
+
+    def _count(self, key: str, amount: int = 1) -> None:
+        with self._cond:
+            self._stats[key] += amount
+
+    def _next_batch(self) -> list[InferenceJob]:
+        """Block until work is available and pop up to one batch of live jobs"""
+        with self._cond:
+            while self._running and not self._heap:
+                self._cond.wait()
+            if not self._running:
+                return []
+
+            # Give concurrent requests a short window to join this batch
+            window_end = time.monotonic() + self.batch_wait
+            while len(self._heap) < self.max_batch_size:
+                remaining = window_end - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(timeout=remaining)
+
+            batch = []
+            deferred = []
+            limit = self.max_batch_size
+            now = time.monotonic()
+            while self._heap and len(batch) < limit:
+                job = heapq.heappop(self._heap)
+                if batch and job.kind != batch[0].kind and not job.future.cancelled():
+                    deferred.append(job)
+                elif job.future.cancelled():
+                    self._stats["cancelled"] += 1
+                elif not job.expired(now):
+                    batch.append(job)
+                    # Augmented and region jobs take one batch row per view or region
+                    limit = max(1, self.max_batch_size // job.rows)
+                elif job.future.set_running_or_notify_cancel():
+                    self._stats["expired"] += 1
+                    job.future.set_exception(DeadlineExceeded("Request deadline exceeded before inference"))
+                else:
+                    self._stats["cancelled"] += 1
+            for job in deferred:
+                heapq.heappush(self._heap, job)
+            return batch
+
+    def _run(self) -> None:
+        """Worker loop: preprocess, drop dead jobs, run one forward pass per batch"""
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                if not self._running:
+                    return
+                continue
+
+            try:
+                self._process_batch(batch)
+                if self.quality is not None:
+                    with self._cond:
+                        queue_depth = len(self._heap)
+                    self.quality.observe(queue_depth, time.monotonic() - min(job.enqueued_at for job in batch))
+            except Exception as e:
+                logger.error(f"Inference batch failed: {e}", exc_info=True)
+                self._count("failed", len(batch))
+                for job in batch:
+                    if job.future.done():
+                        continue
+                    if job.future.running() or job.future.set_running_or_notify_cancel():
+                        job.future.set_exception(e)
+
+    def _process_batch(self, batch: list[InferenceJob]) -> None:
+        """Preprocess a batch and resolve each job's future with its probabilities"""
+        model_name = batch[0].model or self.models.default_name
+        # Pinned before preprocessing so the model is not unloaded in between
+        pinned = self.models.try_acquire(model_name)
+        if pinned is None:
+            self._park_until_loaded(batch, model_name)
+            return
+        registry, model_version = pinned
+        if batch[0].regions is not None:
+            try:
+                self._process_regions(batch, model_name, model_version)
+            finally:
+                registry.release(model_version)
+            return
+        try:
+            model = self._serving_model(model_version.model, batch[0].img_size)
+            preprocessor = self._preprocessor(model.img_size)
+            prepared = preprocessor.preprocess([job.image_bytes for job in batch])
+            try:
+                # Re-check right before the forward pass: preprocessing takes time and
+                # clients may have given up in the meantime
+                now = time.monotonic()
+                keep = []
+                for row, (job, ok) in enumerate(zip(batch, prepared.ok)):
+                    if not job.future.set_running_or_notify_cancel():
+                        self._count("cancelled")
+                    elif not ok:
+                        self._count("failed")
+                        job.future.set_exception(ValueError("Image preprocessing failed"))
+                    elif job.expired(now):
+                        self._count("expired")
+                        job.future.set_exception(DeadlineExceeded("Request deadline exceeded before inference"))
+                    else:
+                        keep.append(row)
+
+                if not keep:
+                    return
+
+                views = batch[0].views
+                reused, hashes = {}, None
+                if self.near_duplicates is not None and views == 1:
+                    # Hash the decoded rows, so re-encoded copies of an image hash alike
+                    hashes = dhash(prepared.images[keep])
+                    for row, image_hash in zip(keep, hashes):
+                        if batch[row].reuse:
+                            match = self.near_duplicates.lookup(image_hash, model_version.version)
+                            if match is not None:
+                                reused[row] = match
+                    if reused:
+                        hashes = [h for row, h in zip(keep, hashes) if row not in reused]
+                        keep = [row for row in keep if row not in reused]
+
+                if keep:
+                    images = prepared.images if len(keep) == len(batch) else prepared.compact(keep)
+                    if views > 1:
+                        images = augment_views(images, views)
+                    probabilities, embeddings = model.predict_batch_with_embeddings(images)
+                    if views > 1:
+                        probabilities = average_views(probabilities, views)
+                        if embeddings is not None:
+                            embeddings = embeddings[::views]
+            finally:
+                preprocessor.release(prepared)
+        finally:
+            registry.release(model_version)
+
+        num_classes = len(model_version.model.class_names)
+        for row, (prediction, distance) in reused.items():
+            batch[row].future.set_result(InferenceOutput(
+                prediction.dense(num_classes),
+                model_version=prediction.model_version,
+                cached=True,
+                model_name=model_name,
+                near_duplicate_distance=distance
+            ))
+        self._count("near_duplicates", len(reused))
+        self._count("completed", len(keep) + len(reused))
+        if not keep:
+            return
+
+        self._count("batches")
+        mark_startup("first_prediction")
+        if model is not model_version.model:
+            self._count("reduced_resolution", len(keep))
+        elif hashes is not None:
+            # Only full-resolution predictions are worth reusing
+            for i, image_hash in enumerate(hashes):
+                self.near_duplicates.add(image_hash, model_version.version, probabilities[i])
+        if views > 1:
+            self._count("augmented", len(keep))
+        for i, row in enumerate(keep):
+            embedding = embeddings[i] if embeddings is not None else None
+            batch[row].future.set_result(
+                InferenceOutput(
+                    probabilities[i],
+                    embedding,
+                    model_version.version,
+                    model_name=model_name,
+                    views=views,
+                    img_size=model.img_size
+                )
+            )
+
+    def _process_regions(self, batch: list[InferenceJob], model_name: str, model_version: ModelVersion) -> None:
+        """Score the region crops of every live job in one forward pass"""
+        now = time.monotonic()
+        live = []
+        for job in batch:
+            if not job.future.set_running_or_notify_cancel():
+                self._count("cancelled")
+            elif job.expired(now):
+                self._count("expired")
+                job.future.set_exception(DeadlineExceeded("Request deadline exceeded before inference"))
+            elif job.regions.shape[1:3] != (model_version.model.img_size,) * 2:
+                # The model was swapped for one with another input size after the crops were cut
+                self._count("failed")
+                job.future.set_exception(ValueError("Region crops do not match the model input size"))
+            else:
+                live.append(job)
+        if not live:
+            return
+
+        images = np.concatenate([job.regions for job in live]) if len(live) > 1 else live[0].regions
+        probabilities = model_version.model.predict_batch(images)
+
+        self._count("batches")
+        self._count("completed", len(live))
+        self._count("regions", len(images))
+        mark_startup("first_prediction")
+        offset = 0
+        for job in live:
+            rows = probabilities[offset:offset + len(job.regions)]
+            offset += len(job.regions)
+            job.future.set_result(InferenceOutput(
+                rows, model_version=model_version.version, model_name=model_name, img_size=model_version.model.img_size
+            ))
+
+
+# Global scheduler instance (singleton pattern)
+_scheduler_instance: Optional[InferenceScheduler] = None
+
+
+def get_scheduler(
+    models: ModelManager,
+    max_batch_size: int = 16,
+    batch_wait_ms: int = 5,
+    preprocess_workers: int = 4,
+    buffer_pool_size: int = 2,
+    near_duplicates: Optional[NearDuplicateIndex] = None,
+    quality: Optional[QualityController] = None
+) -> InferenceScheduler:
+    """
+    Get or create the global inference scheduler
+
+    Args:
+        models: Model manager to serve from
+        max_batch_size: Maximum number of images per forward pass
+        batch_wait_ms: How long to wait for more requests to fill a batch
+        preprocess_workers: Number of threads decoding images in parallel
+        buffer_pool_size: Number of preallocated batch input buffers
+        near_duplicates: Perceptual-hash index of recent predictions (None to disable reuse)
+        quality: Serving quality controller told about the load after every batch
+
+    Returns:
+        Running InferenceScheduler instance
+    """
+    global _scheduler_instance
+    if _scheduler_instance is None:
+        _scheduler_instance = InferenceScheduler(
+            models, max_batch_size, batch_wait_ms, preprocess_workers, buffer_pool_size, near_duplicates, quality
+        )
+        _scheduler_instance.start()
+    return _scheduler_instance
+
+
+def shutdown_scheduler() -> None:
+    """Stop the global scheduler if it was started"""
+    global _scheduler_instance
+    if _scheduler_instance is not None:
+        _scheduler_instance.stop()
+        _scheduler_instance = None
@@ -0,0 +1,250 @@
+"""
+Node-wide prediction cache in a memory-mapped file shared by every worker process
+"""
+import hashlib
+import mmap
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+import logging
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+from .prediction_cache import CachedPrediction, PredictionCache
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"FLPCACH1"
+WAYS = 8  # slots per bucket; a key can only live in its bucket
+STRIPES = 64  # write locks, each guarding every 64th bucket
+HEADER_SIZE = 64
+_HEADER = np.dtype([
+    ("magic", "S8"),
+    ("buckets", "<u4"),
+    ("ways", "<u4"),
+    ("top_k", "<u4"),
+    ("slot_size", "<u4"),
+])
+
+
+def _slot_dtype(top_k: int) -> np.dtype:
+    """Fixed-width slot: seqlock counter, clock bit, key, model version and the top-k"""
+    return np.dtype([
+        ("seq", "<u4"),  # odd while a writer is updating the slot
+        ("ref", "u1"),  # clock reference bit, set on every hit
+        ("k", "u1"),  # classes stored; 0 marks an empty slot
+        ("_pad", "<u2"),
+        ("key", "<u8", (2,)),
+        ("version", "<u8"),
+        ("indices", "<u2", (top_k,)),
+        ("probabilities", "<f2", (top_k,)),
+    ])
+
+
+class SharedPredictionCache(PredictionCache):
+    """
+    Prediction cache that all workers on a node read and write
+
+    The cache is a fixed-size file (on tmpfs, e.g. /dev/shm) mapped into every
+    worker, so an image scored by one worker is a hit in all of them and the
+    entries exist once per node instead of once per worker. It is split into
+    buckets of WAYS fixed-width slots; an entry's bucket is derived from its
+    image hash and model version. Lookups take no lock: each slot carries a
+    sequence counter that writers make odd while updating, and a reader that
+    sees it odd or changed across its copy retries. Writers take one of
+    STRIPES locks (a thread lock plus an fcntl byte-range lock shared across
+    processes). A full bucket evicts with the clock algorithm: the hand skips
+    (and clears) slots hit since its last pass.
+
+    The file outlives the workers, so a restarted server starts warm; keys
+    include the model version, so entries of other versions never match. A
+    file with a different layout (size or top-k changed) is replaced by a
+    new one rather than rewritten in place; workers that mapped the old file
+    keep using it until they restart.
+    """
+
+    def __init__(self, path: Path, max_entries: int = 10000, top_k: int = 10):
+        """
+        Map (creating or attaching to) the shared cache file
+
+        Args:
+            path: Cache file, on tmpfs so it never touches disk
+            max_entries: Slots in the cache (rounded up to whole buckets)
+            top_k: Number of classes stored per prediction
+        """
+        if fcntl is None:
+            raise RuntimeError("PREDICTION_CACHE_BACKEND=shared requires fcntl (Linux or macOS)")
+        super().__init__(max_entries, top_k)
+        self.path = path
+        self.buckets = max(1, -(-max_entries // WAYS))
+        self.max_entries = self.buckets * WAYS
+        self._slot = _slot_dtype(top_k)
+        hands_size = -(-self.buckets // 64) * 64
+        size = HEADER_SIZE + hands_size + self.max_entries * self._slot.itemsize
+        header = np.array([(MAGIC, self.buckets, WAYS, top_k, self._slot.itemsize)], dtype=_HEADER)
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Checking and replacing the file is serialized on a lock file that is never replaced
+        lock_fd = os.open(path.with_name(path.name + ".lock"), os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.lockf(lock_fd, fcntl.LOCK_EX)
+        try:
+            self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+            current = os.pread(self._fd, _HEADER.itemsize, 0)
+            if os.fstat(self._fd).st_size != size or current != header.tobytes():
+                if current:
+                    logger.warning(f"Reinitializing shared prediction cache {path} (layout changed)")
+                os.close(self._fd)
+                self._fd = self._replace(path, size, header.tobytes())
+            self._mmap = mmap.mmap(self._fd, size)
+        finally:
+            fcntl.lockf(lock_fd, fcntl.LOCK_UN)
+            os.close(lock_fd)
+        if self._mmap[:_HEADER.itemsize] != header.tobytes():
+            raise RuntimeError(f"Shared prediction cache {path} changed while it was being mapped")
+
+        self._hands = np.frombuffer(self._mmap, dtype=np.uint8, count=self.buckets, offset=HEADER_SIZE)
+        self._slots = np.frombuffer(
+            self._mmap, dtype=self._slot, count=self.max_entries, offset=HEADER_SIZE + hands_size
+        )
+        self._stripe_locks = [threading.Lock() for _ in range(STRIPES)]
+        self._evictions = 0
+        logger.info(f"Shared prediction cache {path}: {self.max_entries} slots, {size / 2**20:.1f}MB")
+
+    @staticmethod
+    def _replace(path: Path, size: int, header: bytes) -> int:
+        """
+        Write an empty cache file and rename it over the old one
+
+        Workers still mapping the old file keep a consistent (now private)
+        cache instead of seeing it truncated under them.
+
+        Returns:
+            File descriptor of the new file
+        """
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        fd = os.open(tmp, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o600)
+        try:
+            os.ftruncate(fd, size)
+            os.pwrite(fd, header, 0)
+            os.replace(tmp, path)
+        except BaseException:
+            os.close(fd)
+            tmp.unlink(missing_ok=True)
+            raise
+        return fd
+
+    def _locate(self, image_hash: str, model_version: str) -> tuple[np.ndarray, int, int]:
+        """Key words, version hash and bucket of an entry (stable across processes)"""
+        key = np.frombuffer(hashlib.blake2b(image_hash.encode(), digest_size=16).digest(), dtype="<u8")
+        version = int.from_bytes(hashlib.blake2b(model_version.encode(), digest_size=8).digest(), "little")
+        return key, version, (int(key[0]) ^ version) % self.buckets
+
+    @staticmethod
+    def _matches(slots: np.ndarray, key: np.ndarray, version: int) -> np.ndarray:
+        return np.flatnonzero(
+            (slots["k"] > 0)
+            & (slots["version"] == version)
+            & (slots["key"][:, 0] == key[0])
+            & (slots["key"][:, 1] == key[1])
+        )
+
+    @contextmanager
+    def _stripe(self, bucket: int) -> Iterator[None]:
+        """Exclusive write access to a bucket's stripe across threads and processes"""
+        stripe = bucket % STRIPES
+        with self._stripe_locks[stripe]:
+            # fcntl locks belong to the process, so threads serialize on the lock above first
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, 1, 1 + stripe)
+            try:
+                yield
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, 1, 1 + stripe)
+
+    def get(self, image_hash: str, model_version: str) -> Optional[CachedPrediction]:
+        """Look up a prediction without locking, marking it as recently used"""
+        key, version, bucket = self._locate(image_hash, model_version)
+        slots = self._slots[bucket * WAYS:(bucket + 1) * WAYS]
+        for _ in range(3):
+            found = self._matches(slots, key, version)
+            if len(found) == 0:
+                break
+            i = found[0]
+            seq = int(slots["seq"][i])
+            if seq & 1:
+                continue
+            record = slots[i:i + 1].copy()[0]
+            if int(slots["seq"][i]) != seq or record["version"] != version or (record["key"] != key).any():
+                continue
+            slots["ref"][i] = 1
+            k = int(record["k"])
+            with self._lock:
+                self._hits += 1
+            return CachedPrediction(
+                indices=record["indices"][:k].copy(),
+                probabilities=record["probabilities"][:k].copy(),
+                model_version=model_version
+            )
+        with self._lock:
+            self._misses += 1
+        return None
+
+    def _victim(self, bucket: int, slots: np.ndarray) -> int:
+        """Advance the bucket's clock hand to a slot not hit since the last pass"""
+        hand = int(self._hands[bucket])
+        for _ in range(WAYS + 1):
+            i = hand % WAYS
+            hand += 1
+            if not slots["ref"][i]:
+                break
+            slots["ref"][i] = 0
+        self._hands[bucket] = hand % WAYS
+        self._evictions += 1
+        return i
+
+    def put(self, image_hash: str, model_version: str, probabilities: np.ndarray) -> None:
+        """Store the top-k of a probability vector, evicting by clock if the bucket is full"""
+        if self.max_entries <= 0:
+            return
+        entry = self._top(probabilities, model_version)
+        key, version, bucket = self._locate(image_hash, model_version)
+        k = len(entry.indices)
+        with self._stripe(bucket):
+            slots = self._slots[bucket * WAYS:(bucket + 1) * WAYS]
+            found = self._matches(slots, key, version)
+            if len(found):
+                i = found[0]
+            else:
+                empty = np.flatnonzero(slots["k"] == 0)
+                i = empty[0] if len(empty) else self._victim(bucket, slots)
+            slot = slots[i:i + 1]
+            slot["seq"] += 1
+            slot["key"] = key
+            slot["version"] = version
+            slot["k"] = k
+            slot["indices"][0, :k] = entry.indices
+            slot["probabilities"][0, :k] = entry.probabilities
+            slot["ref"] = 1
+            slot["seq"] += 1
+
+    def stats(self) -> dict:
+        """Get this worker's hit/miss counters and the node-wide number of cached entries"""
+        entries = int(np.count_nonzero(self._slots["k"]))
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "backend": "shared",
+                "path": str(self.path),
+                "entries": entries,
+                "max_entries": self.max_entries,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+                "evictions": self._evictions,
+            }
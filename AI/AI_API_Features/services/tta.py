@@ -0,0 +1,81 @@
+"""
+Test-time augmentation: score several views of an image in one forward pass and average them
+"""
+import numpy as np
+from PIL import Image
+
+# Views in the order they are added; the original always comes first
+TTA_TRANSFORMS = (
+    "original",
+    "flip",
+    "center_crop",
+    "flip_center_crop",
+    "top_left_crop",
+    "top_right_crop",
+    "bottom_left_crop",
+    "bottom_right_crop",
+)
+MAX_VIEWS = len(TTA_TRANSFORMS)
+
+
+def _crop(image: np.ndarray, name: str, ratio: float) -> np.ndarray:
+    """Crop ratio of each side at the named position and resize back to the input size"""
+    height, width = image.shape[:2]
+    crop_h, crop_w = int(height * ratio), int(width * ratio)
+    if name.startswith("top"):
+        top = 0
+    elif name.startswith("bottom"):
+        top = height - crop_h
+    else:
+        top = (height - crop_h) // 2
+    if "left" in name:
+        left = 0
+    elif "right" in name:
+        left = width - crop_w
+    else:
+        left = (width - crop_w) // 2
+    crop = Image.fromarray(image[top:top + crop_h, left:left + crop_w])
+    return np.asarray(crop.resize((width, height), Image.BILINEAR))
+
+
+def augment_views(images: np.ndarray, views: int, crop_ratio: float = 0.875) -> np.ndarray:
+    """
+    Expand a batch into its test-time augmentation views
+
+    Args:
+        images: Batch of shape (n, size, size, 3)
+        views: Views per image, including the original (1 to MAX_VIEWS)
+        crop_ratio: Side length of the crops relative to the image
+
+    Returns:
+        Array of shape (n * views, size, size, 3); each image's views are
+        consecutive, the original first
+    """
+    views = max(1, min(views, MAX_VIEWS))
+    out = np.empty((len(images) * views,) + images.shape[1:], dtype=images.dtype)
+    for i, image in enumerate(images):
+        for v, name in enumerate(TTA_TRANSFORMS[:views]):
+            if name == "original":
+                view = image
+            elif name == "flip":
+                view = image[:, ::-1]
+            elif name == "flip_center_crop":
+                view = _crop(image, "center_crop", crop_ratio)[:, ::-1]
+            else:
+                view = _crop(image, name, crop_ratio)
+            out[i * views + v] = view
+    return out
+
+
+def average_views(probabilities: np.ndarray, views: int) -> np.ndarray:
+    """
+    Average the class probabilities of each image's views
+
+    Args:
+        probabilities: Model output of shape (n * views, num_classes)
+        views: Views per image
+
+    Returns:
+        Array of shape (n, num_classes)
+    """
+    return probabilities.reshape(-1, views, probabilities.shape[-1]).mean(axis=1)
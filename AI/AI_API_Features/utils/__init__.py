@@ -1,4 +1,43 @@
 """Utils module"""
 from .helpers import normalize_food_name, calculate_file_hash, format_confidence
+from .fast_json import dumps, fragment, FastJSONResponse
+from .memory import (
+    rss_bytes,
+    memory_stats,
+    start_tracing,
+    stop_tracing,
+    tracing_snapshot
+)
+from .startup import mark_startup, startup_stats
+from .structured_logging import (
+    configure_logging,
+    shutdown_logging,
+    logging_stats,
+    start_request,
+    current_request,
+    log_fields,
+    stage
+)
 
-__all__ = ["normalize_food_name", "calculate_file_hash", "format_confidence"]
+__all__ = [
+    "normalize_food_name",
+    "calculate_file_hash",
+    "format_confidence",
+    "dumps",
+    "fragment",
+    "FastJSONResponse",
+    "rss_bytes",
+    "memory_stats",
+    "start_tracing",
+    "stop_tracing",
+    "tracing_snapshot",
+    "mark_startup",
+    "startup_stats",
+    "configure_logging",
+    "shutdown_logging",
+    "logging_stats",
+    "start_request",
+    "current_request",
+    "log_fields",
+    "stage"
+]
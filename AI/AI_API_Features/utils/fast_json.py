@@ -0,0 +1,76 @@
+"""
+Fast JSON encoding with support for pre-serialized fragments
+"""
+import json
+from typing import Any
+
+from fastapi.responses import Response
+
+try:
+    import orjson
+    _HAS_ORJSON_FRAGMENT = hasattr(orjson, "Fragment")
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+    _HAS_ORJSON_FRAGMENT = False
+
+
+class _RawFragment:
+    """Already-encoded JSON inserted verbatim by the stdlib fallback encoder"""
+    __slots__ = ("data",)
+
+    def __init__(self, data: bytes):
+        self.data = data
+
+
+def fragment(data: bytes):
+    """
+    Wrap already-encoded JSON so dumps() embeds it without re-encoding
+
+    Args:
+        data: Valid JSON document as bytes
+
+    Returns:
+        Object that can be placed anywhere inside a value passed to dumps()
+    """
+    if _HAS_ORJSON_FRAGMENT:
+        return orjson.Fragment(data)
+    return _RawFragment(data)
+
+
+def _dumps_fallback(obj: Any) -> str:
+    if isinstance(obj, _RawFragment):
+        return obj.data.decode("utf-8")
+    if isinstance(obj, dict):
+        return "{" + ",".join(
+            f"{json.dumps(str(key))}:{_dumps_fallback(value)}" for key, value in obj.items()
+        ) + "}"
+    if isinstance(obj, (list, tuple)):
+        return "[" + ",".join(_dumps_fallback(item) for item in obj) + "]"
+    return json.dumps(obj, separators=(",", ":"), default=str)
+
+
+def dumps(obj: Any) -> bytes:
+    """
+    Encode a value as compact JSON bytes
+
+    Uses orjson when installed, otherwise the standard library.
+
+    Args:
+        obj: Value made of dicts, lists, str, int, float, bool, None and fragments
+
+    Returns:
+        UTF-8 encoded JSON
+    """
+    if _HAS_ORJSON_FRAGMENT:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+    return _dumps_fallback(obj).encode("utf-8")
+
+
+class FastJSONResponse(Response):
+    """JSON response rendered with dumps(), accepting pre-serialized fragments"""
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return dumps(content)
@@ -0,0 +1,202 @@
+"""
+Process memory readings, per-stage memory high-water marks and on-demand tracemalloc snapshots
+"""
+import ctypes
+import ctypes.util
+import os
+import resource
+import sys
+import threading
+import tracemalloc
+from typing import Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def rss_bytes() -> int:
+    """
+    Current resident set size of this process
+
+    Reads /proc/self/statm (a few microseconds); elsewhere falls back to the
+    peak RSS reported by getrusage.
+    """
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except OSError:
+        return peak_rss_bytes()
+
+
+def peak_rss_bytes() -> int:
+    """Highest resident set size this process has reached"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class _MallInfo2(ctypes.Structure):
+    _fields_ = [(name, ctypes.c_size_t) for name in (
+        "arena", "ordblks", "smblks", "hblks", "hblkhd", "usmblks", "fsmblks", "uordblks", "fordblks", "keepcost"
+    )]
+
+
+_mallinfo2 = None
+try:
+    _libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6")
+    _mallinfo2 = _libc.mallinfo2
+    _mallinfo2.restype = _MallInfo2
+except (OSError, AttributeError):
+    pass
+
+
+def malloc_stats() -> Optional[dict]:
+    """
+    glibc heap usage (where TensorFlow's CPU allocations end up)
+
+    Returns:
+        Bytes in use, free inside the heap (fragmentation) and in mmapped
+        chunks, or None when glibc's mallinfo2 is unavailable
+    """
+    if _mallinfo2 is None:
+        return None
+    info = _mallinfo2()
+    return {
+        "heap_bytes": info.arena,
+        "in_use_bytes": info.uordblks,
+        "free_bytes": info.fordblks,
+        "mmap_bytes": info.hblkhd,
+    }
+
+
+def tensorflow_memory() -> dict:
+    """
+    Allocator statistics per TensorFlow device
+
+    Only reported when TensorFlow is already imported. The CPU allocator
+    reports zeros unless TensorFlow tracks it; GPU allocators report the
+    bytes currently allocated and the peak.
+    """
+    tf = sys.modules.get("tensorflow")
+    if tf is None:
+        return {}
+    devices = {}
+    for device in tf.config.list_logical_devices():
+        try:
+            devices[device.name] = tf.config.experimental.get_memory_info(device.name)
+        except (ValueError, RuntimeError):
+            continue
+    return devices
+
+
+class StageMemory:
+    """
+    Largest memory growth seen per request stage
+
+    Two figures per stage, both process-wide (so concurrent requests inflate
+    each other's numbers): the RSS growth from stage start to end, and, while
+    tracemalloc is tracing, the peak of Python allocations during the stage.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages: dict[str, dict] = {}
+
+    def record(self, name: str, rss_growth: int, traced_peak: Optional[int]) -> None:
+        with self._lock:
+            entry = self._stages.setdefault(name, {"count": 0, "max_rss_growth_bytes": 0, "max_traced_peak_bytes": 0})
+            entry["count"] += 1
+            entry["max_rss_growth_bytes"] = max(entry["max_rss_growth_bytes"], rss_growth)
+            if traced_peak is not None:
+                entry["max_traced_peak_bytes"] = max(entry["max_traced_peak_bytes"], traced_peak)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {name: dict(entry) for name, entry in self._stages.items()}
+
+
+stage_memory = StageMemory()
+
+_previous_snapshot: Optional[tracemalloc.Snapshot] = None
+
+
+def start_tracing(frames: int = 1) -> None:
+    """
+    Start tracemalloc (slows allocation-heavy Python code while on)
+
+    Args:
+        frames: Stack frames stored per allocation
+    """
+    global _previous_snapshot
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+    _previous_snapshot = None
+    tracemalloc.start(frames)
+    logger.warning(f"tracemalloc started ({frames} frames)")
+
+
+def stop_tracing() -> None:
+    """Stop tracemalloc and drop its data"""
+    global _previous_snapshot
+    _previous_snapshot = None
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+        logger.warning("tracemalloc stopped")
+
+
+def tracing_snapshot(limit: int = 25, group_by: str = "lineno") -> dict:
+    """
+    Take a tracemalloc snapshot and summarize the largest allocation sites
+
+    Args:
+        limit: Number of allocation sites to return
+        group_by: "lineno", "filename" or "traceback"
+
+    Returns:
+        Traced totals, the top sites by size and, from the second snapshot on,
+        the top sites by growth since the previous snapshot
+    """
+    global _previous_snapshot
+    if not tracemalloc.is_tracing():
+        raise RuntimeError("tracemalloc is not tracing; start it first")
+
+    snapshot = tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    ))
+    current, peak = tracemalloc.get_traced_memory()
+
+    def describe(stat) -> dict:
+        entry = {
+            "location": [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback],
+            "size_bytes": stat.size,
+            "count": stat.count,
+        }
+        if hasattr(stat, "size_diff"):
+            entry["size_diff_bytes"] = stat.size_diff
+            entry["count_diff"] = stat.count_diff
+        return entry
+
+    result = {
+        "traced_bytes": current,
+        "traced_peak_bytes": peak,
+        "top": [describe(stat) for stat in snapshot.statistics(group_by)[:limit]],
+    }
+    if _previous_snapshot is not None:
+        result["growth"] = [describe(stat) for stat in snapshot.compare_to(_previous_snapshot, group_by)[:limit]]
+    _previous_snapshot = snapshot
+    return result
+
+
+def memory_stats() -> dict:
+    """Process RSS, allocator statistics and per-stage high-water marks"""
+    return {
+        "rss_bytes": rss_bytes(),
+        "peak_rss_bytes": peak_rss_bytes(),
+        "malloc": malloc_stats(),
+        "tensorflow": tensorflow_memory(),
+        "tracemalloc_tracing": tracemalloc.is_tracing(),
+        "stages": stage_memory.stats(),
+    }
@@ -0,0 +1,60 @@
+"""
+Start-up milestones (model ready, first prediction) measured from process start
+"""
+import os
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _seconds_since_process_start() -> float:
+    """
+    Age of this process
+
+    Reads the process start time from /proc (10ms resolution) so interpreter
+    start-up and imports, TensorFlow's included, are counted; elsewhere the
+    clock starts when this module is imported.
+    """
+    try:
+        with open("/proc/uptime", "rb") as f:
+            uptime = float(f.read().split()[0])
+        with open("/proc/self/stat", "rb") as f:
+            # Fields after the parenthesised command name; starttime is field 22
+            fields = f.read().rsplit(b")", 1)[1].split()
+        return max(uptime - int(fields[19]) / os.sysconf("SC_CLK_TCK"), 0.0)
+    except (OSError, ValueError, IndexError, AttributeError):
+        return 0.0
+
+
+_PROCESS_STARTED = time.monotonic() - _seconds_since_process_start()
+_milestones: dict[str, float] = {}
+_lock = threading.Lock()
+
+
+def mark_startup(milestone: str) -> None:
+    """
+    Record the first time a start-up milestone is reached (later calls are ignored)
+
+    Args:
+        milestone: Name such as "model_ready" or "first_prediction"
+    """
+    if milestone in _milestones:
+        return
+    elapsed = time.monotonic() - _PROCESS_STARTED
+    with _lock:
+        if milestone in _milestones:
+            return
+        _milestones[milestone] = round(elapsed, 3)
+    logger.info(f"Startup: {milestone} {elapsed:.2f}s after process start")
+
+
+def startup_stats() -> dict:
+    """Get the process age and the seconds from process start to each milestone reached"""
+    with _lock:
+        milestones = dict(_milestones)
+    return {
+        "uptime_seconds": round(time.monotonic() - _PROCESS_STARTED, 1),
+        "milestones_seconds": milestones,
+    }
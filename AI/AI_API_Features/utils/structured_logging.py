@@ -0,0 +1,234 @@
+"""
+Non-blocking structured logging with per-request context and sampling
+"""
+import contextvars
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Iterator, Optional
+
+from .memory import rss_bytes, stage_memory
+
+
+@dataclass
+class RequestLogContext:
+    """Request id, sampling decision, stage timings and extra fields of one request"""
+    request_id: str
+    sampled: bool = True
+    started: float = field(default_factory=time.perf_counter)
+    stages: dict[str, float] = field(default_factory=dict)
+    stage_memory: dict[str, int] = field(default_factory=dict)
+    fields: dict[str, Any] = field(default_factory=dict)
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+
+_request_context: contextvars.ContextVar[Optional[RequestLogContext]] = contextvars.ContextVar(
+    "request_log_context", default=None
+)
+
+
+def start_request(request_id: Optional[str] = None, sample_rate: float = 1.0) -> RequestLogContext:
+    """
+    Begin the log context of a request
+
+    Args:
+        request_id: Id supplied by the client or proxy (a new one is generated if missing)
+        sample_rate: Fraction of requests whose INFO-and-below lines are logged
+
+    Returns:
+        The new RequestLogContext, current for the rest of the request
+    """
+    context = RequestLogContext(
+        request_id=request_id or uuid.uuid4().hex,
+        sampled=sample_rate >= 1.0 or random.random() < sample_rate
+    )
+    _request_context.set(context)
+    return context
+
+
+def current_request() -> Optional[RequestLogContext]:
+    """Get the log context of the request being handled, if any"""
+    return _request_context.get()
+
+
+def log_fields(**fields: Any) -> None:
+    """Attach fields to the current request's summary log line"""
+    context = _request_context.get()
+    if context is not None:
+        context.fields.update(fields)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """
+    Time a stage of the current request and record how much memory it grew
+
+    RSS growth (and, while tracemalloc is tracing, the Python allocation peak)
+    is process-wide, so concurrent requests show up in each other's stages.
+
+    Usage:
+        with stage("inference"):
+            output = await run_inference(...)
+    """
+    started = time.perf_counter()
+    rss_before = rss_bytes()
+    traced_before = None
+    if tracemalloc.is_tracing():
+        tracemalloc.reset_peak()
+        traced_before = tracemalloc.get_traced_memory()[0]
+    try:
+        yield
+    finally:
+        rss_growth = max(rss_bytes() - rss_before, 0)
+        traced_peak = None
+        if traced_before is not None and tracemalloc.is_tracing():
+            traced_peak = max(tracemalloc.get_traced_memory()[1] - traced_before, 0)
+        stage_memory.record(name, rss_growth, traced_peak)
+        context = _request_context.get()
+        if context is not None:
+            context.stages[name] = round(context.stages.get(name, 0.0) + (time.perf_counter() - started) * 1000, 3)
+            context.stage_memory[name] = max(context.stage_memory.get(name, 0), rss_growth)
+
+
+class RequestContextFilter(logging.Filter):
+    """
+    Stamp records with the request id and drop lines of unsampled requests
+
+    Records at WARNING and above, and records logged outside a request, always pass.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        context = _request_context.get()
+        if context is None:
+            return True
+        record.request_id = context.request_id
+        return context.sampled or record.levelno >= logging.WARNING
+
+
+class JSONFormatter(logging.Formatter):
+    """Format records as one JSON object per line"""
+
+    # Attributes every LogRecord has; anything else came from `extra=`
+    _STANDARD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in self._STANDARD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler that never blocks the caller
+
+    When the queue is full, records below ERROR are dropped (and counted);
+    errors wait briefly for room so they are not lost to a burst.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Formatting happens on the writer thread; only resolve the message and
+        # exception text here so the record no longer references live objects.
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            if record.levelno >= logging.ERROR:
+                try:
+                    self.queue.put(record, timeout=0.1)
+                    return
+                except queue.Full:
+                    pass
+            self.dropped += 1
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[DroppingQueueHandler] = None
+
+
+def configure_logging(level: str = "INFO", json_format: bool = True, queue_size: int = 10000) -> None:
+    """
+    Route all logging through a queue to a background writer thread
+
+    Callers only build and enqueue records; formatting and the stdout write
+    happen on the listener thread, so a slow or blocked stdout cannot stall
+    the event loop.
+
+    Args:
+        level: Root log level
+        json_format: Write JSON lines (otherwise the plain text format)
+        queue_size: Maximum number of records waiting to be written
+    """
+    global _listener, _queue_handler
+    if _listener is not None:
+        return
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    if json_format:
+        stream_handler.setFormatter(JSONFormatter())
+    else:
+        stream_handler.setFormatter(logging.Formatter(
+            "%(asctime)s - %(name)s - %(levelname)s - %(request_id)s - %(message)s",
+            defaults={"request_id": "-"}
+        ))
+
+    log_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+    _queue_handler = DroppingQueueHandler(log_queue)
+    _queue_handler.addFilter(RequestContextFilter())
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_queue_handler)
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the writer thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def logging_stats() -> dict:
+    """Get the number of queued and dropped log records"""
+    if _queue_handler is None:
+        return {"queued": 0, "dropped": 0}
+    return {"queued": _queue_handler.queue.qsize(), "dropped": _queue_handler.dropped}
@@ -0,0 +1,115 @@
+"""
+Benchmark request logging overhead: synchronous text lines vs queued JSON with sampling
+
+Simulates the logging of one /predict request and measures the time the
+request handler itself spends in logging calls, which is what delays the
+event loop. The old path wrote four f-string INFO lines per request through
+a StreamHandler; the new path enqueues one structured summary line (or none
+for unsampled requests) and a background thread does the formatting and
+writing. --write-latency-us simulates a slow or contended stdout.
+
+Usage:
+    python benchmarks/bench_logging.py --requests 20000 --write-latency-us 50
+"""
+import argparse
+import io
+import logging
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from AI_API_Features.utils import structured_logging
+from AI_API_Features.utils.structured_logging import (
+    configure_logging,
+    shutdown_logging,
+    start_request,
+    log_fields,
+    stage
+)
+
+
+class SlowStream(io.TextIOBase):
+    """Discards output after sleeping for a fixed time per write"""
+
+    def __init__(self, latency_us: float):
+        self.latency = latency_us / 1e6
+
+    def write(self, text: str) -> int:
+        if self.latency:
+            time.sleep(self.latency)
+        return len(text)
+
+
+def old_request(logger: logging.Logger, i: int) -> None:
+    logger.info(f"Predicting food from image: upload_{i}.jpg")
+    logger.info(f"Prediction: apple_pie with confidence {0.8734:.2%}")
+    logger.info("Food 'apple_pie' found in database")
+    logger.info(f"POST /api/food/predict 200 in {12.5:.1f}ms")
+
+
+def new_request(logger: logging.Logger, access_logger: logging.Logger, i: int, sample_rate: float) -> None:
+    context = start_request(sample_rate=sample_rate)
+    with stage("inference"):
+        log_fields(image_name=f"upload_{i}.jpg", predicted_food="apple_pie", confidence=0.8734)
+    with stage("nutrition"):
+        log_fields(nutrition_status="ok", match="primary")
+    access_logger.info(
+        "POST /api/food/predict 200",
+        extra={"status": 200, "duration_ms": round(context.elapsed_ms(), 3), "stages": context.stages, **context.fields}
+    )
+
+
+def run_old(args: argparse.Namespace) -> float:
+    root = logging.getLogger()
+    handler = logging.StreamHandler(SlowStream(args.write_latency_us))
+    handler.setFormatter(logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
+    root.handlers = [handler]
+    root.setLevel(logging.INFO)
+    logger = logging.getLogger("bench.food")
+
+    started = time.perf_counter()
+    for i in range(args.requests):
+        old_request(logger, i)
+    return (time.perf_counter() - started) * 1e6 / args.requests
+
+
+def run_new(args: argparse.Namespace, sample_rate: float) -> tuple[float, float, int]:
+    configure_logging("INFO", json_format=True, queue_size=args.queue_size)
+    # Point the background writer at the simulated stream
+    for handler in structured_logging._listener.handlers:
+        handler.setStream(SlowStream(args.write_latency_us))
+    logger = logging.getLogger("bench.food")
+    access_logger = logging.getLogger("bench.access")
+
+    started = time.perf_counter()
+    for i in range(args.requests):
+        new_request(logger, access_logger, i, sample_rate)
+    caller_us = (time.perf_counter() - started) * 1e6 / args.requests
+    dropped = structured_logging._queue_handler.dropped
+
+    shutdown_logging()
+    drain_seconds = time.perf_counter() - started
+    structured_logging._queue_handler = None
+    return caller_us, drain_seconds, dropped
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--write-latency-us", type=float, default=0.0, help="Simulated time per stdout write")
+    parser.add_argument("--queue-size", type=int, default=100000)
+    args = parser.parse_args()
+
+    print(f"{args.requests} requests, {args.write_latency_us:.0f} us per write")
+    old_us = run_old(args)
+    print(f"sync text, 4 lines/request:         {old_us:8.2f} us/request in the handler")
+    for sample_rate in (1.0, 0.1):
+        caller_us, drain_seconds, dropped = run_new(args, sample_rate)
+        print(f"queued JSON, 1 line, sampled {sample_rate:4.0%}:  {caller_us:8.2f} us/request in the handler "
+              f"(writer drained after {drain_seconds:.2f}s, {dropped} dropped)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Benchmark batch preprocessing: serial per-image arrays vs the pooled parallel preprocessor
+
+Generates synthetic JPEG uploads (or reads --image-dir) and reports the time
+per batch and the number of input buffer allocations for both paths.
+
+Usage:
+    python benchmarks/bench_preprocessing.py --batch-size 16 --batches 50
+"""
+import argparse
+import io
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from AI_API_Features.services.preprocessing import BatchPreprocessor, decode_image
+
+
+def synthetic_jpegs(count: int, width: int, height: int) -> list[bytes]:
+    rng = np.random.default_rng(0)
+    images = []
+    for _ in range(count):
+        pixels = rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+        buffer = io.BytesIO()
+        Image.fromarray(pixels).save(buffer, "JPEG", quality=90)
+        images.append(buffer.getvalue())
+    return images
+
+
+def serial_batch(images: list[bytes], img_size: int) -> np.ndarray:
+    """The original path: one array per image, expand_dims, then concatenate"""
+    arrays = [np.expand_dims(np.array(decode_image(image, img_size)), axis=0) for image in images]
+    return np.concatenate(arrays, axis=0)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--batches", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--img-size", type=int, default=224)
+    parser.add_argument("--width", type=int, default=1280, help="Synthetic image width")
+    parser.add_argument("--height", type=int, default=960, help="Synthetic image height")
+    parser.add_argument("--image-dir", type=Path, help="Use real images instead of synthetic ones")
+    args = parser.parse_args()
+
+    if args.image_dir:
+        images = [p.read_bytes() for p in sorted(args.image_dir.iterdir()) if p.is_file()][:args.batch_size]
+    else:
+        images = synthetic_jpegs(args.batch_size, args.width, args.height)
+
+    # Serial baseline
+    tracemalloc.start()
+    started = time.perf_counter()
+    for _ in range(args.batches):
+        serial_batch(images, args.img_size)
+    serial_seconds = time.perf_counter() - started
+    _, serial_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # Pooled parallel preprocessor
+    preprocessor = BatchPreprocessor(args.img_size, args.batch_size, workers=args.workers)
+    tracemalloc.start()
+    started = time.perf_counter()
+    for _ in range(args.batches):
+        batch = preprocessor.preprocess(images)
+        preprocessor.release(batch)
+    pooled_seconds = time.perf_counter() - started
+    _, pooled_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    stats = preprocessor.stats()
+    preprocessor.shutdown()
+
+    print(f"Batch size {len(images)}, {args.batches} batches, {args.workers} workers")
+    print(f"serial: {serial_seconds * 1000 / args.batches:8.2f} ms/batch, "
+          f"{args.batches * (len(images) + 1)} batch arrays allocated, peak traced {serial_peak / 1e6:.1f} MB")
+    print(f"pooled: {pooled_seconds * 1000 / args.batches:8.2f} ms/batch, "
+          f"{stats['buffer_allocations']} batch buffers allocated, peak traced {pooled_peak / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Benchmark response serialization: per-request pydantic + default JSON encoding vs cached fragments
+
+Builds Food rows in memory (no database needed) and times how long it takes
+to turn a /predict and a /predict-top result into response bytes, first the
+original way (model_validate, jsonable_encoder, json.dumps) and then from the
+food catalog's pre-serialized payloads.
+
+Usage:
+    python benchmarks/bench_serialization.py --requests 20000 --top-k 5
+"""
+import argparse
+import json
+import sys
+import time
+from datetime import datetime, timezone
+from decimal import Decimal
+from pathlib import Path
+
+from fastapi.encoders import jsonable_encoder
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from AI_API_Features.models import Food, FoodResponse, PredictionResponse
+from AI_API_Features.services.food_catalog import CatalogEntry
+from AI_API_Features.utils.fast_json import FastJSONResponse
+
+
+def make_foods(count: int) -> list[Food]:
+    now = datetime.now(timezone.utc)
+    return [
+        Food(
+            id=i + 1,
+            name=f"food_{i}",
+            calories=Decimal("123.45"),
+            protein=Decimal("12.30"),
+            carbohydrate=Decimal("30.10"),
+            fat=Decimal("4.20"),
+            sugar=Decimal("1.50"),
+            pic=f"https://example.com/food_{i}.jpg",
+            createdAt=now,
+            updatedAt=now
+        )
+        for i in range(count)
+    ]
+
+
+def render_default(content) -> bytes:
+    """What FastAPI does for a returned object: jsonable_encoder, then JSONResponse.render"""
+    return json.dumps(
+        jsonable_encoder(content), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def time_per_call(fn, requests: int) -> float:
+    started = time.perf_counter()
+    for i in range(requests):
+        fn(i)
+    return (time.perf_counter() - started) * 1e6 / requests
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--top-k", type=int, default=5)
+    args = parser.parse_args()
+
+    foods = make_foods(100)
+    entries = [CatalogEntry.from_food(food) for food in foods]
+    renderer = FastJSONResponse(content=b"")
+
+    def predict_before(i: int) -> bytes:
+        food = foods[i % len(foods)]
+        return render_default(PredictionResponse(
+            success=True, predicted_food=food.name, confidence=0.87,
+            food_data=FoodResponse.model_validate(food), message=f"Successfully identified {food.name}",
+            model_version="abc123"
+        ))
+
+    def predict_after(i: int) -> bytes:
+        entry = entries[i % len(entries)]
+        return renderer.render({
+            "success": True, "predicted_food": entry.name, "confidence": 0.87, "food_data": entry.fragment,
+            "message": f"Successfully identified {entry.name}", "suggestions": None, "model_version": "abc123"
+        })
+
+    def top_before(i: int) -> bytes:
+        results = [{
+            "food_name": food.name, "confidence": 0.1, "in_database": True,
+            "food_data": FoodResponse.model_validate(food).model_dump()
+        } for food in (foods[(i + j) % len(foods)] for j in range(args.top_k))]
+        return render_default({"success": True, "predictions": results, "total": len(results), "model_version": "abc123"})
+
+    def top_after(i: int) -> bytes:
+        results = [{
+            "food_name": entry.name, "confidence": 0.1, "in_database": True, "food_data": entry.fragment
+        } for entry in (entries[(i + j) % len(entries)] for j in range(args.top_k))]
+        return renderer.render({"success": True, "predictions": results, "total": len(results), "model_version": "abc123"})
+
+    assert json.loads(predict_before(0)) == json.loads(predict_after(0)), "payloads differ"
+    # The old /predict-top path rendered UTC timestamps as "+00:00" rather than pydantic's "Z"
+    assert json.loads(top_before(0).replace(b"+00:00", b"Z")) == json.loads(top_after(0)), "payloads differ"
+
+    print(f"{args.requests} responses each, top_k={args.top_k}")
+    for label, before, after in (("/predict", predict_before, predict_after), ("/predict-top", top_before, top_after)):
+        before_us = time_per_call(before, args.requests)
+        after_us = time_per_call(after, args.requests)
+        print(f"{label:13s} before: {before_us:8.1f} us/response   after: {after_us:8.1f} us/response   "
+              f"({before_us / after_us:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
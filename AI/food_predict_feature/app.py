@@ -1,13 +1,10 @@
 import streamlit as st
-import tensorflow as tf
-from tensorflow import keras
-from tensorflow.keras import layers
-import numpy as np
-import json
 from PIL import Image
 import io # Needed for camera input
 from pathlib import Path
+from typing import Optional
 import os
+import sys
 
 # --- CONFIGURATION ---
 st.set_page_config(
@@ -18,12 +15,14 @@ st.set_page_config(
 )
 
 # --- Constants ---
-IMG_SIZE = 224
-NUM_CLASSES = 100
-# Resolve file paths relative to this script to avoid working-directory issues
-BASE_DIR = Path(__file__).resolve().parent
-MODEL_WEIGHTS_PATH = BASE_DIR / "best_model_food100.keras"  # Make sure this matches your file name
-CLASS_NAMES_PATH = BASE_DIR / "class_names.json"
+# With FOOD_LENS_API_URL set (e.g. http://localhost:8000) the app is a client of a running
+# Food Recognition API; otherwise it runs the API's inference service in this process.
+# Either way it never builds a model of its own.
+API_URL = os.environ.get("FOOD_LENS_API_URL", "").rstrip("/")
+API_BATCH_SIZE = 32  # images per /predict-batch call (the API's MAX_BATCH_FILES)
+TOP_K = 3
+# The API package lives next to this folder
+AI_DIR = Path(__file__).resolve().parent.parent
 
 # --- Custom CSS (Keep as before) ---
 st.markdown("""
@@ -38,100 +37,93 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
-# --- MODEL BUILDING & WEIGHTS LOADING (Corrected Again) ---
-@st.cache_resource
-def build_and_load_model():
-    """Builds the EfficientNetB0 model structure and loads the trained weights."""
-    try:
-        # --- FIX: Use the EXACT layers from Kaggle ---
-        # 1. Build the Data Augmentation Layer
-        data_augmentation = keras.Sequential([
-            layers.RandomFlip("horizontal"), # No seed needed for inference
-            layers.RandomRotation(0.2),
-            layers.RandomZoom(0.2),
-            layers.RandomContrast(0.2) # Use same layers as training
-        ], name="data_augmentation")
-
-        # --- FIX: Use the EXACT initialization from Kaggle ---
-        # 2. Build the Base Model (EfficientNetB0)
-        base_model = tf.keras.applications.EfficientNetB0(
-            include_top=False,
-            weights=None, # Crucial: Don't load imagenet weights
-            input_shape=(IMG_SIZE, IMG_SIZE, 3) # Define input shape
+# --- INFERENCE ENGINES ---
+# An upload is (file name, image bytes, content type); a result is the ranked
+# (food name, confidence) pairs, or None when the image could not be read.
+Upload = tuple[str, bytes, str]
+Ranked = Optional[list[tuple[str, float]]]
+
+
+class LocalEngine:
+    """The API's model and batch preprocessing, loaded once in this process"""
+
+    def __init__(self):
+        sys.path.insert(0, str(AI_DIR))
+        from AI_API_Features.config import get_settings
+        from AI_API_Features.services import FoodRecognitionModel
+        from AI_API_Features.services.preprocessing import BatchPreprocessor
+
+        settings = get_settings()
+        self.model = FoodRecognitionModel(settings.MODEL_PATH, settings.CLASS_NAMES_PATH, settings.IMG_SIZE)
+        if not self.model.is_loaded():
+            raise RuntimeError(f"Model or class names failed to load from {settings.MODEL_PATH.parent}")
+        self.preprocessor = BatchPreprocessor(
+            settings.IMG_SIZE,
+            settings.INFERENCE_MAX_BATCH_SIZE,
+            settings.PREPROCESS_WORKERS
         )
-        base_model.trainable = False # Keep it frozen for inference
-
-        # 3. Build the Full Model Structure (Must match Kaggle EXACTLY)
-        inputs = keras.Input(shape=(IMG_SIZE, IMG_SIZE, 3), name="input_layer")
-        # --- Apply augmentation layer ---
-        x = data_augmentation(inputs)
-        # Pass through base model
-        x = base_model(x, training=False)
-        x = layers.GlobalAveragePooling2D(name="pooling_layer")(x)
-        x = layers.Dropout(0.3, name="dropout_layer")(x) # Use same dropout rate
-        outputs = layers.Dense(NUM_CLASSES, activation="softmax", name="output_layer")(x)
-        model = keras.Model(inputs, outputs, name="EfficientNetB0_Food100") # Model name
-
-        # 4. Try loading a full saved model first (if file was saved with model.save)
-        try:
-            full_model = tf.keras.models.load_model(str(MODEL_WEIGHTS_PATH))
-            return full_model
-        except Exception:
-            # Not a full model file - try loading weights into the architecture
-            pass
-        
-        # Fallback: load weights into the architecture above (weights-only file)
-        model.load_weights(str(MODEL_WEIGHTS_PATH))
-        return model
-
-    except FileNotFoundError:
-        st.error(f"Model weights file ('{MODEL_WEIGHTS_PATH}') not found.")
-        return None
-    except ValueError as ve:
-         st.error(f"Error loading weights - Structure mismatch? {ve}")
-         return None
-    except Exception as e:
-        st.error(f"An unexpected error occurred building/loading model: {e}")
-        return None
+        self.description = f"in-process model `{settings.MODEL_PATH.name}`"
+
+    def predict(self, uploads: list[Upload], top_k: int = TOP_K) -> list[Ranked]:
+        results = []
+        batch_size = self.preprocessor.max_batch_size
+        for start in range(0, len(uploads), batch_size):
+            chunk = [data for _, data, _ in uploads[start:start + batch_size]]
+            prepared = self.preprocessor.preprocess(chunk)
+            try:
+                keep = [row for row, ok in enumerate(prepared.ok) if ok]
+                probabilities = iter(self.model.predict_batch(prepared.compact(keep)) if keep else [])
+            finally:
+                self.preprocessor.release(prepared)
+            for ok in prepared.ok:
+                results.append(self.model.decode_predictions(next(probabilities), top_k) if ok else None)
+        return results
+
+
+class APIEngine:
+    """Client of a running Food Recognition API (no TensorFlow in this process)"""
+
+    def __init__(self, base_url: str):
+        import httpx
+
+        self.client = httpx.Client(base_url=base_url, timeout=60)
+        self.client.get("/health").raise_for_status()
+        self.description = f"API at `{base_url}`"
+
+    def predict(self, uploads: list[Upload], top_k: int = TOP_K) -> list[Ranked]:
+        results = []
+        for start in range(0, len(uploads), API_BATCH_SIZE):
+            files = [("files", upload) for upload in uploads[start:start + API_BATCH_SIZE]]
+            response = self.client.post("/api/food/predict-batch", params={"top_k": top_k}, files=files)
+            response.raise_for_status()
+            for result in response.json()["results"]:
+                if result["success"]:
+                    results.append([(p["food_name"], p["confidence"]) for p in result["predictions"]])
+                else:
+                    results.append(None)
+        return results
 
 
-@st.cache_data
-def load_my_class_names():
-    # ... (Your existing class names loading code - seems correct) ...
+@st.cache_resource
+def get_engine():
+    """One engine (so at most one resident model) shared by every session"""
     try:
-        with open(str(CLASS_NAMES_PATH), 'r', encoding='utf-8') as f:
-            class_names = json.load(f)
-        if len(class_names) != NUM_CLASSES:
-             st.warning(f"Class names count mismatch.")
-        return class_names
-    except FileNotFoundError:
-        st.error(f"Class names file ('{CLASS_NAMES_PATH}') not found.")
-        return None
+        return APIEngine(API_URL) if API_URL else LocalEngine()
     except Exception as e:
-        st.error(f"Error loading class names: {e}")
+        st.error(f"Could not start the inference engine: {e}")
         return None
 
-# Load resources
-model = build_and_load_model()
-class_names = load_my_class_names()
 
-# --- HELPER FUNCTION (process_image - Keep as before) ---
-def process_image(image_input, img_shape=IMG_SIZE):
-    # ... (Your existing image processing code - seems correct) ...
-    try:
-        if isinstance(image_input, bytes):
-            image_pil = Image.open(io.BytesIO(image_input))
-        elif isinstance(image_input, Image.Image):
-             image_pil = image_input
-        else: return None
-        if image_pil.mode != "RGB": image_pil = image_pil.convert("RGB")
-        img = image_pil.resize((img_shape, img_shape))
-        img_array = np.array(img)
-        img_array = np.expand_dims(img_array, axis=0)
-        return img_array
-    except Exception as e:
-        st.error(f"Error processing image: {e}")
-        return None
+def to_upload(file) -> Upload:
+    """Streamlit upload or camera photo -> (name, bytes, content type)"""
+    return (file.name or "image.jpg", file.getvalue(), file.type or "image/jpeg")
+
+
+def display_name(food_name: str) -> str:
+    return food_name.replace('_', ' ').title()
+
+
+engine = get_engine()
 
 # --- Initialize Session State ---
 if 'show_camera' not in st.session_state:
@@ -159,97 +151,126 @@ st.sidebar.markdown(
     "3.  **Prediction:** The AI model analyzes the image.\n"
     "4.  **Output:** The predicted food name and confidence score are shown."
 )
+st.sidebar.markdown("---")
+mode = st.sidebar.radio("Mode", ["Single image", "Gallery"], help="Gallery scores many images in one call.")
+if engine is not None:
+    st.sidebar.caption(f"Inference: {engine.description}")
 
 
 st.divider()
 
-# --- Input Options ---
-col1_input, col2_input = st.columns(2)
 
-with col1_input:
-    uploaded_file = st.file_uploader(
-        "📂 Upload an Image",
-        type=["jpg", "jpeg", "png", "webp"],
-        help="Select a food image file from your device."
-    )
-    if uploaded_file is not None:
-        st.session_state.show_camera = False # Hide camera if file is uploaded
-
-with col2_input:
-    if st.button("📷 Open Camera"):
-        st.session_state.show_camera = True
-        # uploaded_file = None # Attempt to clear uploader state (might not work perfectly)
-
-    camera_photo = None
-    if st.session_state.show_camera:
-        camera_photo = st.camera_input(
-            "Capture Photo (Click below)",
-            key="camera",
-            help="Use your device's camera to capture a food image."
-            )
-        if camera_photo:
-             st.session_state.show_camera = False
+def single_image_mode() -> None:
+    # --- Input Options ---
+    col1_input, col2_input = st.columns(2)
 
-st.divider()
-
-# Determine input source
-image_source_data = None
-image_display = None
-
-if uploaded_file is not None:
-    try:
-        image_display = Image.open(uploaded_file)
-        image_source_data = image_display # Pass PIL
-    except Exception as e:
-        st.error(f"Error opening uploaded file: {e}")
-elif camera_photo is not None:
+    with col1_input:
+        uploaded_file = st.file_uploader(
+            "📂 Upload an Image",
+            type=["jpg", "jpeg", "png", "webp"],
+            help="Select a food image file from your device."
+        )
+        if uploaded_file is not None:
+            st.session_state.show_camera = False # Hide camera if file is uploaded
+
+    with col2_input:
+        if st.button("📷 Open Camera"):
+            st.session_state.show_camera = True
+
+        camera_photo = None
+        if st.session_state.show_camera:
+            camera_photo = st.camera_input(
+                "Capture Photo (Click below)",
+                key="camera",
+                help="Use your device's camera to capture a food image."
+                )
+            if camera_photo:
+                 st.session_state.show_camera = False
+
+    st.divider()
+
+    # Determine input source
+    source = uploaded_file if uploaded_file is not None else camera_photo
+    if source is None:
+        st.info("👆 Please upload an image or click 'Open Camera' to get started!")
+        return
+
+    upload = to_upload(source)
     try:
-        img_bytes = camera_photo.getvalue()
-        image_display = Image.open(io.BytesIO(img_bytes)) # PIL for display
-        image_source_data = img_bytes # Pass bytes for processing
-    except Exception as e:
-        st.error(f"Error opening camera photo: {e}")
-
-# --- Main Logic & Display Area ---
-if model is None or class_names is None:
-    st.warning("Model or class names failed to load. Cannot proceed.")
-elif image_source_data is not None:
-    if image_display:
-         st.image(image_display, caption="Selected Image", use_column_width=True)
-    else:
-         st.warning("Could not display the selected image.")
+        st.image(Image.open(io.BytesIO(upload[1])), caption="Selected Image", use_column_width=True)
+    except Exception:
+        st.warning("Could not display the selected image.")
 
     with st.container():
         st.markdown("<div class='result-box'>", unsafe_allow_html=True)
         st.subheader("🧠 AI Prediction:")
 
         with st.spinner("🔍 Analyzing image..."):
-            processed_img = process_image(image_source_data, img_shape=IMG_SIZE) # Pass PIL or bytes
-
-            if processed_img is not None:
-                try:
-                    prediction = model.predict(processed_img)
-                    index = np.argmax(prediction[0])
-                    confidence = np.max(prediction[0]) * 100
-
-                    if 0 <= index < len(class_names):
-                        food_name = class_names[index]
-                        st.markdown(f"<p class='prediction-text'>{food_name.replace('_', ' ').title()}</p>", unsafe_allow_html=True)
-                        st.markdown(f"<p class='confidence-text'>Confidence: {confidence:.2f}%</p>", unsafe_allow_html=True)
-                        st.progress(int(confidence))
-                        st.caption("Note: Confidence indicates how sure the model is.")
-                    else:
-                        st.error(f"Prediction index {index} out of range.")
-                except Exception as e:
-                    st.error(f"Prediction error: {e}")
-            else:
-                st.error("Image processing failed.")
+            try:
+                ranked = engine.predict([upload])[0]
+            except Exception as e:
+                st.error(f"Prediction error: {e}")
+                ranked = None
+                upload = None
+
+        if ranked:
+            food_name, confidence = ranked[0]
+            confidence *= 100
+            st.markdown(f"<p class='prediction-text'>{display_name(food_name)}</p>", unsafe_allow_html=True)
+            st.markdown(f"<p class='confidence-text'>Confidence: {confidence:.2f}%</p>", unsafe_allow_html=True)
+            st.progress(int(confidence))
+            if len(ranked) > 1:
+                st.caption("Also possible: " + ", ".join(f"{display_name(n)} ({c:.0%})" for n, c in ranked[1:]))
+            st.caption("Note: Confidence indicates how sure the model is.")
+        elif upload is not None:
+            st.error("Image processing failed.")
 
         st.markdown("</div>", unsafe_allow_html=True)
+
+
+def gallery_mode() -> None:
+    uploaded_files = st.file_uploader(
+        "📂 Upload Images",
+        type=["jpg", "jpeg", "png", "webp"],
+        accept_multiple_files=True,
+        help="Select several food images; they are scored together in batches."
+    )
+    if not uploaded_files:
+        st.info("👆 Upload a few images to score them all at once.")
+        return
+
+    uploads = [to_upload(f) for f in uploaded_files]
+    with st.spinner(f"🔍 Analyzing {len(uploads)} images..."):
+        try:
+            results = engine.predict(uploads)
+        except Exception as e:
+            st.error(f"Prediction error: {e}")
+            return
+
+    failed = sum(1 for ranked in results if not ranked)
+    st.subheader(f"🧠 {len(uploads) - failed} of {len(uploads)} images identified")
+    columns = st.columns(4)
+    for i, ((name, data, _), ranked) in enumerate(zip(uploads, results)):
+        with columns[i % 4]:
+            try:
+                st.image(Image.open(io.BytesIO(data)), use_column_width=True)
+            except Exception:
+                pass
+            if ranked:
+                food_name, confidence = ranked[0]
+                st.markdown(f"**{display_name(food_name)}** {confidence:.0%}")
+            else:
+                st.caption(f"⚠️ Could not read {name}")
+
+
+# --- Main Logic & Display Area ---
+if engine is None:
+    st.warning("The inference engine failed to start. Cannot proceed.")
+elif mode == "Gallery":
+    gallery_mode()
 else:
-    st.info("👆 Please upload an image or click 'Open Camera' to get started!")
+    single_image_mode()
 
 # Footer
 st.markdown("---")
 st.caption("Food Lens AI © 2025")
-
@@ -12,24 +12,38 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from AI_API_Features.config import get_settings
-from AI_API_Features.routers import food_router
-from AI_API_Features.services import get_model
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(sys.stdout)
-    ]
+from AI_API_Features.routers import food_router, admin_router, live_scan_router
+from AI_API_Features.routers.dependencies import (
+    get_registry,
+    get_inference_scheduler,
+    get_active_embedding_index,
+    get_catalog,
+    get_pred_log,
+    get_admission,
+    get_limiter,
+    get_budget
 )
+from AI_API_Features.middleware import AdmissionMiddleware
+from AI_API_Features.config.database import SessionLocal
+from AI_API_Features.services import (
+    shutdown_scheduler,
+    shutdown_prediction_log,
+    shutdown_artifact_cache,
+    shutdown_food_catalog,
+    save_embedding_index
+)
+from AI_API_Features.utils import configure_logging, shutdown_logging, start_request, mark_startup
+
+# Get settings
+settings = get_settings()
+
+# Configure logging (queued to a background writer, JSON lines by default)
+configure_logging(settings.LOG_LEVEL, settings.LOG_FORMAT == "json", settings.LOG_QUEUE_SIZE)
 
 # Reduce watchfiles logging noise
 logging.getLogger("watchfiles").setLevel(logging.WARNING)
 logger = logging.getLogger(__name__)
-
-# Get settings
-settings = get_settings()
+access_logger = logging.getLogger("AI_API_Features.access")
 
 # Create FastAPI app
 app = FastAPI(
@@ -49,6 +63,58 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Rate limiting and admission control for the expensive routes
+if settings.ADMISSION_ENABLED:
+    app.add_middleware(
+        AdmissionMiddleware,
+        controller=get_admission(),
+        limiter=get_limiter() if settings.RATE_LIMIT_ENABLED else None,
+        memory_budget=get_budget(),
+        paths=settings.admission_paths,
+        batch_paths=settings.admission_batch_paths,
+        max_wait_ms=settings.ADMISSION_MAX_WAIT_MS,
+        api_key_header=settings.API_KEY_HEADER,
+        priority_header=settings.PRIORITY_HEADER,
+        trust_forwarded_for=settings.TRUST_FORWARDED_FOR,
+        api_keys=settings.api_keys,
+        trusted_proxies=settings.trusted_proxies
+    )
+
+
+# Request logging
+@app.middleware("http")
+async def request_logging_middleware(request: Request, call_next):
+    """Assign a request id and log one summary line with stage timings per request"""
+    context = start_request(request.headers.get(settings.REQUEST_ID_HEADER), settings.LOG_SAMPLE_RATE)
+    summary = {"method": request.method, "path": request.url.path}
+    try:
+        response = await call_next(request)
+    except Exception:
+        access_logger.error(
+            f"{request.method} {request.url.path} failed",
+            extra={**summary, "duration_ms": round(context.elapsed_ms(), 3), "stages": context.stages, **context.fields},
+            exc_info=True
+        )
+        raise
+    
+    response.headers[settings.REQUEST_ID_HEADER] = context.request_id
+    if "serving_tier" in context.fields:
+        response.headers[settings.SERVING_TIER_HEADER] = context.fields["serving_tier"]
+    level = logging.ERROR if response.status_code >= 500 else logging.INFO
+    access_logger.log(
+        level,
+        f"{request.method} {request.url.path} {response.status_code}",
+        extra={
+            **summary,
+            "status": response.status_code,
+            "duration_ms": round(context.elapsed_ms(), 3),
+            "stages": context.stages,
+            "stage_rss_growth_bytes": context.stage_memory,
+            **context.fields
+        }
+    )
+    return response
+
 
 # Global exception handler
 @app.exception_handler(Exception)
@@ -65,6 +131,23 @@ async def global_exception_handler(request: Request, exc: Exception):
     )
 
 
+# Health check (used by the request router and container orchestration)
+@app.get("/health", tags=["Monitoring"])
+async def health():
+    """Report whether this instance can serve predictions"""
+    # Don't retry a failed model load on every probe
+    ready = getattr(app.state, "model_ready", False)
+    version = get_registry().active.version if ready else None
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "status": "ok" if ready else "unavailable",
+            "model_version": version,
+            "nutrition_status": get_catalog().status()
+        }
+    )
+
+
 # Startup event
 @app.on_event("startup")
 async def startup_event():
@@ -85,18 +168,38 @@ async def startup_event():
     # Load ML model
     try:
         logger.info("Loading ML model...")
-        model = get_model(
-            settings.MODEL_PATH,
-            settings.CLASS_NAMES_PATH,
-            settings.IMG_SIZE
-        )
-        if model.is_loaded():
-            logger.info("✅ ML model loaded successfully")
+        registry = get_registry()
+        model = registry.active.model
+        app.state.model_ready = model.is_loaded()
+        if app.state.model_ready:
+            logger.info(f"✅ ML model loaded successfully (version {registry.active.version})")
+            mark_startup("model_ready")
+            get_inference_scheduler()
+            get_active_embedding_index()
         else:
             logger.error("❌ ML model failed to load")
     except Exception as e:
         logger.error(f"❌ Error loading ML model: {e}")
     
+    # Start the prediction log (its sink is prepared on the flush thread)
+    try:
+        get_pred_log()
+    except Exception as e:
+        logger.error(f"❌ Error starting prediction log: {e}")
+    
+    # Serialize nutrition payloads before the first request
+    try:
+        db = SessionLocal()
+        try:
+            get_catalog().refresh(db, force=True)
+        finally:
+            db.close()
+    except Exception as e:
+        logger.warning(f"⚠️ Food catalog not loaded at startup, serving without nutrition data for now: {e}")
+    # From here on the snapshot is refreshed in the background, never on a request
+    get_catalog().start(SessionLocal)
+    
+    mark_startup("app_ready")
     logger.info("Food Recognition API started successfully")
 
 
@@ -105,10 +208,20 @@ async def startup_event():
 async def shutdown_event():
     """Cleanup on shutdown"""
     logger.info("Shutting down Food Recognition API...")
+    shutdown_scheduler()
+    shutdown_prediction_log()
+    shutdown_food_catalog()
+    shutdown_artifact_cache()
+    # The index file belongs to the default model, even if another model's index was used last
+    default_version = get_registry().active.version if getattr(app.state, "model_ready", False) else None
+    save_embedding_index(settings.EMBEDDING_INDEX_PATH, default_version)
+    shutdown_logging()
 
 
 # Include routers
 app.include_router(food_router)
+app.include_router(admin_router)
+app.include_router(live_scan_router)
 
 
 # Run with: uvicorn main:app --reload --host 0.0.0.0 --port 8000
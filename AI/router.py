@@ -0,0 +1,177 @@
+"""
+Request router: spreads traffic over several API replicas with cache locality
+
+Prediction uploads are routed by the hash of the image content on a
+consistent-hash ring of backends, so every replica sees (and caches) its own
+slice of the images and a repeated photo lands on the replica that already
+has it cached. Backends are health-checked in the background; a request to
+a failed backend fails over to the next one on the ring, and a backend
+holding more than ROUTER_LOAD_FACTOR times the average in-flight requests
+passes its keys on to its ring neighbour. Other requests go to the least
+loaded healthy backend.
+
+Run with:
+    ROUTER_BACKENDS=http://127.0.0.1:8001,http://127.0.0.1:8002 uvicorn router:app --port 8080
+
+or start local replicas and the router together with tools/launch_cluster.py.
+"""
+import asyncio
+import logging
+import sys
+from pathlib import Path
+from typing import Optional
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from AI_API_Features.config import get_settings
+from AI_API_Features.services import Backend, BackendPool
+from AI_API_Features.utils import calculate_file_hash, configure_logging, shutdown_logging
+
+settings = get_settings()
+configure_logging(settings.LOG_LEVEL, settings.LOG_FORMAT == "json", settings.LOG_QUEUE_SIZE)
+logger = logging.getLogger("AI_API_Features.router")
+
+# Routes whose uploaded image decides the backend
+HASHED_PATHS = ("/api/food/predict", "/api/food/predict-top")
+
+# Headers that describe a single connection and must not be forwarded
+HOP_BY_HOP_HEADERS = {
+    "connection", "keep-alive", "proxy-authenticate", "proxy-authorization", "te", "trailers",
+    "transfer-encoding", "upgrade", "host", "content-length", "content-encoding"
+}
+
+pool = BackendPool(
+    settings.router_backends,
+    settings.ROUTER_VIRTUAL_NODES,
+    settings.ROUTER_LOAD_FACTOR,
+    settings.ROUTER_FAILURE_THRESHOLD
+)
+
+app = FastAPI(
+    title=f"{settings.API_TITLE} Router",
+    version=settings.API_VERSION,
+    docs_url=None,
+    redoc_url=None
+)
+
+
+async def _check_backend(client: httpx.AsyncClient, backend: Backend) -> None:
+    try:
+        response = await client.get(f"{backend.url}/health", timeout=settings.ROUTER_HEALTH_INTERVAL_SECONDS)
+        pool.record_check(backend, response.status_code == 200, f"health check returned {response.status_code}")
+    except httpx.HTTPError as e:
+        pool.record_check(backend, False, f"health check failed: {type(e).__name__}")
+
+
+async def _health_loop(client: httpx.AsyncClient) -> None:
+    """Probe every backend's /health at a fixed interval"""
+    while True:
+        await asyncio.gather(*(_check_backend(client, b) for b in pool.backends.values()))
+        await asyncio.sleep(settings.ROUTER_HEALTH_INTERVAL_SECONDS)
+
+
+@app.on_event("startup")
+async def startup_event():
+    app.state.client = httpx.AsyncClient(timeout=settings.ROUTER_TIMEOUT_SECONDS)
+    app.state.health_task = asyncio.create_task(_health_loop(app.state.client))
+    logger.info(f"Routing to {len(pool.backends)} backends: {', '.join(pool.backends)}")
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    app.state.health_task.cancel()
+    await app.state.client.aclose()
+    shutdown_logging()
+
+
+@app.get("/health", include_in_schema=False)
+async def health():
+    healthy = sum(1 for b in pool.backends.values() if b.healthy)
+    return JSONResponse(
+        status_code=200 if healthy else 503,
+        content={"status": "ok" if healthy else "unavailable", "healthy_backends": healthy}
+    )
+
+
+@app.get("/router/stats", include_in_schema=False)
+async def router_stats():
+    return pool.stats()
+
+
+async def _routing_key(request: Request) -> Optional[str]:
+    """Hash of the uploaded image for prediction routes, None for everything else"""
+    if request.method != "POST" or request.url.path not in HASHED_PATHS:
+        return None
+    if not request.headers.get("content-type", "").startswith("multipart/form-data"):
+        return None
+    try:
+        form = await request.form()
+    except Exception:
+        return None
+    upload = form.get("file")
+    if upload is None or isinstance(upload, str):
+        return None
+    image_bytes = await upload.read()
+    return calculate_file_hash(image_bytes)
+
+
+@app.api_route("/{path:path}", methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"], include_in_schema=False)
+async def proxy(request: Request, path: str):
+    """Forward a request to the backend chosen for it, failing over along the ring"""
+    body = await request.body()
+    key = await _routing_key(request)
+    retryable = request.method in ("GET", "OPTIONS") or request.url.path in HASHED_PATHS
+
+    headers = {k: v for k, v in request.headers.items() if k.lower() not in HOP_BY_HOP_HEADERS}
+    client_host = request.client.host if request.client else "unknown"
+    forwarded = request.headers.get("x-forwarded-for")
+    headers["x-forwarded-for"] = f"{forwarded}, {client_host}" if forwarded else client_host
+
+    candidates = pool.candidates(key)[:max(settings.ROUTER_MAX_ATTEMPTS, 1)]
+    for attempt, backend in enumerate(candidates):
+        if attempt:
+            pool.record_failover()
+        pool.start(backend)
+        try:
+            response = await request.app.state.client.request(
+                request.method,
+                f"{backend.url}{request.url.path}",
+                params=request.query_params,
+                headers=headers,
+                content=body
+            )
+        except httpx.HTTPError as e:
+            pool.finish(backend, f"{type(e).__name__}: {e}")
+            logger.warning(f"Request to {backend.url} failed ({type(e).__name__}), trying next backend")
+            if not retryable and not isinstance(e, httpx.ConnectError):
+                break
+            continue
+
+        if response.status_code == 503 and retryable and attempt + 1 < len(candidates):
+            # Backend is saturated or degraded; the next one on the ring may not be
+            pool.finish(backend)
+            continue
+        pool.finish(backend)
+
+        response_headers = {k: v for k, v in response.headers.items() if k.lower() not in HOP_BY_HOP_HEADERS}
+        response_headers["X-Routed-To"] = backend.url
+        return Response(content=response.content, status_code=response.status_code, headers=response_headers)
+
+    logger.error(f"No backend could serve {request.method} {request.url.path}")
+    return JSONResponse(
+        status_code=503,
+        content={"success": False, "error": "Service unavailable", "detail": "No healthy backend available"},
+        headers={"Retry-After": str(max(1, round(settings.ROUTER_HEALTH_INTERVAL_SECONDS)))}
+    )
+
+
+# Run with: uvicorn router:app --host 0.0.0.0 --port 8080
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run("router:app", host=settings.HOST, port=settings.ROUTER_PORT, reload=False, log_level="info")
@@ -0,0 +1,20 @@
+"""
+Shared test setup: the API runs on the fake model and keeps its files in a temporary folder
+"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+_TMP = Path(tempfile.mkdtemp(prefix="food-api-tests-"))
+
+# Must be set before the settings are first loaded
+os.environ.setdefault("USE_FAKE_MODEL", "true")
+os.environ.setdefault("FAKE_MODEL_LATENCY_MS", "0")
+os.environ.setdefault("MODEL_ARTIFACT_CACHE_ENABLED", "false")
+os.environ.setdefault("EMBEDDING_INDEX_PATH", str(_TMP / "embedding_index.npz"))
+os.environ.setdefault("PREDICTION_LOG_DIR", str(_TMP / "prediction_log"))
+os.environ.setdefault("REVIEW_DIR", str(_TMP / "review_images"))
+os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "3")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,61 @@
+"""
+Admission control: which client a request is charged to, and slot bookkeeping
+"""
+import asyncio
+
+from AI_API_Features.middleware.admission import INTERACTIVE, AdmissionController, AdmissionMiddleware
+
+
+def _middleware(**kwargs) -> AdmissionMiddleware:
+    return AdmissionMiddleware(None, AdmissionController(), **kwargs)
+
+
+def _key(middleware: AdmissionMiddleware, peer: str, **headers: str) -> str:
+    scope = {"client": (peer, 1234)}
+    raw = {name.replace("_", "-").lower().encode(): value.encode() for name, value in headers.items()}
+    return middleware._client_key(scope, raw)
+
+
+def test_unknown_api_key_is_keyed_on_peer_ip():
+    middleware = _middleware(api_keys=("secret",))
+
+    assert _key(middleware, "203.0.113.7", x_api_key="made-up") == "ip:203.0.113.7"
+    assert _key(middleware, "203.0.113.7", x_api_key="secret").startswith("key:")
+    assert "secret" not in _key(middleware, "203.0.113.7", x_api_key="secret")
+
+
+def test_forwarded_for_ignored_unless_enabled_and_peer_is_trusted():
+    assert _key(_middleware(), "127.0.0.1", x_forwarded_for="198.51.100.1") == "ip:127.0.0.1"
+
+    middleware = _middleware(trust_forwarded_for=True)
+    assert _key(middleware, "203.0.113.7", x_forwarded_for="198.51.100.1") == "ip:203.0.113.7"
+
+
+def test_forwarded_for_takes_rightmost_untrusted_hop():
+    middleware = _middleware(trust_forwarded_for=True, trusted_proxies=("127.0.0.1", "10.0.0.0/8"))
+
+    # The client spoofed the first entry; the proxies appended the rest
+    key = _key(middleware, "127.0.0.1", x_forwarded_for="1.2.3.4, 198.51.100.1, 10.0.0.5")
+    assert key == "ip:198.51.100.1"
+
+
+def test_cancelled_waiter_hands_back_granted_slot():
+    async def scenario() -> dict:
+        controller = AdmissionController(max_concurrent=1)
+        assert await controller.acquire(INTERACTIVE, 1.0)
+        waiting = asyncio.create_task(controller.acquire(INTERACTIVE, 1.0))
+        await asyncio.sleep(0)
+
+        # The waiter is cancelled, then granted the slot before it gets to run
+        waiting.cancel()
+        controller.release(INTERACTIVE)
+        try:
+            if await waiting:
+                controller.release(INTERACTIVE)
+        except asyncio.CancelledError:
+            pass
+        return controller.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["active"][INTERACTIVE] == 0
+    assert stats["waiting"][INTERACTIVE] == 0
@@ -0,0 +1,98 @@
+"""
+Food catalog: noticing changes made by other writers, and refreshing off the request path
+"""
+import time
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from AI_API_Features.models.database import Food
+from AI_API_Features.services.food_catalog import FoodCatalog
+
+
+def _sessions() -> sessionmaker:
+    # One shared in-memory database, usable from the refresh thread too
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Food.__table__.create(engine)
+    return sessionmaker(bind=engine)
+
+
+def _session():
+    return _sessions()()
+
+
+def _food(food_id: int, name: str, calories: float) -> Food:
+    return Food(id=food_id, name=name, calories=calories, protein=1, carbohydrate=2, fat=3, sugar=0)
+
+
+def test_update_that_keeps_updated_at_is_picked_up():
+    db = _session()
+    db.add_all([_food(1, "pho", 350), _food(2, "sushi", 200)])
+    db.commit()
+    catalog = FoodCatalog()
+    assert catalog.refresh(db, force=True)
+
+    # Another service edits a row without touching updatedAt
+    db.execute(text("UPDATE foods SET calories = 420 WHERE name = 'pho'"))
+    db.commit()
+
+    assert catalog.refresh(db, force=True)
+    assert catalog.get(db, "pho").nutrition["calories"] == 420
+
+
+def test_in_place_edits_that_keep_sums_and_lengths_are_picked_up():
+    db = _session()
+    db.add_all([_food(1, "pho", 350), _food(2, "ramen", 200)])
+    db.commit()
+    db.execute(text("UPDATE foods SET pic = 'https://cdn/a.jpg'"))
+    db.commit()
+    catalog = FoodCatalog()
+    assert catalog.refresh(db, force=True)
+
+    def edit(statement: str) -> None:
+        db.execute(text(statement))
+        db.commit()
+        assert catalog.refresh(db, force=True), statement
+
+    edit("UPDATE foods SET calories = CASE id WHEN 1 THEN 200 ELSE 350 END")  # swap between rows
+    assert catalog.get(db, "pho").nutrition["calories"] == 200
+
+    edit("UPDATE foods SET name = 'udon!' WHERE id = 2")  # same-length rename
+    assert catalog.get(db, "ramen") is None and catalog.get(db, "udon!") is not None
+
+    edit("UPDATE foods SET pic = 'https://cdn/b.jpg' WHERE id = 1")  # same-length URL
+    assert b"https://cdn/b.jpg" in catalog.get(db, "pho").payload
+
+
+def test_unchanged_table_is_not_rebuilt():
+    db = _session()
+    db.add(_food(1, "pho", 350))
+    db.commit()
+    catalog = FoodCatalog()
+    assert catalog.refresh(db, force=True)
+
+    assert not catalog.refresh(db, force=True)
+
+
+def test_started_catalog_refreshes_in_background_only():
+    sessions = _sessions()
+    db = sessions()
+    db.add(_food(1, "pho", 350))
+    db.commit()
+    catalog = FoodCatalog(refresh_seconds=60)
+    assert catalog.refresh(db, force=True)
+    catalog.start(sessions)
+    try:
+        db.add(_food(2, "sushi", 200))
+        db.commit()
+        catalog.mark_dirty()
+
+        # Reads never query: without a session they still see the snapshot the thread rebuilds
+        deadline = time.monotonic() + 5
+        while catalog.get(None, "sushi") is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert catalog.get(None, "sushi") is not None
+        assert catalog.get(None, "pho") is not None
+    finally:
+        catalog.close()
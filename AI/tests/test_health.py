@@ -0,0 +1,16 @@
+"""
+Smoke test: the app starts on the fake model and reports itself healthy
+"""
+from fastapi.testclient import TestClient
+
+
+def test_fake_model_app_is_healthy():
+    import main
+
+    with TestClient(main.app) as client:
+        response = client.get("/health")
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["status"] == "ok"
+    assert body["model_version"] == "fake"
@@ -0,0 +1,27 @@
+"""
+Live scan: a frame that breaks inference is reported and the scan goes on
+"""
+import concurrent.futures
+import types
+
+from fastapi.testclient import TestClient
+
+from AI_API_Features.routers import live_scan
+
+
+class _BrokenScheduler:
+    def submit(self, image_bytes, deadline, model_name):
+        future = concurrent.futures.Future()
+        future.set_exception(RuntimeError("model crashed"))
+        return types.SimpleNamespace(future=future)
+
+
+def test_failed_frame_keeps_socket_open(monkeypatch):
+    import main
+
+    monkeypatch.setattr(live_scan, "get_inference_scheduler", lambda: _BrokenScheduler())
+    with TestClient(main.app) as client:
+        with client.websocket_connect("/api/food/live-scan") as websocket:
+            for _ in range(2):
+                websocket.send_bytes(b"frame")
+                assert websocket.receive_json() == {"type": "error", "detail": "Could not process frame"}
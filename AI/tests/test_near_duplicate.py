@@ -0,0 +1,37 @@
+"""
+Near-duplicate index: which images may share a prediction
+"""
+import numpy as np
+
+from AI_API_Features.services.near_duplicate import NearDuplicateIndex, dhash
+
+PROBABILITIES = np.array([0.1, 0.7, 0.2], dtype=np.float32)
+
+
+def _plain(color: tuple[int, int, int]) -> np.ndarray:
+    return np.full((1, 64, 64, 3), color, dtype=np.uint8)
+
+
+def _textured(seed: int) -> np.ndarray:
+    """Large random blocks, so the texture survives the hash's downscale"""
+    blocks = np.random.default_rng(seed).integers(0, 256, (1, 8, 8, 3), dtype=np.uint8)
+    return blocks.repeat(8, axis=1).repeat(8, axis=2)
+
+
+def test_plain_images_are_not_reused_for_each_other():
+    index = NearDuplicateIndex(max_distance=5)
+    index.add(dhash(_plain((220, 30, 30)))[0], "v1", PROBABILITIES)
+
+    assert index.lookup(dhash(_plain((30, 30, 220)))[0], "v1") is None
+    assert index.stats()["entries"] == 0
+    assert index.stats()["uninformative"] == 1
+
+
+def test_textured_image_is_reused_for_itself():
+    index = NearDuplicateIndex(max_distance=5)
+    image_hash = dhash(_textured(1))[0]
+    index.add(image_hash, "v1", PROBABILITIES)
+
+    match = index.lookup(image_hash, "v1")
+    assert match is not None and match[1] == 0
+    assert index.lookup(dhash(_textured(2))[0], "v1") is None
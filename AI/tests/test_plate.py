@@ -0,0 +1,61 @@
+"""
+Plate analysis: merging region predictions into foods, and the endpoint's checks
+"""
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from pydantic import ValidationError
+
+from AI_API_Features.config import get_settings
+from AI_API_Features.config.settings import Settings
+from AI_API_Features.services.plate import merge_regions, region_boxes
+
+CLASS_NAMES = ["pho", "sushi", "salad"]
+
+
+def _probabilities(labels: dict[int, int], regions: int) -> np.ndarray:
+    """Confident predictions for the given regions, near-uniform for the rest"""
+    probabilities = np.full((regions, len(CLASS_NAMES)), 1 / len(CLASS_NAMES), dtype=np.float32)
+    for region, label in labels.items():
+        probabilities[region] = 0.05
+        probabilities[region, label] = 0.9
+    return probabilities
+
+
+def test_whole_image_does_not_join_separate_servings():
+    boxes = region_boxes(grid=3, window=0.5)
+    # Top-left and bottom-right windows do not overlap; the whole image (0) sees the same food
+    probabilities = _probabilities({0: 1, 1: 1, 9: 1}, len(boxes))
+
+    items = merge_regions(probabilities, boxes, CLASS_NAMES)
+
+    assert [item.food_name for item in items] == ["sushi", "sushi"]
+    assert sorted(item.box for item in items) == [(0.0, 0.0, 0.5, 0.5), (0.5, 0.5, 1.0, 1.0)]
+
+
+def test_whole_image_adds_food_no_window_found():
+    boxes = region_boxes(grid=3, window=0.5)
+    probabilities = _probabilities({0: 2, 1: 1}, len(boxes))
+
+    items = merge_regions(probabilities, boxes, CLASS_NAMES)
+
+    assert sorted(item.food_name for item in items) == ["salad", "sushi"]
+
+
+def test_oversized_plate_photo_is_rejected(monkeypatch):
+    import main
+
+    monkeypatch.setattr(get_settings(), "MAX_UPLOAD_SIZE", 1024)
+    with TestClient(main.app) as client:
+        response = client.post(
+            "/api/food/predict-plate",
+            files={"file": ("plate.jpg", b"\xff" * 2048, "image/jpeg")}
+        )
+
+    assert response.status_code == 413
+
+
+def test_plate_grid_larger_than_a_batch_fails_at_settings_load():
+    with pytest.raises(ValidationError, match="PLATE_GRID"):
+        Settings(PLATE_GRID=4, INFERENCE_MAX_BATCH_SIZE=16)
+    assert Settings(PLATE_GRID=3, INFERENCE_MAX_BATCH_SIZE=10).plate_regions == 10
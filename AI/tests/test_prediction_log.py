@@ -0,0 +1,28 @@
+"""
+Prediction log: a database outage delays flushes but never reaches the request
+"""
+import asyncio
+
+from sqlalchemy import create_engine
+
+from AI_API_Features.services.prediction_log import DatabaseSink, PredictionLog
+
+
+def _unreachable_engine():
+    return create_engine("sqlite:////nonexistent-dir/predictions.db")
+
+
+def test_database_sink_does_not_touch_database_on_creation():
+    DatabaseSink(_unreachable_engine())
+
+
+def test_records_are_kept_while_database_is_down():
+    log = PredictionLog(DatabaseSink(_unreachable_engine()), flush_rows=1)
+
+    assert asyncio.run(log.record({"confidence": 0.9, "predicted_food": "pizza"}))
+    assert not log._flush()
+
+    stats = log.stats()
+    assert stats["failed_flushes"] == 1
+    assert stats["buffered"] == 1
+    assert stats["dropped"] == 0
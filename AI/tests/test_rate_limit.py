@@ -0,0 +1,42 @@
+"""
+Rate limit backends: a rate of 0 allows the burst and then never refills
+"""
+import asyncio
+import math
+import types
+
+import pytest
+
+from AI_API_Features.middleware import rate_limit
+from AI_API_Features.middleware.admission import AdmissionMiddleware
+from AI_API_Features.middleware.rate_limit import InMemoryRateLimitBackend, RedisRateLimitBackend
+
+
+async def _take_burst_and_one_more(backend, burst: int = 2) -> list[float]:
+    return [await backend.take("client", 0.0, burst) for _ in range(burst + 1)]
+
+
+def _check_zero_rate(retries: list[float]) -> None:
+    assert retries[:-1] == [0.0, 0.0]
+    assert math.isinf(retries[-1])
+
+
+def test_memory_backend_with_zero_rate():
+    _check_zero_rate(asyncio.run(_take_burst_and_one_more(InMemoryRateLimitBackend())))
+
+
+def test_redis_backend_with_zero_rate(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")  # fakeredis runs Lua scripts with it
+    monkeypatch.setattr(
+        rate_limit, "redis_asyncio", types.SimpleNamespace(from_url=lambda url: fakeredis.aioredis.FakeRedis())
+    )
+
+    backend = RedisRateLimitBackend("redis://fake")
+    _check_zero_rate(asyncio.run(_take_burst_and_one_more(backend)))
+
+
+def test_infinite_wait_gets_a_finite_retry_after():
+    response = AdmissionMiddleware._reject(429, "Too many requests", "Rate limit exceeded", float("inf"))
+
+    assert 1 <= int(response.headers["Retry-After"]) <= 3600
@@ -0,0 +1,48 @@
+"""
+Inference scheduler: models that are not loaded yet
+"""
+import io
+import threading
+import time
+from pathlib import Path
+
+from PIL import Image
+
+from AI_API_Features.config import get_settings
+from AI_API_Features.services.fake_model import FakeFoodModel
+from AI_API_Features.services.model_manager import ModelManager, ModelSpec
+from AI_API_Features.services.model_registry import ModelRegistry
+from AI_API_Features.services.scheduler import InferenceScheduler
+
+
+def _image_bytes() -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 48), (30, 160, 90)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def test_model_is_loaded_off_the_scheduler_thread():
+    from AI_API_Features.routers.dependencies import get_registry
+
+    settings = get_settings()
+    loaded_on = []
+
+    def registry_factory(spec: ModelSpec) -> ModelRegistry:
+        def load(path: Path) -> FakeFoodModel:
+            loaded_on.append(threading.current_thread().name)
+            return FakeFoodModel(spec.class_names_path, spec.img_size, 0)
+        return ModelRegistry(load, keep_versions=1)
+
+    spec = ModelSpec("lazy", Path("lazy.keras"), settings.CLASS_NAMES_PATH, settings.IMG_SIZE, version="fake-lazy")
+    models = ModelManager("default", get_registry(), [spec], registry_factory)
+    scheduler = InferenceScheduler(models, max_batch_size=4, batch_wait_ms=1)
+    scheduler.start()
+    try:
+        jobs = [scheduler.submit(_image_bytes(), time.monotonic() + 30, model="lazy") for _ in range(3)]
+        outputs = [job.future.result(timeout=30) for job in jobs]
+    finally:
+        scheduler.stop()
+
+    assert loaded_on == ["model-load"]
+    assert all(output.model_name == "lazy" for output in outputs)
+    assert models.is_loaded("lazy")
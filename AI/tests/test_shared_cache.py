@@ -0,0 +1,99 @@
+"""
+Shared prediction cache: entries visible across instances and processes, clock eviction, layout changes
+"""
+import multiprocessing
+from pathlib import Path
+
+import numpy as np
+
+from AI_API_Features.services.shared_cache import SharedPredictionCache
+
+NUM_CLASSES = 50
+
+
+def _probabilities(label: int) -> np.ndarray:
+    probabilities = np.full(NUM_CLASSES, 0.01, dtype=np.float32)
+    probabilities[label] = 0.9
+    return probabilities
+
+
+def _label(key: int) -> int:
+    return key % NUM_CLASSES
+
+
+def _top(hit) -> int:
+    return int(hit.dense(NUM_CLASSES).argmax())
+
+
+def test_entries_are_shared_between_instances(tmp_path):
+    path = tmp_path / "cache.bin"
+    writer = SharedPredictionCache(path, max_entries=64, top_k=5)
+    reader = SharedPredictionCache(path, max_entries=64, top_k=5)
+
+    writer.put("image-1", "v1", _probabilities(7))
+
+    hit = reader.get("image-1", "v1")
+    assert hit is not None and _top(hit) == 7
+    assert reader.get("image-1", "v2") is None
+
+
+def test_full_bucket_evicts_by_clock(tmp_path):
+    # A single bucket, so every key competes for the same slots
+    cache = SharedPredictionCache(tmp_path / "cache.bin", max_entries=8, top_k=3)
+    for key in range(8):
+        cache.put(f"image-{key}", "v1", _probabilities(_label(key)))
+
+    cache.put("image-8", "v1", _probabilities(_label(8)))  # first pass clears every bit, evicts slot 0
+    assert cache.get("image-1", "v1") is not None  # hit: slot 1 survives the next pass
+    cache.put("image-9", "v1", _probabilities(_label(9)))
+
+    assert cache.get("image-0", "v1") is None
+    assert cache.get("image-2", "v1") is None
+    assert all(cache.get(f"image-{key}", "v1") is not None for key in (1, 3, 8, 9))
+    assert cache.stats()["evictions"] == 2
+
+
+def test_layout_change_replaces_file_without_touching_old_mapping(tmp_path):
+    path = tmp_path / "cache.bin"
+    old = SharedPredictionCache(path, max_entries=64, top_k=5)
+    old.put("image-1", "v1", _probabilities(3))
+
+    new = SharedPredictionCache(path, max_entries=64, top_k=10)
+
+    # The old worker keeps its consistent copy; the new layout starts empty
+    assert _top(old.get("image-1", "v1")) == 3
+    assert new.get("image-1", "v1") is None
+    new.put("image-2", "v1", _probabilities(4))
+    assert _top(SharedPredictionCache(path, max_entries=64, top_k=10).get("image-2", "v1")) == 4
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def _hammer(path: str, worker: int, rounds: int, errors) -> None:
+    """Put and get overlapping keys; every hit must carry the label of its own key"""
+    cache = SharedPredictionCache(Path(path), max_entries=64, top_k=5)
+    bad = 0
+    for i in range(rounds):
+        key = (i * 7 + worker) % 200
+        cache.put(f"image-{key}", "v1", _probabilities(_label(key)))
+        probe = (i * 13) % 200
+        hit = cache.get(f"image-{probe}", "v1")
+        if hit is not None and _top(hit) != _label(probe):
+            bad += 1
+    errors.put(bad)
+
+
+def test_concurrent_processes_never_read_torn_entries(tmp_path):
+    path = tmp_path / "cache.bin"
+    SharedPredictionCache(path, max_entries=64, top_k=5)
+
+    context = multiprocessing.get_context("spawn")
+    errors = context.Queue()
+    workers = [context.Process(target=_hammer, args=(str(path), w, 2000, errors)) for w in range(2)]
+    for process in workers:
+        process.start()
+    results = [errors.get(timeout=120) for _ in workers]
+    for process in workers:
+        process.join(timeout=30)
+
+    assert all(process.exitcode == 0 for process in workers)
+    assert results == [0, 0]
@@ -0,0 +1,26 @@
+"""
+Test-time augmentation through the scheduler
+"""
+import io
+import time
+
+from PIL import Image
+
+
+def _image_bytes() -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 48), (200, 120, 40)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def test_more_views_than_transforms_are_clamped():
+    from AI_API_Features.routers.dependencies import get_inference_scheduler
+    from AI_API_Features.services.tta import MAX_VIEWS
+
+    scheduler = get_inference_scheduler()
+    job = scheduler.submit(_image_bytes(), time.monotonic() + 30, views=10)
+    output = job.future.result(timeout=30)
+
+    assert job.views == MAX_VIEWS
+    assert output.views == MAX_VIEWS
+    assert len(output.probabilities) > 0
@@ -0,0 +1,350 @@
+"""
+Score a large image collection offline with the food recognition model
+
+Streams images from a directory (searched recursively) or from tar shards
+through a pipeline of three stages running concurrently:
+
+    reader thread    -> reads files / tar members in order (bounded prefetch queue)
+    decode thread    -> decodes each batch in parallel into pooled input buffers
+    main thread      -> batched inference, then appends the rows to the output
+
+Every batch is written as soon as it is scored: CSV rows are appended and
+flushed, Parquet output is a directory of part files. Re-running the same
+command skips images already in the output, so an interrupted run resumes
+where it stopped. Images that fail to decode are written with an error and
+not retried.
+
+Usage:
+    python tools/batch_score.py --input path/to/images --output scores.csv
+    python tools/batch_score.py --input "shards/train-*.tar" --output scores.parquet --embeddings
+"""
+import argparse
+import csv
+import glob
+import posixpath
+import queue
+import sys
+import tarfile
+import threading
+import time
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+
+import numpy as np
+
+from labeled_data import IMAGE_EXTENSIONS
+from AI_API_Features.config import get_settings
+from AI_API_Features.services.ml_service import FoodRecognitionModel
+from AI_API_Features.services.preprocessing import BatchPreprocessor, PreparedBatch
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - optional dependency
+    pa = None
+    pq = None
+
+# Queue marker for the end of a stream
+_DONE = object()
+
+
+def is_image(name: str) -> bool:
+    return Path(name).suffix.lower() in IMAGE_EXTENSIONS
+
+
+def iter_directory(root: Path, done: set[str]) -> Iterator[Tuple[str, bytes]]:
+    """Yield (relative path, bytes) for every image under root, in sorted order"""
+    for path in sorted(root.rglob("*")):
+        if not path.is_file() or not is_image(path.name):
+            continue
+        image_id = path.relative_to(root).as_posix()
+        if image_id not in done:
+            yield image_id, path.read_bytes()
+
+
+def iter_tar_shards(shards: list[Path], done: set[str]) -> Iterator[Tuple[str, bytes]]:
+    """Yield ("shard.tar/member", bytes) for every image in the shards, streaming each tar once"""
+    for shard in shards:
+        with tarfile.open(shard, mode="r|*") as tar:
+            for member in tar:
+                if not member.isfile() or not is_image(member.name):
+                    continue
+                image_id = f"{shard.name}/{posixpath.normpath(member.name)}"
+                if image_id in done:
+                    continue
+                data = tar.extractfile(member)
+                if data is not None:
+                    yield image_id, data.read()
+
+
+def open_source(spec: str, done: set[str]) -> Iterator[Tuple[str, bytes]]:
+    """Resolve --input to a directory or a list of tar shards (glob patterns allowed)"""
+    path = Path(spec)
+    if path.is_dir():
+        return iter_directory(path, done)
+    shards = sorted(Path(p) for p in glob.glob(spec)) if any(c in spec for c in "*?[") else [path]
+    missing = [s for s in shards if not s.is_file()]
+    if not shards or missing:
+        raise SystemExit(f"No directory or tar shard found at {missing[0] if missing else spec}")
+    return iter_tar_shards(shards, done)
+
+
+class CSVOutput:
+    """Append-only CSV output, one row per image"""
+
+    def __init__(self, path: Path, columns: list[str]):
+        self.path = path
+        self.columns = columns
+        self.done = self._read_done()
+        new_file = not self.path.exists() or self.path.stat().st_size == 0
+        self._file = open(self.path, "a", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._file)
+        if new_file:
+            self._writer.writerow(columns)
+            self._file.flush()
+
+    def _read_done(self) -> set[str]:
+        if not self.path.exists():
+            return set()
+        # Drop a row cut off by an interruption mid-write
+        with open(self.path, "rb+") as f:
+            end = f.seek(0, 2)
+            position = end
+            while position > 0:
+                chunk_start = max(position - 65536, 0)
+                f.seek(chunk_start)
+                chunk = f.read(position - chunk_start)
+                newline = chunk.rfind(b"\n")
+                if newline != -1:
+                    position = chunk_start + newline + 1
+                    break
+                position = chunk_start
+            if position != end:
+                f.truncate(position)
+        with open(self.path, newline="", encoding="utf-8") as f:
+            reader = csv.reader(f)
+            header = next(reader, None)
+            if header is not None and header != self.columns:
+                raise SystemExit(f"{self.path} has different columns; use a new output file")
+            return {row[0] for row in reader if row}
+
+    def write(self, rows: list[dict]) -> None:
+        for row in rows:
+            embedding = row.get("embedding")
+            if embedding is not None:
+                row = {**row, "embedding": " ".join(f"{v:.6g}" for v in embedding)}
+            self._writer.writerow(["" if row.get(c) is None else row[c] for c in self.columns])
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class ParquetOutput:
+    """Directory of Parquet part files, one per written batch group"""
+
+    def __init__(self, path: Path, columns: list[str], rows_per_part: int = 4096):
+        if pq is None:
+            raise SystemExit("Parquet output requires pyarrow (pip install pyarrow)")
+        self.path = path
+        self.columns = columns
+        self.rows_per_part = rows_per_part
+        self.path.mkdir(parents=True, exist_ok=True)
+        for partial in self.path.glob("*.tmp"):
+            partial.unlink()
+        parts = sorted(self.path.glob("part-*.parquet"))
+        self._next_part = int(parts[-1].stem.split("-")[1]) + 1 if parts else 0
+        self.done = set()
+        for part in parts:
+            self.done.update(pq.read_table(part, columns=["image"]).column("image").to_pylist())
+        self._pending: list[dict] = []
+        # Fixed schema so part files agree even when a column is empty in one of them
+        self.schema = pa.schema([
+            (c, pa.float32() if c.startswith("confidence_") else
+             pa.list_(pa.float32()) if c == "embedding" else pa.string())
+            for c in columns
+        ])
+
+    def write(self, rows: list[dict]) -> None:
+        self._pending.extend(rows)
+        if len(self._pending) >= self.rows_per_part:
+            self._flush()
+
+    def _flush(self) -> None:
+        if not self._pending:
+            return
+        table = pa.Table.from_pylist(
+            [{c: row.get(c) for c in self.columns} for row in self._pending],
+            schema=self.schema
+        )
+        # Write under a temporary name so an interrupted write never looks complete
+        final = self.path / f"part-{self._next_part:05d}.parquet"
+        temporary = final.with_suffix(".tmp")
+        pq.write_table(table, temporary)
+        temporary.rename(final)
+        self._next_part += 1
+        self._pending = []
+
+    def close(self) -> None:
+        self._flush()
+
+
+class ScoringPipeline:
+    """Reader and decode threads feeding prepared batches to the caller"""
+
+    def __init__(self, source: Iterator[Tuple[str, bytes]], preprocessor: BatchPreprocessor, prefetch: int):
+        self.source = source
+        self.preprocessor = preprocessor
+        self.batch_size = preprocessor.max_batch_size
+        self._files: queue.Queue = queue.Queue(maxsize=prefetch * self.batch_size)
+        self._batches: queue.Queue = queue.Queue(maxsize=prefetch)
+        self._stop = threading.Event()
+        self.error: Optional[BaseException] = None
+        self._threads = [
+            threading.Thread(target=self._read, name="batch-score-reader", daemon=True),
+            threading.Thread(target=self._decode, name="batch-score-decoder", daemon=True),
+        ]
+
+    def _put(self, q: queue.Queue, item) -> bool:
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _read(self) -> None:
+        try:
+            for item in self.source:
+                if not self._put(self._files, item):
+                    return
+        except BaseException as e:
+            self.error = e
+        self._put(self._files, _DONE)
+
+    def _decode(self) -> None:
+        finished = False
+        while not finished and not self._stop.is_set():
+            ids, images = [], []
+            while len(ids) < self.batch_size:
+                item = self._files.get()
+                if item is _DONE:
+                    finished = True
+                    break
+                ids.append(item[0])
+                images.append(item[1])
+            if ids and not self._put(self._batches, (ids, self.preprocessor.preprocess(images))):
+                return
+        self._put(self._batches, _DONE)
+
+    def __iter__(self) -> Iterator[Tuple[list[str], PreparedBatch]]:
+        for thread in self._threads:
+            thread.start()
+        while True:
+            item = self._batches.get()
+            if item is _DONE:
+                break
+            yield item
+        if self.error is not None:
+            raise self.error
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+def parse_args() -> argparse.Namespace:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--input", required=True, help="Image directory, tar shard, or glob of shards")
+    parser.add_argument("--output", type=Path, required=True, help="Output .csv file or .parquet directory")
+    parser.add_argument("--format", choices=["csv", "parquet"], help="Defaults to the output suffix")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--embeddings", action="store_true", help="Also write the pooled image embeddings")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--workers", type=int, default=settings.PREPROCESS_WORKERS, help="Decode threads")
+    parser.add_argument("--prefetch", type=int, default=4, help="Decoded batches buffered ahead of inference")
+    parser.add_argument("--model-path", type=Path, default=settings.MODEL_PATH)
+    parser.add_argument("--class-names-path", type=Path, default=settings.CLASS_NAMES_PATH)
+    parser.add_argument("--img-size", type=int, default=settings.IMG_SIZE)
+    parser.add_argument("--report-every", type=float, default=10.0, help="Seconds between progress lines")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    output_format = args.format or ("parquet" if args.output.suffix == ".parquet" else "csv")
+
+    model = FoodRecognitionModel(args.model_path, args.class_names_path, args.img_size)
+    top_k = min(args.top_k, len(model.class_names))
+    columns = ["image"]
+    for rank in range(1, top_k + 1):
+        columns += [f"label_{rank}", f"confidence_{rank}"]
+    with_embeddings = args.embeddings and model.embedding_dim is not None
+    if args.embeddings and not with_embeddings:
+        print("Model has no embedding layer; writing predictions only", file=sys.stderr)
+    if with_embeddings:
+        columns.append("embedding")
+    columns.append("error")
+
+    output = ParquetOutput(args.output, columns) if output_format == "parquet" else CSVOutput(args.output, columns)
+    if output.done:
+        print(f"Resuming: {len(output.done)} images already scored in {args.output}", file=sys.stderr)
+
+    preprocessor = BatchPreprocessor(args.img_size, args.batch_size, args.workers, args.prefetch + 2)
+    pipeline = ScoringPipeline(open_source(args.input, output.done), preprocessor, args.prefetch)
+
+    scored = failed = 0
+    inference_seconds = 0.0
+    started = last_report = time.perf_counter()
+    try:
+        for ids, prepared in pipeline:
+            try:
+                keep = [i for i, ok in enumerate(prepared.ok) if ok]
+                probabilities = embeddings = None
+                if keep:
+                    images = prepared.images if len(keep) == len(ids) else prepared.compact(keep)
+                    inference_started = time.perf_counter()
+                    probabilities, embeddings = model.predict_batch_with_embeddings(images)
+                    inference_seconds += time.perf_counter() - inference_started
+            finally:
+                preprocessor.release(prepared)
+
+            rows = []
+            scored_row = {row: i for i, row in enumerate(keep)}
+            for row, image_id in enumerate(ids):
+                if row not in scored_row:
+                    rows.append({"image": image_id, "error": "decode_failed"})
+                    continue
+                i = scored_row[row]
+                record = {"image": image_id}
+                top = np.argsort(probabilities[i])[::-1][:top_k]
+                for rank, class_index in enumerate(top, start=1):
+                    record[f"label_{rank}"] = model.class_names[class_index]
+                    record[f"confidence_{rank}"] = round(float(probabilities[i][class_index]), 6)
+                if with_embeddings and embeddings is not None:
+                    record["embedding"] = embeddings[i].astype(np.float32).tolist()
+                rows.append(record)
+            output.write(rows)
+            scored += len(keep)
+            failed += len(ids) - len(keep)
+
+            now = time.perf_counter()
+            if now - last_report >= args.report_every:
+                last_report = now
+                print(f"{scored + failed} images, {scored / (now - started):.1f} images/s", file=sys.stderr)
+    except KeyboardInterrupt:
+        print("Interrupted; re-run the same command to resume", file=sys.stderr)
+    finally:
+        pipeline.stop()
+        output.close()
+        preprocessor.shutdown()
+
+    elapsed = time.perf_counter() - started
+    print(f"Scored {scored} images ({failed} failed to decode) in {elapsed:.1f}s: "
+          f"{scored / elapsed if elapsed else 0:.1f} images/s overall, "
+          f"{scored / inference_seconds if inference_seconds else 0:.1f} images/s in inference")
+
+
+if __name__ == "__main__":
+    main()
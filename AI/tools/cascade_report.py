@@ -0,0 +1,105 @@
+"""
+Evaluate the model cascade on a labeled image folder
+
+Runs both cascade stages on every image once, timing each separately,
+then reports for each threshold what fraction of traffic would escalate
+to the full model, the end-to-end accuracy and the estimated compute per
+image.
+
+Usage:
+    python tools/cascade_report.py --data-dir path/to/labeled --thresholds 0.4,0.5,0.6,0.7
+"""
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+
+from labeled_data import iter_labeled_images
+from AI_API_Features.config import get_settings
+from AI_API_Features.services.ml_service import FoodRecognitionModel
+from AI_API_Features.services.cascade import CascadeModel, build_fast_model
+
+
+def parse_args() -> argparse.Namespace:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data-dir", type=Path, required=True, help="Folder with one sub-folder per class")
+    parser.add_argument("--thresholds", default=f"0.3,0.4,0.5,{settings.CASCADE_CONFIDENCE_THRESHOLD},0.7,0.8,0.9",
+                        help="Comma-separated confidence thresholds to evaluate")
+    parser.add_argument("--fast-img-size", type=int, default=settings.CASCADE_FAST_IMG_SIZE)
+    parser.add_argument("--fast-model-path", type=Path, default=settings.CASCADE_FAST_MODEL_PATH)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--limit", type=int, default=0, help="Maximum number of images (0 for all)")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    settings = get_settings()
+
+    full_model = FoodRecognitionModel(settings.MODEL_PATH, settings.CLASS_NAMES_PATH, settings.IMG_SIZE)
+    fast_model = build_fast_model(full_model, args.fast_img_size, args.fast_model_path)
+    cascade = CascadeModel(full_model, fast_model)
+
+    labels, fast_conf, fast_pred, full_pred = [], [], [], []
+    fast_seconds = full_seconds = 0.0
+
+    def run_batch(images: list[np.ndarray]) -> None:
+        nonlocal fast_seconds, full_seconds
+        batch = np.concatenate(images, axis=0)
+
+        started = time.perf_counter()
+        fast_probs = fast_model.predict_batch(cascade.resize_for_fast(batch))
+        fast_seconds += time.perf_counter() - started
+
+        started = time.perf_counter()
+        full_probs = full_model.predict_batch(batch)
+        full_seconds += time.perf_counter() - started
+
+        fast_conf.extend(fast_probs.max(axis=1))
+        fast_pred.extend(fast_probs.argmax(axis=1))
+        full_pred.extend(full_probs.argmax(axis=1))
+
+    pending = []
+    for image_path, class_index in iter_labeled_images(args.data_dir, full_model.class_names, args.limit):
+        processed = full_model.preprocess_image(image_path.read_bytes())
+        if processed is None:
+            continue
+        pending.append(processed)
+        labels.append(class_index)
+        if len(pending) == args.batch_size:
+            run_batch(pending)
+            pending = []
+    if pending:
+        run_batch(pending)
+
+    total = len(labels)
+    if total == 0:
+        print("No labeled images found")
+        return
+
+    labels_arr = np.array(labels)
+    fast_conf_arr = np.array(fast_conf)
+    fast_pred_arr = np.array(fast_pred)
+    full_pred_arr = np.array(full_pred)
+    fast_cost = fast_seconds / total
+    full_cost = full_seconds / total
+
+    print(f"Images: {total}")
+    print(f"Fast stage ({fast_model.img_size}px): {fast_cost * 1000:.2f} ms/image, "
+          f"accuracy {np.mean(fast_pred_arr == labels_arr):.2%}")
+    print(f"Full model ({full_model.img_size}px): {full_cost * 1000:.2f} ms/image, "
+          f"accuracy {np.mean(full_pred_arr == labels_arr):.2%}")
+    print()
+    print(f"{'threshold':>9}  {'escalated':>9}  {'accuracy':>8}  {'ms/image':>8}  {'vs full':>7}")
+    for threshold in sorted(float(t) for t in args.thresholds.split(",")):
+        escalated = fast_conf_arr < threshold
+        predictions = np.where(escalated, full_pred_arr, fast_pred_arr)
+        cost = fast_cost + escalated.mean() * full_cost
+        print(f"{threshold:>9.2f}  {escalated.mean():>9.2%}  {np.mean(predictions == labels_arr):>8.2%}  "
+              f"{cost * 1000:>8.2f}  {cost / full_cost:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+TCP proxy that stands in for the database and injects latency or outages
+
+Point the API at the proxy instead of PostgreSQL to see statement timeouts,
+the circuit breaker and degraded prediction responses in action:
+
+    python tools/db_latency_proxy.py --listen-port 6543 --delay-ms 3000
+    POSTGRES_PORT=6543 uvicorn main:app
+
+Every chunk the database sends back is held for --delay-ms (plus up to
+--jitter-ms). Send SIGUSR1 to toggle "blackhole" mode, in which new and
+existing connections stop receiving any data (a hung database), and SIGUSR2
+to toggle refusing new connections (a database that is down).
+
+Usage:
+    python tools/db_latency_proxy.py --target-port 5432 --listen-port 6543 --delay-ms 500 --jitter-ms 200
+"""
+import argparse
+import asyncio
+import logging
+import random
+import signal
+
+logger = logging.getLogger("db_latency_proxy")
+
+
+class LatencyProxy:
+    """Forwards TCP connections, delaying server-to-client traffic"""
+
+    def __init__(self, target_host: str, target_port: int, delay_ms: int, jitter_ms: int):
+        self.target_host = target_host
+        self.target_port = target_port
+        self.delay_ms = delay_ms
+        self.jitter_ms = jitter_ms
+        self.blackhole = False
+        self.refuse = False
+
+    async def _pipe(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, delayed: bool) -> None:
+        try:
+            while data := await reader.read(65536):
+                if delayed:
+                    while self.blackhole:
+                        await asyncio.sleep(0.1)
+                    await asyncio.sleep((self.delay_ms + random.uniform(0, self.jitter_ms)) / 1000)
+                writer.write(data)
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    async def handle(self, client_reader: asyncio.StreamReader, client_writer: asyncio.StreamWriter) -> None:
+        peer = client_writer.get_extra_info("peername")
+        if self.refuse:
+            logger.info(f"Refusing connection from {peer}")
+            client_writer.close()
+            return
+        try:
+            server_reader, server_writer = await asyncio.open_connection(self.target_host, self.target_port)
+        except OSError as e:
+            logger.error(f"Cannot reach {self.target_host}:{self.target_port}: {e}")
+            client_writer.close()
+            return
+        logger.info(f"Proxying connection from {peer}")
+        await asyncio.gather(
+            self._pipe(client_reader, server_writer, delayed=False),
+            self._pipe(server_reader, client_writer, delayed=True)
+        )
+
+    def toggle_blackhole(self) -> None:
+        self.blackhole = not self.blackhole
+        logger.warning(f"Blackhole mode {'on' if self.blackhole else 'off'}")
+
+    def toggle_refuse(self) -> None:
+        self.refuse = not self.refuse
+        logger.warning(f"Refusing new connections: {'on' if self.refuse else 'off'}")
+
+
+async def serve(args: argparse.Namespace) -> None:
+    proxy = LatencyProxy(args.target_host, args.target_port, args.delay_ms, args.jitter_ms)
+    loop = asyncio.get_running_loop()
+    loop.add_signal_handler(signal.SIGUSR1, proxy.toggle_blackhole)
+    loop.add_signal_handler(signal.SIGUSR2, proxy.toggle_refuse)
+
+    server = await asyncio.start_server(proxy.handle, args.listen_host, args.listen_port)
+    logger.info(
+        f"Listening on {args.listen_host}:{args.listen_port} -> {args.target_host}:{args.target_port} "
+        f"(delay {args.delay_ms}ms, jitter {args.jitter_ms}ms)"
+    )
+    async with server:
+        await server.serve_forever()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target-host", default="localhost")
+    parser.add_argument("--target-port", type=int, default=5432)
+    parser.add_argument("--listen-host", default="127.0.0.1")
+    parser.add_argument("--listen-port", type=int, default=6543)
+    parser.add_argument("--delay-ms", type=int, default=0, help="Delay added to every response chunk")
+    parser.add_argument("--jitter-ms", type=int, default=0, help="Extra random delay of up to this much")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+Helpers for evaluation tools that read a labeled image folder
+
+Expected layout (one sub-folder per class, named as in class_names.json):
+
+    labeled/
+        falafel/
+            001.jpg
+        koshary/
+            img_17.png
+"""
+import sys
+from pathlib import Path
+from typing import Iterator, Tuple
+
+# Make the API package importable when tools are run as scripts
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp"}
+
+
+def iter_labeled_images(root: Path, class_names: list[str], limit: int = 0) -> Iterator[Tuple[Path, int]]:
+    """
+    Yield (image_path, class_index) pairs from a labeled folder
+
+    Args:
+        root: Folder containing one sub-folder per class
+        class_names: Model class names; folders not in this list are skipped
+        limit: Stop after this many images (0 for no limit)
+    """
+    index_by_name = {name: i for i, name in enumerate(class_names)}
+    count = 0
+    for class_dir in sorted(p for p in root.iterdir() if p.is_dir()):
+        class_index = index_by_name.get(class_dir.name)
+        if class_index is None:
+            print(f"Skipping unknown class folder: {class_dir.name}", file=sys.stderr)
+            continue
+        for image_path in sorted(class_dir.iterdir()):
+            if image_path.suffix.lower() not in IMAGE_EXTENSIONS:
+                continue
+            yield image_path, class_index
+            count += 1
+            if limit and count >= limit:
+                return
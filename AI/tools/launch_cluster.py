@@ -0,0 +1,143 @@
+"""
+Launch several local API replicas behind the request router
+
+Starts --replicas instances of main:app (with the fake model unless
+--real-model is given) on consecutive ports and router:app in front of
+them, waits until all are healthy and keeps them running until Ctrl-C.
+Stopping a replica by hand (kill <pid>) leaves the rest running, to watch
+the router fail over. With --smoke it first sends every image of a sample
+set twice through the router and prints which replica served each one and
+every replica's prediction cache hit rate.
+
+Usage:
+    python tools/launch_cluster.py --replicas 3
+    python tools/launch_cluster.py --replicas 3 --smoke 50
+"""
+import argparse
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+import httpx
+import numpy as np
+from PIL import Image
+
+AI_DIR = Path(__file__).resolve().parent.parent
+
+
+def start(module: str, port: int, env: dict) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", module, "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=AI_DIR,
+        env={**os.environ, **env}
+    )
+
+
+def wait_healthy(urls: list[str], timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    pending = set(urls)
+    while pending and time.monotonic() < deadline:
+        for url in list(pending):
+            try:
+                if httpx.get(f"{url}/health", timeout=1).status_code == 200:
+                    pending.discard(url)
+            except httpx.HTTPError:
+                pass
+        time.sleep(0.5)
+    if pending:
+        raise SystemExit(f"Not healthy after {timeout:.0f}s: {', '.join(sorted(pending))}")
+
+
+def sample_image(seed: int) -> bytes:
+    pixels = np.random.default_rng(seed).integers(0, 255, (96, 96, 3), dtype=np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, "JPEG")
+    return buffer.getvalue()
+
+
+def smoke(router_url: str, backends: list[str], images: int) -> None:
+    """Send each sample image twice and report routing and cache hits per replica"""
+    served = Counter()
+    statuses = Counter()
+    placement = {}
+    moved = 0
+    with httpx.Client(base_url=router_url, timeout=30) as client:
+        for round_number in range(2):
+            for seed in range(images):
+                response = client.post("/api/food/predict", files={"file": ("food.jpg", sample_image(seed), "image/jpeg")})
+                backend = response.headers.get("X-Routed-To", "none")
+                served[backend] += 1
+                statuses[response.status_code] += 1
+                if round_number and placement.get(seed) != backend:
+                    moved += 1
+                placement[seed] = backend
+
+    print(f"\n{images} images sent twice (status codes {dict(statuses)}); "
+          f"{moved} repeats went to a different replica")
+    for backend in backends:
+        cache = httpx.get(f"{backend}/api/food/metrics", timeout=5).json()["prediction_cache"]
+        print(f"  {backend}: {served[backend]} requests, cache {cache}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--replicas", type=int, default=3)
+    parser.add_argument("--base-port", type=int, default=8001, help="Port of the first replica")
+    parser.add_argument("--router-port", type=int, default=8080)
+    parser.add_argument("--real-model", action="store_true", help="Load MODEL_PATH instead of the fake model")
+    parser.add_argument("--fake-latency-ms", type=float, default=20.0)
+    parser.add_argument("--startup-timeout", type=float, default=120.0)
+    parser.add_argument("--smoke", type=int, default=0, metavar="IMAGES", help="Send sample traffic, then keep running")
+    args = parser.parse_args()
+
+    backends = [f"http://127.0.0.1:{args.base_port + i}" for i in range(args.replicas)]
+    router_url = f"http://127.0.0.1:{args.router_port}"
+    processes = []
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            for i, url in enumerate(backends):
+                env = {
+                    "USE_FAKE_MODEL": "false" if args.real_model else "true",
+                    "FAKE_MODEL_LATENCY_MS": str(args.fake_latency_ms),
+                    "EMBEDDING_INDEX_PATH": str(Path(tmp) / f"embedding_index_{i}.npz"),
+                    # Requests arrive from the router; rate limit by the original client
+                    "TRUST_FORWARDED_FOR": "true",
+                }
+                processes.append(start("main:app", args.base_port + i, env))
+            wait_healthy(backends, args.startup_timeout)
+
+            processes.append(start("router:app", args.router_port, {"ROUTER_BACKENDS": ",".join(backends)}))
+            wait_healthy([router_url], args.startup_timeout)
+
+            print(f"\n{args.replicas} replicas ({', '.join(backends)}) behind {router_url}")
+            print(f"Routing stats: {router_url}/router/stats  (Ctrl-C to stop)")
+            if args.smoke:
+                smoke(router_url, backends, args.smoke)
+            # Replicas may be stopped by hand to watch the router fail over
+            router, replicas = processes[-1], dict(zip(backends, processes))
+            while router.poll() is None:
+                for url, process in list(replicas.items()):
+                    if process.poll() is not None:
+                        print(f"Replica {url} exited with code {process.returncode}", file=sys.stderr)
+                        del replicas[url]
+                time.sleep(1)
+            print("Router exited; stopping the cluster", file=sys.stderr)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            for process in processes:
+                process.terminate()
+            for process in processes:
+                try:
+                    process.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+
+
+if __name__ == "__main__":
+    main()
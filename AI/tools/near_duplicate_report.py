@@ -0,0 +1,168 @@
+"""
+Measure near-duplicate reuse on a labeled image folder
+
+Each image is scored once as uploaded; its perceptual hash and prediction
+are what the server would have stored. Every image is then re-encoded and
+re-cropped the way photos get re-shared (JPEG at lower quality, a
+downscale, a few percent cropped off the edges) and each variant is scored
+fresh. For every distance threshold the report gives the share of variants
+that would reuse a stored prediction (hit rate), the share of hits matched
+to another photo than their own source, and the false-reuse rate: hits
+whose reused top-1 class differs from what the model says for the variant.
+The same thresholds applied to the originals against each other show how
+often distinct photos would be confused.
+
+Usage:
+    python tools/near_duplicate_report.py --data-dir path/to/labeled --thresholds 2,4,6,8,10
+"""
+import argparse
+import io
+import time
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+from PIL import Image
+
+from labeled_data import iter_labeled_images
+from AI_API_Features.config import get_settings
+from AI_API_Features.services.ml_service import FoodRecognitionModel
+from AI_API_Features.services.near_duplicate import NearDuplicateIndex, dhash
+
+
+def _jpeg(quality: int) -> Callable[[Image.Image], Image.Image]:
+    def transform(image: Image.Image) -> Image.Image:
+        buffer = io.BytesIO()
+        image.save(buffer, format="JPEG", quality=quality)
+        return Image.open(io.BytesIO(buffer.getvalue()))
+    return transform
+
+
+def _crop(fraction: float) -> Callable[[Image.Image], Image.Image]:
+    def transform(image: Image.Image) -> Image.Image:
+        dx, dy = int(image.width * fraction), int(image.height * fraction)
+        return image.crop((dx, dy, image.width - dx, image.height - dy))
+    return transform
+
+
+def _downscale(factor: float) -> Callable[[Image.Image], Image.Image]:
+    def transform(image: Image.Image) -> Image.Image:
+        return image.resize((max(1, int(image.width * factor)), max(1, int(image.height * factor))), Image.BILINEAR)
+    return transform
+
+
+VARIANTS = {
+    "jpeg-q80": _jpeg(80),
+    "jpeg-q50": _jpeg(50),
+    "downscale-50%": _downscale(0.5),
+    "crop-3%": _crop(0.03),
+    "crop-6%": _crop(0.06),
+    "downscale+jpeg": lambda image: _jpeg(70)(_downscale(0.6)(image)),
+}
+
+
+def parse_args() -> argparse.Namespace:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data-dir", type=Path, required=True, help="Folder with one sub-folder per class")
+    parser.add_argument("--thresholds", default=f"2,4,{settings.NEAR_DUPLICATE_MAX_DISTANCE},8,10",
+                        help="Comma-separated Hamming distances to evaluate (0 to 15)")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--limit", type=int, default=0, help="Maximum number of images (0 for all)")
+    return parser.parse_args()
+
+
+def encode(image: Image.Image) -> bytes:
+    """Serialize a variant losslessly, so the only loss is the variant's own"""
+    buffer = io.BytesIO()
+    image.convert("RGB").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def main() -> None:
+    args = parse_args()
+    settings = get_settings()
+    thresholds = sorted({min(max(int(t), 0), 15) for t in args.thresholds.split(",")})
+
+    model = FoodRecognitionModel(settings.MODEL_PATH, settings.CLASS_NAMES_PATH, settings.IMG_SIZE)
+
+    originals, variants, sources, kinds = [], [], [], []
+    for image_path, _ in iter_labeled_images(args.data_dir, model.class_names, args.limit):
+        image_bytes = image_path.read_bytes()
+        processed = model.preprocess_image(image_bytes)
+        if processed is None:
+            continue
+        source = len(originals)
+        originals.append(processed[0])
+        with Image.open(io.BytesIO(image_bytes)) as image:
+            image = image.convert("RGB")
+            for kind, transform in VARIANTS.items():
+                variant = model.preprocess_image(encode(transform(image)))
+                if variant is not None:
+                    variants.append(variant[0])
+                    sources.append(source)
+                    kinds.append(kind)
+
+    if not originals:
+        print("No labeled images found")
+        return
+    originals_arr, variants_arr = np.stack(originals), np.stack(variants)
+    sources_arr, kinds_arr = np.array(sources), np.array(kinds)
+
+    def predict(batch: np.ndarray) -> np.ndarray:
+        return np.concatenate([
+            model.predict_batch(batch[start:start + args.batch_size])
+            for start in range(0, len(batch), args.batch_size)
+        ])
+
+    original_top1 = predict(originals_arr).argmax(axis=1)
+    variant_top1 = predict(variants_arr).argmax(axis=1)
+
+    started = time.perf_counter()
+    original_hashes = dhash(originals_arr)
+    variant_hashes = dhash(variants_arr)
+    hash_us = (time.perf_counter() - started) / (len(originals_arr) + len(variants_arr)) * 1e6
+
+    # Hamming distance of every variant to every original, and between originals
+    to_originals = np.bitwise_count(variant_hashes[:, None] ^ original_hashes[None, :])
+    nearest = to_originals.argmin(axis=1)
+    nearest_distance = to_originals.min(axis=1)
+    between = np.bitwise_count(original_hashes[:, None] ^ original_hashes[None, :]).astype(np.int64)
+    np.fill_diagonal(between, 64)
+    own_distance = to_originals[np.arange(len(variants_arr)), sources_arr]
+
+    index = NearDuplicateIndex(max_entries=len(originals_arr), max_distance=max(thresholds))
+    for image_hash, top1 in zip(original_hashes, original_top1):
+        probabilities = np.zeros(len(model.class_names), dtype=np.float32)
+        probabilities[top1] = 1.0
+        index.add(image_hash, "report", probabilities)
+    started = time.perf_counter()
+    for image_hash in variant_hashes:
+        index.lookup(image_hash, "report")
+    lookup_us = (time.perf_counter() - started) / len(variant_hashes) * 1e6
+
+    print(f"Images: {len(originals_arr)}, variants: {len(variants_arr)} ({', '.join(VARIANTS)})")
+    print(f"dHash: {hash_us:.0f} us per image; index lookup: {lookup_us:.1f} us "
+          f"({index.chunks} chunks, {len(originals_arr)} entries)")
+    print("Median distance to own source: " + ", ".join(
+        f"{kind} {np.median(own_distance[kinds_arr == kind]):.0f}" for kind in VARIANTS
+    ))
+    print(f"Distance between distinct originals: min {between.min()}, "
+          f"1st percentile {np.percentile(between[between < 64], 1) if len(originals_arr) > 1 else 64:.0f}")
+    print()
+    print(f"{'dist':>4}  {'hit rate':>8}  {'wrong src':>9}  {'false reuse':>11}  {'distinct pairs':>14}  per variant")
+    pairs = max(len(originals_arr) * (len(originals_arr) - 1), 1)
+    for threshold in thresholds:
+        hits = nearest_distance <= threshold
+        reused_top1 = original_top1[nearest]
+        wrong_source = hits & (nearest != sources_arr)
+        false_reuse = hits & (reused_top1 != variant_top1)
+        confused = (between <= threshold).sum() / pairs
+        per_kind = " ".join(f"{hits[kinds_arr == kind].mean():.0%}" for kind in VARIANTS)
+        print(f"{threshold:>4}  {hits.mean():>8.2%}  "
+              f"{wrong_source.sum() / max(hits.sum(), 1):>9.2%}  "
+              f"{false_reuse.sum() / max(hits.sum(), 1):>11.2%}  {confused:>14.3%}  {per_kind}")
+
+
+if __name__ == "__main__":
+    main()
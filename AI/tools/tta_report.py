@@ -0,0 +1,109 @@
+"""
+Evaluate test-time augmentation on a labeled image folder
+
+Scores every image once plainly and once per view count with all views in
+one batch, then reports for each view count the accuracy with TTA applied
+to every image and only below the confidence trigger (as /predict does),
+and the latency a triggered request adds: one forward pass over the
+image's views, compared with running the views as sequential passes.
+
+Usage:
+    python tools/tta_report.py --data-dir path/to/labeled --views 2,4,8 --threshold 0.3
+"""
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+
+from labeled_data import iter_labeled_images
+from AI_API_Features.config import get_settings
+from AI_API_Features.services.ml_service import FoodRecognitionModel
+from AI_API_Features.services.tta import MAX_VIEWS, augment_views, average_views
+
+
+def parse_args() -> argparse.Namespace:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data-dir", type=Path, required=True, help="Folder with one sub-folder per class")
+    parser.add_argument("--views", default=f"2,{settings.TTA_VIEWS},{MAX_VIEWS}",
+                        help=f"Comma-separated view counts to evaluate (2 to {MAX_VIEWS})")
+    parser.add_argument("--threshold", type=float, default=settings.TTA_CONFIDENCE_THRESHOLD,
+                        help="Confidence below which TTA is applied")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--latency-samples", type=int, default=20, help="Single-image passes timed per setting")
+    parser.add_argument("--limit", type=int, default=0, help="Maximum number of images (0 for all)")
+    return parser.parse_args()
+
+
+def median_ms(run, samples: list[np.ndarray]) -> float:
+    """Median wall time of run(sample) in milliseconds, after one warm-up call"""
+    run(samples[0])
+    timings = []
+    for sample in samples:
+        started = time.perf_counter()
+        run(sample)
+        timings.append((time.perf_counter() - started) * 1000)
+    return float(np.median(timings))
+
+
+def main() -> None:
+    args = parse_args()
+    settings = get_settings()
+    view_counts = sorted({min(max(int(v), 2), MAX_VIEWS) for v in args.views.split(",")})
+
+    model = FoodRecognitionModel(settings.MODEL_PATH, settings.CLASS_NAMES_PATH, settings.IMG_SIZE)
+
+    labels, images = [], []
+    for image_path, class_index in iter_labeled_images(args.data_dir, model.class_names, args.limit):
+        processed = model.preprocess_image(image_path.read_bytes())
+        if processed is None:
+            continue
+        images.append(processed[0])
+        labels.append(class_index)
+
+    total = len(labels)
+    if total == 0:
+        print("No labeled images found")
+        return
+    images_arr = np.stack(images)
+    labels_arr = np.array(labels)
+
+    def predict(batch: np.ndarray, views: int = 1) -> np.ndarray:
+        """Probabilities per image, scoring batch_size images (times their views) per pass"""
+        chunks = []
+        for start in range(0, len(batch), args.batch_size):
+            chunk = batch[start:start + args.batch_size]
+            if views > 1:
+                chunks.append(average_views(model.predict_batch(augment_views(chunk, views)), views))
+            else:
+                chunks.append(model.predict_batch(chunk))
+        return np.concatenate(chunks)
+
+    plain = predict(images_arr)
+    plain_conf = plain.max(axis=1)
+    plain_correct = plain.argmax(axis=1) == labels_arr
+    triggered = plain_conf < args.threshold
+
+    samples = [images_arr[i:i + 1] for i in range(min(args.latency_samples, total))]
+    plain_ms = median_ms(lambda x: model.predict_batch(x), samples)
+
+    print(f"Images: {total}")
+    print(f"Plain: accuracy {plain_correct.mean():.2%}, {plain_ms:.1f} ms per single-image pass")
+    print(f"Below the {args.threshold:.2f} trigger: {triggered.mean():.2%} of images, "
+          f"plain accuracy on them {plain_correct[triggered].mean() if triggered.any() else 0:.2%}")
+    print()
+    print(f"{'views':>5}  {'acc all':>7}  {'acc trig':>8}  {'gain':>6}  {'+ms/trig':>8}  "
+          f"{'sequential':>10}  {'+ms/req':>7}")
+    for views in view_counts:
+        tta_correct = predict(images_arr, views).argmax(axis=1) == labels_arr
+        served_correct = np.where(triggered, tta_correct, plain_correct)
+        added_ms = median_ms(lambda x: model.predict_batch(augment_views(x, views)), samples)
+        # Triggered requests pay the plain pass plus one batched pass over all views
+        print(f"{views:>5}  {tta_correct.mean():>7.2%}  {served_correct.mean():>8.2%}  "
+              f"{served_correct.mean() - plain_correct.mean():>+6.2%}  {added_ms:>8.1f}  "
+              f"{views * plain_ms:>8.1f}ms  {triggered.mean() * added_ms:>7.1f}")
+
+
+if __name__ == "__main__":
+    main()